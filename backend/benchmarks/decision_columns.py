@@ -0,0 +1,121 @@
+"""Compare dict-loop and columnar (NumPy) aggregation of training decisions.
+
+Synthesizes sessions of training decisions and times the same report -
+totals, per-category and per-scenario counts, per-session series and a
+trailing-window accuracy curve - computed with per-decision dict updates
+and with utils/decision_columns.py. Run from the backend directory:
+
+    python -m benchmarks.decision_columns --decisions 100000 200000 1000000
+    python -m benchmarks.decision_columns --session-sizes 20 200 1000 5000
+"""
+
+import argparse
+import json
+import random
+import statistics
+import time
+
+from utils.decision_codec import decision_counters
+from utils.decision_columns import DecisionColumns
+
+CATEGORIES = ["hard_total", "soft_total", "pair_split", "surrender", "insurance"]
+
+
+def _sessions(decisions, per_session, seed):
+    rng = random.Random(seed)
+    sessions = []
+    for start in range(0, decisions, per_session):
+        session = []
+        for _ in range(min(per_session, decisions - start)):
+            category = rng.choice(CATEGORIES)
+            session.append({
+                "category": category,
+                "scenarioKey": f"{category}_{rng.randint(5, 21)}_vs_{rng.randint(2, 11)}",
+                "isCorrect": rng.random() < 0.8,
+            })
+        sessions.append(session)
+    return sessions
+
+
+def dict_report(sessions, window):
+    """The report built with plain Python loops over the decision dicts."""
+    totals = {"total": 0, "correct": 0}
+    categories, scenarios, series, recent = {}, {}, [], []
+    hits = 0
+    for session in sessions:
+        counters = decision_counters(session)
+        totals["total"] += counters["decision_total"]
+        totals["correct"] += counters["decision_correct"]
+        series.append((counters["decision_total"], counters["decision_correct"]))
+        for merged, part in ((categories, counters["decision_categories"]),
+                             (scenarios, counters["decision_scenarios"])):
+            for key, stats in part.items():
+                entry = merged.setdefault(key, {"total": 0, "correct": 0})
+                entry["total"] += stats["total"]
+                entry["correct"] += stats["correct"]
+        for d in session:
+            recent.append(bool(d.get("isCorrect")))
+            hits += recent[-1]
+            if len(recent) > window:
+                hits -= recent[-window - 1]
+    return totals, categories, scenarios, series, hits
+
+
+def columnar_report(sessions, window):
+    columns = DecisionColumns.from_sessions(sessions)
+    counters = columns.counters()
+    totals, correct = columns.session_series()
+    curve = columns.rolling_accuracy(window)
+    return counters, totals, correct, curve
+
+
+def _time(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--decisions", type=int, nargs="+", default=[100_000, 500_000])
+    parser.add_argument("--per-session", type=int, default=40)
+    parser.add_argument("--session-sizes", type=int, nargs="*", default=[],
+                        help="also time single-session counters at these sizes")
+    parser.add_argument("--window", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=21)
+    args = parser.parse_args()
+
+    results = []
+    for count in args.decisions:
+        sessions = _sessions(count, args.per_session, args.seed)
+        columns = DecisionColumns.from_sessions(sessions)
+        dict_ms = _time(lambda: dict_report(sessions, args.window), args.repeat)
+        columnar_ms = _time(lambda: columnar_report(sessions, args.window), args.repeat)
+        aggregate_ms = _time(lambda: (columns.counters(), columns.session_series(),
+                                      columns.rolling_accuracy(args.window)), args.repeat)
+        results.append({
+            "decisions": count,
+            "dict_ms": round(dict_ms, 2),
+            "columnar_ms": round(columnar_ms, 2),
+            "columnar_aggregate_only_ms": round(aggregate_ms, 2),
+            "speedup": round(dict_ms / columnar_ms, 2),
+        })
+    for size in args.session_sizes:
+        session = _sessions(size, size, args.seed)[0]
+        repeat = max(args.repeat, 100_000 // size)
+        dict_ms = _time(lambda: decision_counters(session), repeat)
+        columnar_ms = _time(lambda: DecisionColumns.from_decisions(session).counters(), repeat)
+        results.append({
+            "session_size": size,
+            "dict_ms": round(dict_ms, 4),
+            "columnar_ms": round(columnar_ms, 4),
+        })
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
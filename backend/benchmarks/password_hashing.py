@@ -0,0 +1,64 @@
+"""Login latency per bcrypt cost, for choosing BCRYPT_ROUNDS.
+
+For each cost, signs up a user with a hash at that cost and times
+auth.login end to end (users table on the memory backend, so the numbers
+are bcrypt plus handler overhead). Run it on the deployment hardware, e.g.
+a Lambda-sized container, and set BCRYPT_ROUNDS to the suggested cost:
+
+    python -m benchmarks.password_hashing --rounds 10 11 12 13 --target-ms 250
+"""
+
+import argparse
+import json
+import os
+import statistics
+import time
+
+
+def _percentile(samples, q):
+    return statistics.quantiles(samples, n=100, method="inclusive")[q - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rounds", type=int, nargs="+", default=[10, 11, 12, 13])
+    parser.add_argument("--logins", type=int, default=50, help="timed logins per cost")
+    parser.add_argument("--target-ms", type=float, default=250,
+                        help="p99 login latency budget used for the suggestion")
+    args = parser.parse_args()
+
+    os.environ["STORAGE_BACKEND"] = "memory"
+    os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+    # Imported after the environment is set: config is read at import time.
+    from passlib.context import CryptContext
+    from handlers import auth as auth_handlers
+    from utils import auth
+
+    results = []
+    for rounds in args.rounds:
+        auth.pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=rounds)
+        credentials = json.dumps({"email": f"bench-{rounds}@example.com", "password": "benchmark-pass"})
+        assert auth_handlers.signup({"body": credentials}, None)["statusCode"] == 201
+        samples = []
+        for _ in range(args.logins):
+            start = time.perf_counter()
+            resp = auth_handlers.login({"body": credentials}, None)
+            samples.append((time.perf_counter() - start) * 1000)
+            assert resp["statusCode"] == 200, resp
+        results.append({
+            "rounds": rounds,
+            "login_ms_p50": round(statistics.median(samples), 2),
+            "login_ms_p99": round(_percentile(samples, 99), 2),
+        })
+
+    within = [r["rounds"] for r in results if r["login_ms_p99"] <= args.target_ms]
+    print(json.dumps({
+        "logins_per_cost": args.logins,
+        "target_ms": args.target_ms,
+        "results": results,
+        "suggested_bcrypt_rounds": max(within) if within else None,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""Replay StatsTable stream events through handlers/stats_stream.consume.
+
+Feeds recorded (or synthesized) DynamoDB Stream records to the consumer
+on a local storage backend and reports throughput, so aggregation changes
+can be measured without AWS. Run from the backend directory:
+
+    # synthesize 200 users x 50 sessions, save the events for later replays
+    python -m benchmarks.stream_replay --users 200 --sessions 50 --record /tmp/stats-stream.jsonl
+
+    # replay a recording (one Lambda event {"Records": [...]} or record per line)
+    python -m benchmarks.stream_replay --events /tmp/stats-stream.jsonl --batch-size 100
+
+Each batch's stats items are written to the local StatsTable just before
+the batch is consumed, matching what the stream would have observed. A
+second pass replays every batch to confirm checkpoints make it a no-op.
+"""
+
+import argparse
+import json
+import os
+import random
+import time
+from datetime import datetime, timedelta
+from boto3.dynamodb.types import TypeSerializer
+
+CATEGORIES = ["hard_total", "soft_total", "pair_split", "surrender"]
+
+_serializer = TypeSerializer()
+
+
+def to_stream_record(item, sequence_number):
+    """Build a Lambda DynamoDB Stream INSERT record for a StatsTable item."""
+    image = {k: _serializer.serialize(v) for k, v in item.items()}
+    return {
+        "eventID": f"replay-{sequence_number}",
+        "eventName": "INSERT",
+        "eventSource": "aws:dynamodb",
+        "dynamodb": {
+            "Keys": {"userId": image["userId"], "timestamp": image["timestamp"]},
+            "NewImage": image,
+            "SequenceNumber": str(sequence_number),
+            "StreamViewType": "NEW_IMAGE",
+        },
+    }
+
+
+def synthesize(users, sessions, decisions, seed):
+    rng = random.Random(seed)
+    start = datetime(2026, 1, 1)
+    sequence = 10 ** 20
+    records = []
+    for s in range(sessions):
+        for u in range(users):
+            sequence += 1
+            session_decisions = []
+            for _ in range(decisions):
+                category = rng.choice(CATEGORIES)
+                session_decisions.append({
+                    "category": category,
+                    "scenarioKey": f"{category}_{rng.randint(5, 21)}_vs_{rng.randint(2, 11)}",
+                    "userAction": "hit",
+                    "optimalAction": "hit",
+                    "isCorrect": rng.random() < 0.8,
+                })
+            item = {
+                "userId": f"replay-user-{u}",
+                "timestamp": str(start + timedelta(minutes=s, microseconds=u)),
+                "result": "training_session",
+                "mistakes": sum(not d["isCorrect"] for d in session_decisions),
+                "gameType": "blackjack",
+                "training_decisions": session_decisions,
+            }
+            records.append(to_stream_record(item, sequence))
+    return records
+
+
+def load_records(path):
+    records = []
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            payload = json.loads(line)
+            records.extend(payload["Records"] if "Records" in payload else [payload])
+    return records
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--backend", choices=["memory", "sqlite"], default="memory")
+    parser.add_argument("--sqlite-path", default="stream-replay.sqlite3")
+    parser.add_argument("--events", help="JSON-lines file of recorded events/records")
+    parser.add_argument("--record", help="write the synthesized events to this file")
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--decisions", type=int, default=30)
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=21)
+    args = parser.parse_args()
+
+    os.environ["STORAGE_BACKEND"] = args.backend
+    os.environ["SQLITE_PATH"] = args.sqlite_path
+
+    # Imported after the environment is set: config is read at import time.
+    from handlers import stats_stream
+    from utils.database import get_stats_table
+
+    if args.events:
+        records = load_records(args.events)
+    else:
+        records = synthesize(args.users, args.sessions, args.decisions, args.seed)
+    batches = [
+        {"Records": records[i:i + args.batch_size]}
+        for i in range(0, len(records), args.batch_size)
+    ]
+    if args.record:
+        with open(args.record, "w") as f:
+            for batch in batches:
+                f.write(json.dumps(batch) + "\n")
+
+    stats_table = get_stats_table()
+    results = {"backend": args.backend, "records": len(records), "batches": len(batches)}
+    for label in ("first_pass", "replay"):
+        failures = 0
+        elapsed = 0.0
+        for batch in batches:
+            if label == "first_pass":
+                for record in batch["Records"]:
+                    stats_table.put_item(
+                        Item=stats_stream._deserialize_image(record["dynamodb"]["NewImage"])
+                    )
+            start = time.perf_counter()
+            failures += len(stats_stream.consume(batch, None)["batchItemFailures"])
+            elapsed += time.perf_counter() - start
+        results[label] = {
+            "seconds": round(elapsed, 3),
+            "records_per_second": round(len(records) / elapsed, 1) if elapsed else None,
+            "batch_item_failures": failures,
+        }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
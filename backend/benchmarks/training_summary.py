@@ -0,0 +1,99 @@
+"""Load-test training.get_summary / get_progress on a local storage backend.
+
+Seeds one user with N training sessions through stats.save and times the
+read endpoints. Run from the backend directory:
+
+    python -m benchmarks.training_summary --backend memory --sessions 5000
+    python -m benchmarks.training_summary --backend sqlite --sqlite-path /tmp/bench.db
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import time
+
+CATEGORIES = ["hard_total", "soft_total", "pair_split", "surrender", "insurance"]
+ACTIONS = ["hit", "stand", "double", "split", "surrender"]
+
+
+def _decision(rng):
+    category = rng.choice(CATEGORIES)
+    optimal = rng.choice(ACTIONS)
+    user = optimal if rng.random() < 0.8 else rng.choice(ACTIONS)
+    return {
+        "category": category,
+        "scenarioKey": f"{category}_{rng.randint(5, 21)}_vs_{rng.randint(2, 11)}",
+        "userAction": user,
+        "optimalAction": optimal,
+        "isCorrect": user == optimal,
+        "timestamp": rng.randint(1_700_000_000_000, 1_800_000_000_000),
+    }
+
+
+def _time(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--backend", choices=["memory", "sqlite"], default="memory")
+    parser.add_argument("--sqlite-path", default="benchmark.sqlite3")
+    parser.add_argument("--sessions", type=int, default=2000)
+    parser.add_argument("--decisions", type=int, default=40, help="decisions per session")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=21)
+    parser.add_argument("--no-cache", action="store_true", help="disable the in-process result cache")
+    args = parser.parse_args()
+
+    os.environ["STORAGE_BACKEND"] = args.backend
+    os.environ["SQLITE_PATH"] = args.sqlite_path
+    os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+    if args.no_cache:
+        os.environ["RESULT_CACHE_MAX_ENTRIES"] = "0"
+
+    # Imported after the environment is set: config is read at import time.
+    from handlers import stats, training
+    from utils.auth import create_access_token
+    from utils.result_cache import summary_cache
+
+    rng = random.Random(args.seed)
+    user_id = f"bench-{args.seed}-{args.sessions}"
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': user_id})}"}
+
+    start = time.perf_counter()
+    for _ in range(args.sessions):
+        decisions = [_decision(rng) for _ in range(args.decisions)]
+        resp = stats.save({"headers": headers, "body": json.dumps({
+            "result": "training_session",
+            "mistakes": sum(not d["isCorrect"] for d in decisions),
+            "training_decisions": decisions,
+        })}, None)
+        assert resp["statusCode"] == 200, resp
+    seed_ms = (time.perf_counter() - start) * 1000
+
+    event = {"headers": headers, "queryStringParameters": {"game_type": "blackjack"}}
+    summary = json.loads(training.get_summary(event, None)["body"])
+    results = {
+        "backend": args.backend,
+        "sessions": args.sessions,
+        "decisions": args.sessions * args.decisions,
+        "seed_ms_per_save": round(seed_ms / args.sessions, 3),
+        "summary_total_decisions": summary["total_decisions"],
+    }
+    for name, handler in (("get_summary", training.get_summary), ("get_progress", training.get_progress)):
+        samples = _time(lambda: handler(event, None), args.repeat)
+        results[f"{name}_ms_median"] = round(statistics.median(samples), 2)
+        results[f"{name}_ms_max"] = round(max(samples), 2)
+    results["result_cache"] = summary_cache.stats()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -9,11 +9,123 @@ ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
 RESET_TOKEN_EXPIRE_MINUTES = int(os.getenv("RESET_TOKEN_EXPIRE_MINUTES", "5"))
 
+# --- Password Hashing ---
+# bcrypt cost factor (log2 rounds, 4-31) for new hashes. Each step doubles
+# login CPU time; pick the highest cost whose p99 fits the login latency
+# budget on the deployment hardware (python -m benchmarks.password_hashing).
+# Stored hashes with a different cost are rehashed on the next login.
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+
+# --- Refresh Tokens ---
+# POST /auth/refresh trades a refresh token for a new access/refresh pair.
+# Each refresh slides the idle window; the absolute cap forces a real login
+# (and password check) at least every REFRESH_SESSION_MAX_DAYS.
+REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "30"))
+REFRESH_SESSION_MAX_DAYS = int(os.getenv("REFRESH_SESSION_MAX_DAYS", "90"))
+
 # --- DynamoDB Tables ---
 USERS_TABLE = os.getenv("USERS_TABLE", "UsersTable")
 STATS_TABLE = os.getenv("STATS_TABLE", "StatsTable")
 LEARNING_TABLE = os.getenv("LEARNING_TABLE", "LearningTable")
+PLAYER_STATS_TABLE = os.getenv("PLAYER_STATS_TABLE", "PlayerStatsTable")
+IDEMPOTENCY_TABLE = os.getenv("IDEMPOTENCY_TABLE", "IdempotencyTable")
+REFRESH_TOKENS_TABLE = os.getenv("REFRESH_TOKENS_TABLE", "RefreshTokensTable")
 
 # --- SES Email ---
 SES_REGION = os.getenv("SES_REGION", "us-east-1")
 SES_FROM_EMAIL = os.getenv("SES_FROM_EMAIL", "noreply@betmaster21.com")
+
+# --- DynamoDB Client (reused across warm invocations) ---
+DYNAMODB_MAX_POOL_CONNECTIONS = int(os.getenv("DYNAMODB_MAX_POOL_CONNECTIONS", "10"))
+DYNAMODB_TCP_KEEPALIVE = os.getenv("DYNAMODB_TCP_KEEPALIVE", "true").lower() == "true"
+DYNAMODB_CONNECT_TIMEOUT = float(os.getenv("DYNAMODB_CONNECT_TIMEOUT", "2"))
+DYNAMODB_READ_TIMEOUT = float(os.getenv("DYNAMODB_READ_TIMEOUT", "5"))
+DYNAMODB_RETRY_MODE = os.getenv("DYNAMODB_RETRY_MODE", "standard")
+DYNAMODB_MAX_ATTEMPTS = int(os.getenv("DYNAMODB_MAX_ATTEMPTS", "3"))
+
+# --- Storage Backend ---
+# "dynamodb" in production; "memory" or "sqlite" for local runs and benchmarks.
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "dynamodb")
+SQLITE_PATH = os.getenv("SQLITE_PATH", "betmaster21.sqlite3")
+
+# --- Stats Aggregation ---
+# "inline": stats.save updates the player_stats rollup before responding.
+# "stream": the StatsTable stream consumer (handlers/stats_stream.py) does it.
+STATS_AGGREGATION = os.getenv("STATS_AGGREGATION", "inline")
+# Rollup writes are optimistic; a writer that loses the version race
+# re-reads (strongly consistent) after a full-jitter exponential backoff.
+ROLLUP_RETRY_BASE_DELAY = float(os.getenv("ROLLUP_RETRY_BASE_DELAY", "0.02"))
+ROLLUP_RETRY_MAX_DELAY = float(os.getenv("ROLLUP_RETRY_MAX_DELAY", "0.5"))
+
+# --- Training Decisions Encoding ---
+# "compact": stats.save stores training_decisions as one versioned binary
+# attribute (utils/decision_codec.py). "list": the legacy list of maps.
+# Readers accept both, so this can be flipped either way at any time.
+DECISION_ENCODING = os.getenv("DECISION_ENCODING", "compact")
+
+# --- Weakest Scenarios ---
+# /training/summary lists the WEAK_SCENARIO_LIMIT lowest-accuracy scenarios
+# seen at least WEAK_SCENARIO_MIN_SAMPLES times (both overridable per request).
+WEAK_SCENARIO_LIMIT = int(os.getenv("WEAK_SCENARIO_LIMIT", "5"))
+WEAK_SCENARIO_MIN_SAMPLES = int(os.getenv("WEAK_SCENARIO_MIN_SAMPLES", "5"))
+MAX_WEAK_SCENARIO_LIMIT = 50
+
+# --- Weakness Trends ---
+# Each category/scenario counter keeps an EWMA of its error rate and
+# tumbling windows of TREND_WINDOW decisions; the last two complete windows
+# are compared, and a change of at least TREND_THRESHOLD in error rate
+# counts as improving/declining.
+TREND_EWMA_ALPHA = float(os.getenv("TREND_EWMA_ALPHA", "0.1"))
+TREND_WINDOW = int(os.getenv("TREND_WINDOW", "20"))
+TREND_THRESHOLD = float(os.getenv("TREND_THRESHOLD", "0.05"))
+
+# --- Drill Recommendations ---
+# /training/next-drill reads a queue of the weakest scenarios that every
+# rollup write rebuilds (utils/drills.py). DRILL_SAMPLE_PRIOR shrinks error
+# rates measured on few decisions; recently practised scenarios are damped
+# with a DRILL_RECENCY_HOURS half-life.
+DRILL_QUEUE_SIZE = int(os.getenv("DRILL_QUEUE_SIZE", "10"))
+DRILL_SAMPLE_PRIOR = int(os.getenv("DRILL_SAMPLE_PRIOR", "5"))
+DRILL_RECENCY_HOURS = float(os.getenv("DRILL_RECENCY_HOURS", "12"))
+DRILL_SUCCESS_STREAK = int(os.getenv("DRILL_SUCCESS_STREAK", "3"))
+
+# --- Progress Downsampling ---
+# /training/progress?max_points= when the client sends none (the original
+# Limit=500 response cap), and the largest value it may ask for.
+DEFAULT_PROGRESS_POINTS = int(os.getenv("DEFAULT_PROGRESS_POINTS", "500"))
+MAX_PROGRESS_POINTS = int(os.getenv("MAX_PROGRESS_POINTS", "1000"))
+
+# --- Stats Sort Keys ---
+# Sort keys are "<gameType>#<UTC ISO>#<suffix>" (utils/timestamps.py). Until
+# jobs/migrate_stats_sort_keys.py has run, reads also cover the legacy
+# (unprefixed) key range; set to "false" afterwards to skip that query.
+STATS_LEGACY_KEYS = os.getenv("STATS_LEGACY_KEYS", "true").lower() == "true"
+
+# --- Query Paging ---
+# Page size for paginated reads; every page is followed until exhausted.
+QUERY_PAGE_SIZE = int(os.getenv("QUERY_PAGE_SIZE", "500"))
+
+# --- Batch Writes ---
+BATCH_WRITE_MAX_ATTEMPTS = int(os.getenv("BATCH_WRITE_MAX_ATTEMPTS", "6"))
+BATCH_WRITE_BASE_DELAY = float(os.getenv("BATCH_WRITE_BASE_DELAY", "0.05"))
+BATCH_WRITE_MAX_DELAY = float(os.getenv("BATCH_WRITE_MAX_DELAY", "1.0"))
+
+# --- Idempotency ---
+# Completed responses are replayed for this long; an in-progress claim
+# expires sooner so a crashed invocation does not block retries.
+IDEMPOTENCY_TTL_SECONDS = int(os.getenv("IDEMPOTENCY_TTL_SECONDS", "86400"))
+IDEMPOTENCY_IN_PROGRESS_SECONDS = int(os.getenv("IDEMPOTENCY_IN_PROGRESS_SECONDS", "60"))
+
+# --- Result Cache ---
+# Warm containers keep recently computed training summary/progress bodies,
+# keyed by their ETag (user, game type, period, parameters and the data
+# version marker), so an entry can never outlive the data it was built from.
+# 0 entries disables the cache.
+RESULT_CACHE_MAX_ENTRIES = int(os.getenv("RESULT_CACHE_MAX_ENTRIES", "256"))
+RESULT_CACHE_TTL_SECONDS = int(os.getenv("RESULT_CACHE_TTL_SECONDS", "300"))
+
+# --- Claims Cache ---
+# Verified access-token claims, keyed by a SHA-256 digest of the token and
+# held until the token's exp, so warm containers verify each bearer token's
+# signature once. 0 entries disables the cache.
+CLAIMS_CACHE_MAX_ENTRIES = int(os.getenv("CLAIMS_CACHE_MAX_ENTRIES", "1024"))
@@ -2,13 +2,17 @@ import json
 import uuid
 from datetime import datetime, timedelta
 from utils.auth import (
-    get_password_hash, verify_password, create_access_token, ALGORITHM,
-    generate_otp, create_reset_token, verify_reset_token,
+    get_password_hash, verify_password, password_needs_rehash, create_access_token, ALGORITHM,
+    generate_otp, create_reset_token, verify_reset_token, authenticated,
 )
 from utils.email import send_otp_email
 from utils.database import get_users_table
+from utils import refresh_tokens
+from utils.idempotency import idempotent
+from utils.etag import etagged
 
 # --- Lambda Handlers ---
+@idempotent("signup")
 def signup(event, context):
     try:
         body = json.loads(event["body"])
@@ -55,6 +59,20 @@ def signup(event, context):
             "body": json.dumps({"detail": "An unexpected error occurred."}),
         }
 
+def _rehash_password(table, email, old_hash, password):
+    """Re-hash at the current BCRYPT_ROUNDS; never fails the login that triggered it."""
+    try:
+        table.update_item(
+            Key={"email": email},
+            UpdateExpression="SET password = :pw",
+            # Skip if the password changed since we read it
+            ConditionExpression="password = :old",
+            ExpressionAttributeValues={":pw": get_password_hash(password), ":old": old_hash},
+        )
+    except Exception as e:
+        print(f"Password rehash skipped: {e}")
+
+
 def login(event, context):
     try:
         body = json.loads(event["body"])
@@ -82,7 +100,11 @@ def login(event, context):
                 "body": json.dumps({"detail": "Incorrect username or password"}),
             }
 
+        if password_needs_rehash(user["password"]):
+            _rehash_password(table, email, user["password"], password)
+
         access_token = create_access_token(data={"sub": user["id"], "email": email})
+        refresh_token = refresh_tokens.issue(user["id"], email, user.get("token_epoch", 0))
 
         mandatory_details_completed = bool(user.get("mandatory_details_completed", False))
 
@@ -91,6 +113,7 @@ def login(event, context):
             "body": json.dumps({
                 "access_token": access_token,
                 "token_type": "bearer",
+                "refresh_token": refresh_token,
                 "mandatory_details_completed": mandatory_details_completed,
             }),
         }
@@ -123,6 +146,7 @@ def google_auth(event, context):
             # Existing user — generate token and return
             user = response["Item"]
             access_token = create_access_token(data={"sub": user["id"], "email": email})
+            refresh_token = refresh_tokens.issue(user["id"], email, user.get("token_epoch", 0))
             mandatory_details_completed = bool(user.get("mandatory_details_completed", False))
         else:
             # New user — create account without password
@@ -138,12 +162,14 @@ def google_auth(event, context):
                 }
             )
             access_token = create_access_token(data={"sub": user_id, "email": email})
+            refresh_token = refresh_tokens.issue(user_id, email)
 
         return {
             "statusCode": 200,
             "body": json.dumps({
                 "access_token": access_token,
                 "token_type": "bearer",
+                "refresh_token": refresh_token,
                 "mandatory_details_completed": mandatory_details_completed,
             }),
         }
@@ -156,27 +182,10 @@ def google_auth(event, context):
         }
 
 
-def _get_email_from_token(event):
-    """Extract email from the Authorization Bearer token."""
-    from utils.auth import decode_access_token
-    auth_header = event.get("headers", {}).get("authorization", "") or event.get("headers", {}).get("Authorization", "")
-    if not auth_header.startswith("Bearer "):
-        return None
-    token = auth_header[7:]
-    payload = decode_access_token(token)
-    if not payload:
-        return None
-    return payload.get("email")
-
-
-def save_mandatory_details(event, context):
+@authenticated(require="email")
+def save_mandatory_details(event, context, auth):
     try:
-        email = _get_email_from_token(event)
-        if not email:
-            return {
-                "statusCode": 401,
-                "body": json.dumps({"detail": "Unauthorized"}),
-            }
+        email = auth.email
 
         body = json.loads(event["body"])
         first_name = body.get("first_name", "").strip()
@@ -217,14 +226,10 @@ def save_mandatory_details(event, context):
         }
 
 
-def get_mandatory_details(event, context):
+@authenticated(require="email")
+def get_mandatory_details(event, context, auth):
     try:
-        email = _get_email_from_token(event)
-        if not email:
-            return {
-                "statusCode": 401,
-                "body": json.dumps({"detail": "Unauthorized"}),
-            }
+        email = auth.email
 
         table = get_users_table()
         response = table.get_item(Key={"email": email})
@@ -254,11 +259,11 @@ def get_mandatory_details(event, context):
         }
 
 
-def get_profile(event, context):
+@etagged
+@authenticated(require="email")
+def get_profile(event, context, auth):
     try:
-        email = _get_email_from_token(event)
-        if not email:
-            return {"statusCode": 401, "body": json.dumps({"detail": "Unauthorized"})}
+        email = auth.email
 
         table = get_users_table()
         response = table.get_item(Key={"email": email})
@@ -282,11 +287,10 @@ def get_profile(event, context):
         return {"statusCode": 500, "body": json.dumps({"detail": "An unexpected error occurred."})}
 
 
-def update_profile(event, context):
+@authenticated(require="email")
+def update_profile(event, context, auth):
     try:
-        email = _get_email_from_token(event)
-        if not email:
-            return {"statusCode": 401, "body": json.dumps({"detail": "Unauthorized"})}
+        email = auth.email
 
         body = json.loads(event["body"])
         first_name = body.get("first_name", "").strip()
@@ -319,11 +323,10 @@ def update_profile(event, context):
         return {"statusCode": 500, "body": json.dumps({"detail": "An unexpected error occurred."})}
 
 
-def change_password(event, context):
+@authenticated(require="email")
+def change_password(event, context, auth):
     try:
-        email = _get_email_from_token(event)
-        if not email:
-            return {"statusCode": 401, "body": json.dumps({"detail": "Unauthorized"})}
+        email = auth.email
 
         body = json.loads(event["body"])
         new_password = body.get("new_password", "")
@@ -351,19 +354,23 @@ def change_password(event, context):
 
         hashed = get_password_hash(new_password)
         update_expr = "SET password = :pw, updated_at = :ua"
-        expr_values = {":pw": hashed, ":ua": str(datetime.now())}
+        expr_values = {":pw": hashed, ":ua": str(datetime.now()), ":one": 1}
 
         # If Google-only user, also add email to auth_provider
         if auth_provider == "google" and "password" not in user:
             update_expr += ", auth_provider = :ap"
             expr_values[":ap"] = "google,email"
 
-        table.update_item(
+        # Bumping token_epoch revokes every refresh token issued before the
+        # change; this device gets a fresh one so it stays signed in
+        updated = table.update_item(
             Key={"email": email},
-            UpdateExpression=update_expr,
+            UpdateExpression=update_expr + " ADD token_epoch :one",
             ExpressionAttributeValues=expr_values,
+            ReturnValues="UPDATED_NEW",
         )
-        return {"statusCode": 200, "body": json.dumps({"status": "updated"})}
+        refresh_token = refresh_tokens.issue(user["id"], email, updated["Attributes"]["token_epoch"])
+        return {"statusCode": 200, "body": json.dumps({"status": "updated", "refresh_token": refresh_token})}
 
     except Exception as e:
         print(f"Change password error: {e}")
@@ -496,17 +503,22 @@ def reset_password(event, context):
         user = response["Item"]
         hashed = get_password_hash(new_password)
 
-        table.update_item(
+        # Bumping token_epoch revokes every refresh token issued before the reset
+        updated = table.update_item(
             Key={"email": email},
-            UpdateExpression="SET password = :pw, updated_at = :ua",
+            UpdateExpression="SET password = :pw, updated_at = :ua ADD token_epoch :one",
             ExpressionAttributeValues={
                 ":pw": hashed,
                 ":ua": str(datetime.now()),
+                ":one": 1,
             },
+            ReturnValues="UPDATED_NEW",
         )
+        token_epoch = updated["Attributes"]["token_epoch"]
 
         # Auto-login: generate access token
         access_token = create_access_token(data={"sub": user["id"], "email": email})
+        refresh_token = refresh_tokens.issue(user["id"], email, token_epoch)
         mandatory_details_completed = bool(user.get("mandatory_details_completed", False))
 
         return {
@@ -514,6 +526,7 @@ def reset_password(event, context):
             "body": json.dumps({
                 "access_token": access_token,
                 "token_type": "bearer",
+                "refresh_token": refresh_token,
                 "mandatory_details_completed": mandatory_details_completed,
             }),
         }
@@ -521,3 +534,46 @@ def reset_password(event, context):
     except Exception as e:
         print(f"Reset password error: {e}")
         return {"statusCode": 500, "body": json.dumps({"detail": "An unexpected error occurred."})}
+
+
+def refresh(event, context):
+    """POST /auth/refresh {"refresh_token"}: rotate it and issue a new access token."""
+    try:
+        body = json.loads(event.get("body") or "{}")
+        token = body.get("refresh_token") if isinstance(body, dict) else None
+        if not token or not isinstance(token, str):
+            return {"statusCode": 400, "body": json.dumps({"detail": "Refresh token is required."})}
+
+        try:
+            user_id, email, next_token = refresh_tokens.rotate(token)
+        except refresh_tokens.RefreshTokenError as e:
+            return {"statusCode": 401, "body": json.dumps({"detail": str(e)})}
+
+        return {
+            "statusCode": 200,
+            "body": json.dumps({
+                "access_token": create_access_token(data={"sub": user_id, "email": email}),
+                "token_type": "bearer",
+                "refresh_token": next_token,
+            }),
+        }
+
+    except Exception as e:
+        print(f"Refresh error: {e}")
+        return {"statusCode": 500, "body": json.dumps({"detail": "An unexpected error occurred."})}
+
+
+def logout(event, context):
+    """POST /auth/logout {"refresh_token"}: revoke the token's session."""
+    try:
+        body = json.loads(event.get("body") or "{}")
+        token = body.get("refresh_token") if isinstance(body, dict) else None
+        if not token or not isinstance(token, str):
+            return {"statusCode": 400, "body": json.dumps({"detail": "Refresh token is required."})}
+
+        refresh_tokens.revoke(token)
+        return {"statusCode": 200, "body": json.dumps({"status": "logged_out"})}
+
+    except Exception as e:
+        print(f"Logout error: {e}")
+        return {"statusCode": 500, "body": json.dumps({"detail": "An unexpected error occurred."})}
@@ -0,0 +1,41 @@
+"""HTTP API Lambda authorizer for our HS256 access tokens.
+
+Configured in serverless.yml as a REQUEST authorizer with payload format
+2.0 and simple responses, keyed on the Authorization header. API Gateway
+caches each result for ``resultTtlInSeconds``, so a dashboard fanning out
+several requests with one token costs a single verification per TTL
+instead of one per request. Behind it, @authenticated handlers read the
+caller from ``requestContext.authorizer.lambda`` and never decode the
+token themselves.
+
+A cached allow outlives the token by at most the TTL, which is why the TTL
+is kept well below ACCESS_TOKEN_EXPIRE_MINUTES.
+"""
+
+from utils.auth import bearer_token, decode_access_token
+
+
+def _token(event):
+    token = bearer_token(event)
+    if token:
+        return token
+    # identitySource carries the raw header value the cache is keyed on
+    for value in event.get("identitySource") or []:
+        if isinstance(value, str) and value.startswith("Bearer "):
+            return value[7:]
+    return None
+
+
+def authorize(event, context):
+    """Simple response: isAuthorized plus the verified sub/email as context."""
+    token = _token(event)
+    claims = decode_access_token(token) if token else None
+    if not claims or not claims.get("sub"):
+        return {"isAuthorized": False}
+    # Context values must be scalars; leave out claims the token lacks
+    return {
+        "isAuthorized": True,
+        "context": {
+            key: claims[key] for key in ("sub", "email") if isinstance(claims.get(key), str)
+        },
+    }
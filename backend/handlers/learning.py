@@ -14,7 +14,9 @@ from decimal import Decimal
 from datetime import datetime
 from boto3.dynamodb.conditions import Key
 from utils.database import get_learning_table
-from utils.auth import decode_access_token
+from utils.auth import authenticated
+from utils.idempotency import idempotent
+from utils.etag import etagged
 
 
 class DecimalEncoder(json.JSONEncoder):
@@ -27,25 +29,12 @@ class DecimalEncoder(json.JSONEncoder):
         return super().default(obj)
 
 
-def _get_user_id_from_token(event):
-    """Extract user ID (sub) from the Authorization Bearer token."""
-    auth_header = (
-        event.get("headers", {}).get("authorization", "")
-        or event.get("headers", {}).get("Authorization", "")
-    )
-    if not auth_header.startswith("Bearer "):
-        return None
-    token = auth_header[7:]
-    payload = decode_access_token(token)
-    if not payload:
-        return None
-    return payload.get("sub")
-
-
 VALID_SKILL_LEVELS = {"beginner", "amateur", "pro"}
 
 
-def save_progress(event, context):
+@idempotent("learning-progress")
+@authenticated
+def save_progress(event, context, auth):
     """PUT /learning/progress
 
     Save or update learning progress for a specific game.
@@ -58,12 +47,7 @@ def save_progress(event, context):
         completed: bool         — whether the full deck is done
     """
     try:
-        user_id = _get_user_id_from_token(event)
-        if not user_id:
-            return {
-                "statusCode": 401,
-                "body": json.dumps({"detail": "Unauthorized"}),
-            }
+        user_id = auth.user_id
 
         body = json.loads(event["body"])
         game_type = body.get("game_type")
@@ -133,18 +117,15 @@ def save_progress(event, context):
         }
 
 
-def get_progress(event, context):
+@etagged
+@authenticated
+def get_progress(event, context, auth):
     """GET /learning/progress?game_type=blackjack
 
     Returns the user's learning progress for a specific game.
     """
     try:
-        user_id = _get_user_id_from_token(event)
-        if not user_id:
-            return {
-                "statusCode": 401,
-                "body": json.dumps({"detail": "Unauthorized"}),
-            }
+        user_id = auth.user_id
 
         params = event.get("queryStringParameters") or {}
         game_type = params.get("game_type")
@@ -188,18 +169,15 @@ def get_progress(event, context):
         }
 
 
-def get_summary(event, context):
+@etagged
+@authenticated
+def get_summary(event, context, auth):
     """GET /learning/summary
 
     Returns learning progress across all games for the user.
     """
     try:
-        user_id = _get_user_id_from_token(event)
-        if not user_id:
-            return {
-                "statusCode": 401,
-                "body": json.dumps({"detail": "Unauthorized"}),
-            }
+        user_id = auth.user_id
 
         table = get_learning_table()
         result = table.query(
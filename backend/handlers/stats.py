@@ -1,74 +1,249 @@
 import json
-from datetime import datetime
-from utils.database import get_stats_table
-from utils.auth import decode_access_token
-
-
-def _get_user_id_from_token(event):
-    """Extract user ID (sub) from the Authorization Bearer token."""
-    auth_header = (
-        event.get("headers", {}).get("authorization", "")
-        or event.get("headers", {}).get("Authorization", "")
-    )
-    if not auth_header.startswith("Bearer "):
+import re
+from datetime import datetime, timedelta
+from decimal import Decimal
+from utils.database import get_stats_table, batch_put_items, BatchWriteError
+from utils.auth import authenticated
+from utils import player_stats
+from utils import idempotency
+from utils.idempotency import idempotent, MAX_KEY_LENGTH
+from utils import decision_codec
+from utils.decision_columns import counters_of
+from utils.timestamps import new_sort_key
+from config import STATS_AGGREGATION, STATS_TABLE, DECISION_ENCODING
+
+
+VALID_RESULTS = {"win", "loss", "push", "training_session"}
+GAME_TYPE_PATTERN = re.compile(r"[A-Za-z][A-Za-z0-9_-]{0,63}")
+MAX_BATCH_SESSIONS = 100
+
+
+def _build_item(user_id, body, now):
+    """Validate one stats payload and return (item, game_type), or None if invalid."""
+    if not isinstance(body, dict):
+        return None
+    result = body.get("result")
+    mistakes = body.get("mistakes")
+    details = body.get("details")
+    game_type = body.get("game_type") or (
+        details.get("gameType") if isinstance(details, dict) else None
+    ) or "blackjack"
+
+    if result not in VALID_RESULTS or not isinstance(mistakes, int):
         return None
-    token = auth_header[7:]
-    payload = decode_access_token(token)
-    if not payload:
+    # The game type leads the sort key, so it must not contain the separator
+    if not isinstance(game_type, str) or not GAME_TYPE_PATTERN.fullmatch(game_type):
         return None
-    return payload.get("sub")
 
+    item = {
+        "userId": user_id,
+        "timestamp": new_sort_key(game_type, now),
+        "result": result,
+        "mistakes": mistakes,
+        "gameType": game_type,
+    }
 
-VALID_RESULTS = {"win", "loss", "push", "training_session"}
+    # Optional extended fields (backward compatible)
+    if "net_payout" in body and isinstance(body["net_payout"], (int, Decimal)):
+        item["net_payout"] = int(body["net_payout"])
+    if "hands_played" in body and isinstance(body["hands_played"], int):
+        item["hands_played"] = body["hands_played"]
+    if "details" in body and isinstance(body["details"], dict):
+        item["details"] = body["details"]
+    decisions = []
+    if "training_decisions" in body and isinstance(body["training_decisions"], list):
+        decisions = body["training_decisions"]
+        if not all(isinstance(d, dict) for d in decisions):
+            return None
+        # Both become map keys in the stored counters
+        if any(not isinstance(d.get(field) or "", str) for d in decisions for field in ("category", "scenarioKey")):
+            return None
+        if DECISION_ENCODING == "compact" and decisions:
+            item[decision_codec.TRAINING_DECISIONS_BIN] = decision_codec.encode(decisions)
+        else:
+            item["training_decisions"] = decisions
+    # Always present on new items, so readers can tell them from legacy ones
+    item.update(counters_of(decisions))
+    return item, game_type
+
+
+def _session_id(body):
+    """The training client tags each session with details.sessionId."""
+    details = body.get("details")
+    return details.get("sessionId") if isinstance(details, dict) else None
+
+
+def _saved_response():
+    return {
+        "statusCode": 200,
+        "body": json.dumps({"status": "saved"}),
+    }
 
 
-# --- Lambda Handler ---
-def save(event, context):
+def _fold_inline(user_id, game_type, items):
+    """Fold stored items into the rollup without failing the request.
+
+    The items are already in StatsTable, and a 5xx is not recorded by
+    @idempotent, so failing here would make the client resend (and
+    duplicate) them. The rollup is discarded instead and rebuilt from
+    history on its next update or read.
+    """
     try:
-        user_id = _get_user_id_from_token(event)
-        if not user_id:
-            return {
-                "statusCode": 401,
-                "body": json.dumps({"detail": "Unauthorized"}),
-            }
+        player_stats.record_sessions(user_id, game_type, items)
+    except Exception as e:
+        print(f"Stats rollup error: {e}")
+        try:
+            player_stats.discard_profile(user_id, game_type)
+        except Exception as e:
+            print(f"Stats rollup discard error: {e}")
+
 
-        body = json.loads(event["body"])
-        result = body.get("result")
-        mistakes = body.get("mistakes")
+# --- Lambda Handlers ---
+@idempotent("stats", body_key=_session_id)
+@authenticated
+def save(event, context, auth):
+    try:
+        user_id = auth.user_id
 
-        if result not in VALID_RESULTS or not isinstance(mistakes, int):
+        # Decimal keeps fractional values (e.g. details.accuracy) storable in DynamoDB
+        body = json.loads(event["body"], parse_float=Decimal)
+        built = _build_item(user_id, body, datetime.utcnow())
+        if built is None:
             return {
                 "statusCode": 400,
                 "body": json.dumps({"detail": "Invalid stats data."}),
             }
+        item, game_type = built
 
-        item = {
-            "userId": user_id,
-            "timestamp": str(datetime.now()),
-            "result": result,
-            "mistakes": mistakes,
+        table = get_stats_table()
+        table.put_item(Item=item)
+        if STATS_AGGREGATION == "inline":
+            _fold_inline(user_id, game_type, [item])
+
+        return _saved_response()
+
+    except Exception as e:
+        print(f"Save stats error: {e}")
+        return {
+            "statusCode": 500,
+            "body": json.dumps({"detail": "An unexpected error occurred."}),
         }
 
-        # Optional extended fields (backward compatible)
-        if "net_payout" in body and isinstance(body["net_payout"], (int, float)):
-            item["net_payout"] = int(body["net_payout"])
-        if "hands_played" in body and isinstance(body["hands_played"], int):
-            item["hands_played"] = body["hands_played"]
-        if "details" in body and isinstance(body["details"], dict):
-            item["details"] = body["details"]
-        if "training_decisions" in body and isinstance(body["training_decisions"], list):
-            item["training_decisions"] = body["training_decisions"]
 
-        table = get_stats_table()
-        table.put_item(Item=item)
+@idempotent("stats-batch")
+@authenticated
+def save_batch(event, context, auth):
+    """POST /stats/batch
+
+    Bulk upload for clients syncing sessions recorded offline.
+
+    Body:
+        sessions: list — up to MAX_BATCH_SESSIONS payloads, each shaped like
+                         the POST /stats body
+
+    Valid sessions are written with chunked BatchWriteItem calls. A
+    session with a details.sessionId claims the same idempotency key as
+    POST /stats, so one already stored (by an earlier batch or /stats call)
+    is reported as saved without being written again. The response carries
+    one status per input index: "saved", "invalid", "conflict" (the
+    sessionId was stored with a different body), or "failed" (unprocessed
+    after retries, not written because a call errored, or still in flight
+    elsewhere; safe to resend).
+    """
+    try:
+        user_id = auth.user_id
+
+        body = json.loads(event["body"], parse_float=Decimal)
+        sessions = body.get("sessions") if isinstance(body, dict) else None
+        if not isinstance(sessions, list) or not sessions:
+            return {
+                "statusCode": 400,
+                "body": json.dumps({"detail": "sessions must be a non-empty list."}),
+            }
+        if len(sessions) > MAX_BATCH_SESSIONS:
+            return {
+                "statusCode": 400,
+                "body": json.dumps({"detail": f"At most {MAX_BATCH_SESSIONS} sessions per batch."}),
+            }
 
+        now = datetime.utcnow()
+        results = [{"index": i, "status": "invalid"} for i in range(len(sessions))]
+        built = {}
+        claimed = {}
+        first_index = {}
+        repeats = {}
+        for i, session in enumerate(sessions):
+            # Offsetting by the index keeps the batch in upload order
+            entry = _build_item(user_id, session, now + timedelta(microseconds=i))
+            if entry is None:
+                continue
+            session_id = _session_id(session)
+            if not session_id or not isinstance(session_id, str):
+                built[i] = entry
+                continue
+            if len(session_id) > MAX_KEY_LENGTH:
+                continue
+            if session_id in first_index:
+                repeats[i] = first_index[session_id]
+                continue
+            first_index[session_id] = i
+            claim = idempotency.claim("stats", user_id, session_id, session)
+            if claim == "claimed":
+                built[i] = entry
+                claimed[i] = session_id
+            else:
+                results[i]["status"] = {"replayed": "saved", "conflict": "conflict"}.get(claim, "failed")
+
+        try:
+            failed = batch_put_items(STATS_TABLE, [item for item, _ in built.values()])
+        except BatchWriteError as e:
+            if len(e.unwritten) == len(built):
+                for i, session_id in claimed.items():
+                    idempotency.release("stats", user_id, session_id)
+                raise
+            # Earlier chunks are stored: report the rest as failed (and still
+            # fold the stored ones) rather than a 500 whose retry duplicates them
+            print(f"Save stats batch write error: {e}")
+            failed = e.unwritten
+        failed_keys = {item["timestamp"] for item in failed}
+
+        saved_by_game = {}
+        for i, (item, game_type) in built.items():
+            if item["timestamp"] in failed_keys:
+                results[i]["status"] = "failed"
+                if i in claimed:
+                    idempotency.release("stats", user_id, claimed[i])
+            else:
+                results[i]["status"] = "saved"
+                saved_by_game.setdefault(game_type, []).append(item)
+                if i in claimed:
+                    # Lets a later POST /stats of this session replay too
+                    idempotency.complete("stats", user_id, claimed[i], sessions[i], _saved_response())
+        for i, first in repeats.items():
+            same = sessions[i] == sessions[first]
+            results[i]["status"] = results[first]["status"] if same else "conflict"
+
+        if STATS_AGGREGATION == "inline":
+            for game_type, items in saved_by_game.items():
+                _fold_inline(user_id, game_type, items)
+
+        counts = {}
+        for result in results:
+            counts[result["status"]] = counts.get(result["status"], 0) + 1
         return {
             "statusCode": 200,
-            "body": json.dumps({"status": "saved"}),
+            "body": json.dumps({
+                "status": "processed",
+                "saved": counts.get("saved", 0),
+                "failed": counts.get("failed", 0),
+                "invalid": counts.get("invalid", 0),
+                "conflict": counts.get("conflict", 0),
+                "results": results,
+            }),
         }
 
     except Exception as e:
-        print(f"Save stats error: {e}")
+        print(f"Save stats batch error: {e}")
         return {
             "statusCode": 500,
             "body": json.dumps({"detail": "An unexpected error occurred."}),
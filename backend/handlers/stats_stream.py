@@ -0,0 +1,79 @@
+"""StatsTable stream consumer.
+
+Moves player_stats aggregation off the user-facing write path. Each
+DynamoDB Stream batch is grouped by (userId, gameType) and every group is
+applied to its rollup with a single conditional write.
+
+Failures are reported per item (ReportBatchItemFailures): for each group
+that could not be written we return its lowest sequence number, and Lambda
+re-delivers the shard from there. Groups that already succeeded are
+protected from double counting by the per-user ``stream_checkpoint`` kept
+in the rollup item (see utils.player_stats.apply_stream_records).
+
+A failed group also discards its rollup, so it is rebuilt from StatsTable
+(failed records included) by the next read or write even if Lambda gives
+up on the batch. Batches that exhaust their retries are sent to the
+StatsAggregationFailures queue (see technical_documentation.md).
+"""
+
+import base64
+from boto3.dynamodb.types import TypeDeserializer
+from utils import player_stats
+from utils.stats_items import MIGRATED_FROM, game_type_of
+
+_deserializer = TypeDeserializer()
+
+
+def _decode_binary(value):
+    """Lambda delivers B/BS attributes base64-encoded; decode them to bytes."""
+    if "B" in value:
+        return {"B": base64.b64decode(value["B"])}
+    if "BS" in value:
+        return {"BS": [base64.b64decode(b) for b in value["BS"]]}
+    if "M" in value:
+        return {"M": {k: _decode_binary(v) for k, v in value["M"].items()}}
+    if "L" in value:
+        return {"L": [_decode_binary(v) for v in value["L"]]}
+    return value
+
+
+def _deserialize_image(image):
+    return {k: _deserializer.deserialize(_decode_binary(v)) for k, v in image.items()}
+
+
+def _group_records(records):
+    """Group INSERT records into {(userId, gameType): [(sequence, item), ...]}."""
+    groups = {}
+    for record in records:
+        if record.get("eventName") != "INSERT":
+            continue
+        try:
+            stream = record["dynamodb"]
+            item = _deserialize_image(stream["NewImage"])
+            sequence = int(stream["SequenceNumber"])
+            key = (item["userId"], game_type_of(item))
+            if MIGRATED_FROM in item:
+                continue
+        except (KeyError, TypeError, ValueError) as e:
+            # A malformed record can never aggregate; skipping it keeps the
+            # shard from blocking on a poison record.
+            print(f"Stats stream skipped record {record.get('eventID')}: {e}")
+            continue
+        groups.setdefault(key, []).append((sequence, item))
+    return groups
+
+
+def consume(event, context):
+    """DynamoDB Stream handler for StatsTable INSERT events."""
+    failures = []
+    for (user_id, game_type), records in _group_records(event.get("Records", [])).items():
+        try:
+            player_stats.apply_stream_records(user_id, game_type, records)
+        except Exception as e:
+            print(f"Stats stream error for {user_id}: {e}")
+            failures.append({"itemIdentifier": str(min(seq for seq, _ in records))})
+            try:
+                player_stats.discard_profile(user_id, game_type)
+            except Exception as e:
+                print(f"Stats stream discard error for {user_id}: {e}")
+    return {"batchItemFailures": failures}
@@ -1,109 +1,196 @@
 import json
-from boto3.dynamodb.conditions import Key
-from utils.database import get_stats_table
-from utils.auth import decode_access_token
-
-
-def _get_user_id_from_token(event):
-    """Extract user ID (sub) from the Authorization Bearer token."""
-    auth_header = (
-        event.get("headers", {}).get("authorization", "")
-        or event.get("headers", {}).get("Authorization", "")
-    )
-    if not auth_header.startswith("Bearer "):
-        return None
-    token = auth_header[7:]
-    payload = decode_access_token(token)
-    if not payload:
-        return None
-    return payload.get("sub")
-
-
-def get_summary(event, context):
+from utils.auth import authenticated
+from utils import player_stats, drills
+from utils.decision_codec import decisions_of, DECISION_TOTAL, DECISION_CORRECT
+from utils.decision_columns import counters_of
+from utils.stats_items import iter_game_items, range_markers
+from utils.timestamps import period_window, sort_key_time
+from utils.downsample import MODES, BucketDownsampler, lttb
+from utils.etag import make_etag, if_none_match, not_modified, with_etag
+from utils.result_cache import summary_cache
+from config import (
+    WEAK_SCENARIO_LIMIT, WEAK_SCENARIO_MIN_SAMPLES, MAX_WEAK_SCENARIO_LIMIT,
+    MAX_PROGRESS_POINTS, DEFAULT_PROGRESS_POINTS,
+)
+
+
+# Write-time counters stored on each stats item (see stats._build_item),
+# plus the decision payload so items that predate them are counted in memory.
+_PROGRESS_PROJECTION = (
+    "#ts, decision_total, decision_correct, training_decisions, training_decisions_bin"
+)
+_PROGRESS_NAMES = {"#ts": "timestamp"}
+_SUMMARY_PROJECTION = (
+    "#ts, #res, hands_played, mistakes, net_payout, "
+    "decision_total, decision_correct, decision_categories, decision_scenarios, "
+    "training_decisions, training_decisions_bin"
+)
+_SUMMARY_NAMES = {"#ts": "timestamp", "#res": "result"}
+
+
+def _cached_response(response, etag):
+    """Tag a 200 response and remember its body for warm repeats of the request."""
+    summary_cache.put(etag, response["body"])
+    return with_etag(response, etag)
+
+
+def _cached_hit(etag):
+    body = summary_cache.get(etag)
+    return None if body is None else with_etag({"statusCode": 200, "body": body}, etag)
+
+
+def _session_counters(item):
+    """Decision counters for one projected item.
+
+    Items written before the counters existed are counted from their
+    projected decisions. Reads never store the result; that is
+    jobs/backfill_decision_counters.py's job.
+    """
+    if DECISION_TOTAL in item:
+        return item
+    return counters_of(decisions_of(item))
+
+
+def _window_profile(user_id, game_type, window):
+    """Fold the sessions inside ``window`` into a profile shaped like the rollup."""
+    profile = player_stats.empty_profile(user_id, game_type)
+    for item in iter_game_items(user_id, game_type, window, _SUMMARY_PROJECTION, _SUMMARY_NAMES):
+        player_stats.fold_session_counters(profile, item, _session_counters(item))
+    return profile
+
+
+@authenticated
+def get_summary(event, context, auth):
     """GET /training/summary?game_type=blackjack&period=all|week|month
 
-    Aggregates training decisions across stored stats items.
+    period=all (the default) reads the user's materialized player_stats
+    rollup (one GetItem); for users whose rollup has not been built yet it
+    is built once from their full history and stored. week and
+    month (last 7 / 30 days) range-query just that window and fold its
+    write-time counters.
+
+    Responses carry an ETag built from the rollup version (and, for
+    windows, the range's first/last sort keys); a matching If-None-Match
+    gets a 304 before any aggregation runs, and a warm container that
+    already built the response for that tag serves it from
+    utils/result_cache.py.
+
+    weakest_scenarios lists the lowest-accuracy scenarioKeys (e.g.
+    hard_16_vs_10) with at least ``min_samples`` decisions, up to
+    ``scenario_limit`` of them. Category and scenario entries carry an
+    EWMA ``error_rate`` and a ``trend`` read from the rollup.
     Returns overall accuracy, category breakdown, and weakest scenarios.
     """
     try:
-        user_id = _get_user_id_from_token(event)
-        if not user_id:
-            return {
-                "statusCode": 401,
-                "body": json.dumps({"detail": "Unauthorized"}),
-            }
+        user_id = auth.user_id
 
         params = event.get("queryStringParameters") or {}
         game_type = params.get("game_type", "blackjack")
+        period = params.get("period") or "all"
+        try:
+            window = period_window(period)
+        except ValueError:
+            return {
+                "statusCode": 400,
+                "body": json.dumps({"detail": "period must be one of all, week, month."}),
+            }
 
-        table = get_stats_table()
-        response = table.query(
-            KeyConditionExpression=Key("userId").eq(user_id),
-            ScanIndexForward=False,
-            Limit=500,
-        )
-        items = response.get("Items", [])
+        try:
+            scenario_limit = int(params.get("scenario_limit", WEAK_SCENARIO_LIMIT))
+            min_samples = int(params.get("min_samples", WEAK_SCENARIO_MIN_SAMPLES))
+        except ValueError:
+            scenario_limit = min_samples = -1
+        if not 0 <= scenario_limit <= MAX_WEAK_SCENARIO_LIMIT or min_samples < 1:
+            return {
+                "statusCode": 400,
+                "body": json.dumps({
+                    "detail": f"scenario_limit must be 0-{MAX_WEAK_SCENARIO_LIMIT} and min_samples at least 1."
+                }),
+            }
 
-        # Collect all training decisions
-        all_decisions = []
-        for item in items:
-            decisions = item.get("training_decisions", [])
-            if isinstance(decisions, list):
-                all_decisions.extend(decisions)
+        stored = player_stats.get_profile(user_id, game_type)
+        # The rollup version covers period=all; windows (and users without a
+        # rollup yet) also depend on which stats items the range holds.
+        marker = [stored["version"] if stored else None]
+        if window is not None or stored is None:
+            marker.append(range_markers(user_id, game_type, window))
+        etag = make_etag("training-summary", user_id, game_type, period, scenario_limit, min_samples, marker)
+        if if_none_match(event, etag):
+            return not_modified(etag)
+        cached = _cached_hit(etag)
+        if cached:
+            return cached
 
-        if not all_decisions:
-            return {
+        if window is None:
+            profile = stored or player_stats.ensure_profile(user_id, game_type)
+            rollup = profile
+        else:
+            profile = _window_profile(user_id, game_type, window)
+            # Trends describe the player's current direction, whatever the window
+            rollup = stored or player_stats.empty_profile(user_id, game_type)
+        total = int(profile["total_decisions"])
+        correct = int(profile["correct_decisions"])
+        categories = profile["categories"]
+        session_totals = {
+            "sessions": int(profile["total_sessions"]),
+            "hands_played": int(profile["total_hands"]),
+            "net_payout": int(profile["net_payout"]),
+            "results": {k: int(v) for k, v in profile["results"].items()},
+        }
+
+        if total == 0:
+            return _cached_response({
                 "statusCode": 200,
                 "body": json.dumps({
                     "game_type": game_type,
+                    "period": period,
                     "total_decisions": 0,
                     "correct_decisions": 0,
                     "overall_accuracy": 0,
                     "category_stats": [],
                     "weakest_categories": [],
+                    "weakest_scenarios": [],
+                    "session_totals": session_totals,
                 }),
-            }
+            }, etag)
 
-        # Aggregate
-        total = len(all_decisions)
-        correct = sum(1 for d in all_decisions if d.get("isCorrect", False))
         accuracy = correct / total if total > 0 else 0
 
-        # Group by category
-        categories = {}
-        for d in all_decisions:
-            cat = d.get("category", "unknown")
-            if cat not in categories:
-                categories[cat] = {"total": 0, "correct": 0}
-            categories[cat]["total"] += 1
-            if d.get("isCorrect", False):
-                categories[cat]["correct"] += 1
-
         category_stats = []
         for cat, stats in categories.items():
-            cat_accuracy = stats["correct"] / stats["total"] if stats["total"] > 0 else 0
+            cat_total, cat_correct = int(stats["total"]), int(stats["correct"])
+            cat_accuracy = cat_correct / cat_total if cat_total > 0 else 0
             category_stats.append({
                 "category": cat,
-                "total": stats["total"],
-                "correct": stats["correct"],
+                "total": cat_total,
+                "correct": cat_correct,
                 "accuracy": round(cat_accuracy, 4),
+                **player_stats.trend_of(rollup["categories"].get(cat, {})),
             })
 
         # Sort weakest first
         category_stats.sort(key=lambda x: x["accuracy"])
         weakest = [cs["category"] for cs in category_stats[:3]]
 
-        return {
+        return _cached_response({
             "statusCode": 200,
             "body": json.dumps({
                 "game_type": game_type,
+                "period": period,
                 "total_decisions": total,
                 "correct_decisions": correct,
                 "overall_accuracy": round(accuracy, 4),
                 "category_stats": category_stats,
                 "weakest_categories": weakest,
+                "weakest_scenarios": [
+                    {**entry, **player_stats.trend_of(rollup["scenarios"].get(entry["scenario"], {}))}
+                    for entry in player_stats.weakest_scenarios(
+                        profile["scenarios"], scenario_limit, min_samples
+                    )
+                ],
+                "session_totals": session_totals,
             }),
-        }
+        }, etag)
 
     except Exception as e:
         print(f"Training summary error: {e}")
@@ -113,58 +200,163 @@ def get_summary(event, context):
         }
 
 
-def get_progress(event, context):
-    """GET /training/progress?game_type=blackjack
+@authenticated
+def get_progress(event, context, auth):
+    """GET /training/progress?game_type=blackjack&period=all|week|month
+                              &max_points=N&downsample=bucket|lttb|recent
 
     Returns per-session accuracy snapshots for trend visualization.
     Each stats item that has training_decisions becomes one data point.
+    Only the write-time decision counters are read, not the decisions.
+
+    The series always holds at most max_points (default
+    DEFAULT_PROGRESS_POINTS) points; see utils/downsample.py. "bucket"
+    (default) aggregates consecutive sessions while streaming, so shorter
+    histories get one point per session. "lttb" keeps the most
+    shape-preserving original snapshots, and "recent" returns the most
+    recent sessions unaggregated. A matching If-None-Match gets a 304 (see
+    utils/etag.py); bodies are cached per ETag like get_summary's.
     """
     try:
-        user_id = _get_user_id_from_token(event)
-        if not user_id:
-            return {
-                "statusCode": 401,
-                "body": json.dumps({"detail": "Unauthorized"}),
-            }
+        user_id = auth.user_id
 
         params = event.get("queryStringParameters") or {}
         game_type = params.get("game_type", "blackjack")
+        period = params.get("period") or "all"
+        try:
+            window = period_window(period)
+        except ValueError:
+            return {
+                "statusCode": 400,
+                "body": json.dumps({"detail": "period must be one of all, week, month."}),
+            }
 
-        table = get_stats_table()
-        response = table.query(
-            KeyConditionExpression=Key("userId").eq(user_id),
-            ScanIndexForward=True,
-            Limit=500,
+        mode = params.get("downsample") or "bucket"
+        try:
+            max_points = int(params.get("max_points") or DEFAULT_PROGRESS_POINTS)
+        except ValueError:
+            max_points = 0
+        if mode not in MODES or not 2 <= max_points <= MAX_PROGRESS_POINTS:
+            return {
+                "statusCode": 400,
+                "body": json.dumps({
+                    "detail": f"max_points must be 2-{MAX_PROGRESS_POINTS} and downsample one of {', '.join(MODES)}."
+                }),
+            }
+
+        etag = make_etag(
+            "training-progress", user_id, game_type, period, max_points, mode,
+            range_markers(user_id, game_type, window),
         )
-        items = response.get("Items", [])
+        if if_none_match(event, etag):
+            return not_modified(etag)
+        cached = _cached_hit(etag)
+        if cached:
+            return cached
 
         snapshots = []
+        buckets = BucketDownsampler(max_points) if mode == "bucket" else None
+        source_points = 0
+        recent_only = mode == "recent"
+        items = iter_game_items(
+            user_id, game_type, window, _PROGRESS_PROJECTION, _PROGRESS_NAMES, newest_first=recent_only,
+        )
         for item in items:
-            decisions = item.get("training_decisions", [])
-            if not isinstance(decisions, list) or len(decisions) == 0:
+            counters = _session_counters(item)
+            total, correct = int(counters[DECISION_TOTAL]), int(counters[DECISION_CORRECT])
+            if total == 0:
+                continue
+
+            source_points += 1
+            # Sort keys stay internal; clients get the session's ISO time
+            timestamp = sort_key_time(item["timestamp"]).isoformat()
+            if buckets is not None:
+                buckets.add(timestamp, total, correct)
                 continue
 
-            total = len(decisions)
-            correct = sum(1 for d in decisions if d.get("isCorrect", False))
             accuracy = correct / total if total > 0 else 0
 
             snapshots.append({
-                "timestamp": item.get("timestamp", ""),
+                "timestamp": timestamp,
                 "total_decisions": total,
                 "correct_decisions": correct,
                 "overall_accuracy": round(accuracy, 4),
             })
+            if recent_only and len(snapshots) == max_points:
+                break
+
+        if buckets is not None:
+            snapshots = buckets.snapshots()
+        elif recent_only:
+            snapshots.reverse()
+        else:
+            snapshots = lttb(snapshots, max_points, y=lambda s: s["overall_accuracy"])
+        response = {
+            "game_type": game_type,
+            "downsample": mode,
+            "source_points": source_points,
+            "snapshots": snapshots,
+        }
+
+        return _cached_response({
+            "statusCode": 200,
+            "body": json.dumps(response),
+        }, etag)
+
+    except Exception as e:
+        print(f"Training progress error: {e}")
+        return {
+            "statusCode": 500,
+            "body": json.dumps({"detail": "An unexpected error occurred."}),
+        }
+
+
+@authenticated
+def get_next_drill(event, context, auth):
+    """GET /training/next-drill?game_type=blackjack
+
+    Returns the Drill Config for the scenario the player should practise
+    next, plus the scenario keys queued behind it. The queue is rebuilt on
+    every player_stats write (see utils/drills.py), so this is one projected
+    GetItem; only the recency damping is applied here. "drill" is null
+    until the player has missed a drillable scenario.
+    """
+    try:
+        user_id = auth.user_id
+
+        params = event.get("queryStringParameters") or {}
+        game_type = params.get("game_type", "blackjack")
+
+        queue = player_stats.get_drill_queue(user_id, game_type)
+        if queue is None:
+            # Rollups written before the queue existed
+            profile = player_stats.get_profile(user_id, game_type)
+            queue = drills.build_queue(profile["scenarios"]) if profile else []
+        ranked = drills.rank_queue(queue)
+
+        drill = None
+        if ranked:
+            top = ranked[0]
+            drill = {
+                **top["drill"],
+                "scenario": top["scenario"],
+                "total": int(top["total"]),
+                "correct": int(top["correct"]),
+                "accuracy": round(int(top["correct"]) / int(top["total"]), 4),
+                "priority": top["priority"],
+            }
 
         return {
             "statusCode": 200,
             "body": json.dumps({
                 "game_type": game_type,
-                "snapshots": snapshots,
+                "drill": drill,
+                "queue": [entry["scenario"] for entry in ranked[1:]],
             }),
         }
 
     except Exception as e:
-        print(f"Training progress error: {e}")
+        print(f"Next drill error: {e}")
         return {
             "statusCode": 500,
             "body": json.dumps({"detail": "An unexpected error occurred."}),
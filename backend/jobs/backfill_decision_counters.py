@@ -0,0 +1,73 @@
+"""Backfill write-time decision counters onto older StatsTable items.
+
+stats.save stores ``decision_total``/``decision_correct``/
+``decision_categories``/``decision_scenarios`` on every new item, and the
+training read paths project just those. Items written before that have
+none, so reads count their decision payload in memory on every request.
+This job counts each such item once and stores the counters on it. The
+write is conditional on the counters still being absent, so re-running
+the job is harmless. Counters are set with UpdateItem, which the stats
+stream consumer ignores, so the rollup does not count the item twice.
+
+Run from the backend directory with the production environment loaded:
+
+    python -m jobs.backfill_decision_counters --dry-run
+    python -m jobs.backfill_decision_counters --user <userId>
+    python -m jobs.backfill_decision_counters
+"""
+
+import argparse
+import json
+from boto3.dynamodb.conditions import Attr, Key
+from utils.database import get_stats_table
+from utils.decision_codec import DECISION_TOTAL, decisions_of
+from utils.decision_columns import counters_of
+from utils.stats_items import store_counters
+
+
+def iter_uncounted_items(table, user_id=None):
+    """Yield items without counters for one user (query) or the whole table (scan)."""
+    kwargs = {
+        "FilterExpression": Attr(DECISION_TOTAL).not_exists(),
+        "ProjectionExpression": "userId, #ts, training_decisions, training_decisions_bin",
+        "ExpressionAttributeNames": {"#ts": "timestamp"},
+    }
+    if user_id:
+        kwargs["KeyConditionExpression"] = Key("userId").eq(user_id)
+        read = table.query
+    else:
+        read = table.scan
+    while True:
+        page = read(**kwargs)
+        yield from page.get("Items", [])
+        if "LastEvaluatedKey" not in page:
+            return
+        kwargs["ExclusiveStartKey"] = page["LastEvaluatedKey"]
+
+
+def run(user_id=None, dry_run=False):
+    table = get_stats_table()
+    report = {"uncounted_items": 0, "backfilled": 0, "failed": 0}
+    for item in iter_uncounted_items(table, user_id):
+        report["uncounted_items"] += 1
+        if dry_run:
+            continue
+        try:
+            if store_counters(item["userId"], item["timestamp"], counters_of(decisions_of(item))):
+                report["backfilled"] += 1
+        except Exception as e:
+            print(f"Failed to backfill {item['userId']} {item['timestamp']}: {e}")
+            report["failed"] += 1
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--user", help="only backfill this userId")
+    parser.add_argument("--dry-run", action="store_true", help="count uncounted items without writing")
+    args = parser.parse_args()
+    print(json.dumps(run(args.user, args.dry_run), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,312 @@
+"""Export StatsTable and LearningTable to date-partitioned Parquet.
+
+Pages through both tables with Scan and flattens them into four typed
+datasets, Hive-partitioned by UTC date so analysts can prune by day:
+
+    sessions/date=YYYY-MM-DD/part-<run>-NNNNN.parquet  one row per stats item
+    decisions/date=YYYY-MM-DD/...                      one row per training decision
+    learning/date=YYYY-MM-DD/...                       one row per learning item (by updatedAt)
+    quiz_results/date=YYYY-MM-DD/...                   one row per quizResults answer
+
+The known ``details`` fields of training and game sessions become columns;
+the full map is kept in ``details_json``. Rows are buffered per partition;
+a partition is written as a new part file once it holds ``--part-rows``
+rows, and when ``--buffer-rows`` rows are pending overall the largest
+partitions are written first, so memory stays bounded however large the
+tables are without scattering tiny files across every date. ``<run>`` is
+a per-run id, so exporting again into the same output adds files rather
+than overwriting the previous run's.
+
+Run from the backend directory (needs pyarrow, see jobs-requirements.txt).
+Point STATS_TABLE / LEARNING_TABLE at a point-in-time restore to keep the
+scan off the production tables:
+
+    python -m jobs.export_parquet /tmp/export
+    python -m jobs.export_parquet s3://analytics-bucket/betmaster --buffer-rows 200000 --part-rows 50000
+"""
+
+import argparse
+import json
+import os
+import posixpath
+import uuid
+from datetime import datetime, timezone
+from decimal import Decimal
+import pyarrow as pa
+import pyarrow.fs
+import pyarrow.parquet as pq
+from utils.database import get_stats_table, get_learning_table
+from utils.decision_codec import decisions_of
+from utils.stats_items import game_type_of
+from utils.timestamps import sort_key_time
+from config import QUERY_PAGE_SIZE
+
+_TS = pa.timestamp("us", tz="UTC")
+
+SCHEMAS = {
+    "sessions": pa.schema([
+        ("user_id", pa.string()),
+        ("session_key", pa.string()),
+        ("session_time", _TS),
+        ("game_type", pa.string()),
+        ("result", pa.string()),
+        ("mistakes", pa.int64()),
+        ("hands_played", pa.int64()),
+        ("net_payout", pa.int64()),
+        ("decision_total", pa.int64()),
+        ("decision_correct", pa.int64()),
+        ("session_id", pa.string()),
+        ("best_streak", pa.int64()),
+        ("started_at", _TS),
+        ("ended_at", _TS),
+        ("hand_results", pa.list_(pa.string())),
+        ("dealer_cards", pa.list_(pa.string())),
+        ("details_json", pa.string()),
+    ]),
+    "decisions": pa.schema([
+        ("user_id", pa.string()),
+        ("session_key", pa.string()),
+        ("session_time", _TS),
+        ("game_type", pa.string()),
+        ("decision_index", pa.int32()),
+        ("category", pa.string()),
+        ("scenario_key", pa.string()),
+        ("user_action", pa.string()),
+        ("optimal_action", pa.string()),
+        ("is_correct", pa.bool_()),
+        ("decision_time", _TS),
+    ]),
+    "learning": pa.schema([
+        ("user_id", pa.string()),
+        ("game_type", pa.string()),
+        ("skill_level", pa.string()),
+        ("completed", pa.bool_()),
+        ("cards_completed", pa.int64()),
+        ("completed_card_ids", pa.list_(pa.string())),
+        ("quiz_total", pa.int64()),
+        ("quiz_correct", pa.int64()),
+        ("started_at", _TS),
+        ("updated_at", _TS),
+        ("completed_at", _TS),
+    ]),
+    "quiz_results": pa.schema([
+        ("user_id", pa.string()),
+        ("game_type", pa.string()),
+        ("card_id", pa.string()),
+        ("correct", pa.bool_()),
+        ("answered_at", _TS),
+    ]),
+}
+
+
+def _int(value):
+    if isinstance(value, bool) or not isinstance(value, (int, Decimal)):
+        return None
+    return int(value)
+
+
+def _str(value):
+    return value if isinstance(value, str) else None
+
+
+def _epoch_ms(value):
+    """Client epoch-millisecond timestamps as aware datetimes (None if out of range)."""
+    ms = _int(value)
+    if ms is None:
+        return None
+    try:
+        return datetime.fromtimestamp(ms / 1000, timezone.utc)
+    except (OverflowError, ValueError, OSError):
+        return None
+
+
+def _server_time(value):
+    """str(datetime.utcnow()) / ISO strings written by the handlers."""
+    if not isinstance(value, str):
+        return None
+    try:
+        return datetime.fromisoformat(value.rstrip("Z")).replace(tzinfo=timezone.utc)
+    except ValueError:
+        return None
+
+
+def _json_default(value):
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    if isinstance(value, set):
+        return sorted(value)
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def session_rows(item):
+    """(date, sessions row, [decision rows]) for one StatsTable item."""
+    session_time = sort_key_time(item["timestamp"]).replace(tzinfo=timezone.utc)
+    game_type = game_type_of(item)
+    details = item.get("details") if isinstance(item.get("details"), dict) else {}
+    hands = details.get("hands") if isinstance(details.get("hands"), list) else []
+    decisions = decisions_of(item)
+    base = {
+        "user_id": item["userId"],
+        "session_key": item["timestamp"],
+        "session_time": session_time,
+        "game_type": game_type,
+    }
+    session = {
+        **base,
+        "result": _str(item.get("result")),
+        "mistakes": _int(item.get("mistakes")),
+        "hands_played": _int(item.get("hands_played")),
+        "net_payout": _int(item.get("net_payout")),
+        "decision_total": _int(item.get("decision_total", len(decisions))),
+        "decision_correct": _int(item.get(
+            "decision_correct", sum(1 for d in decisions if d.get("isCorrect") is True)
+        )),
+        "session_id": _str(details.get("sessionId")),
+        "best_streak": _int(details.get("bestStreak")),
+        "started_at": _epoch_ms(details.get("startedAt")),
+        "ended_at": _epoch_ms(details.get("endedAt")),
+        "hand_results": [h["result"] for h in hands if isinstance(h, dict) and isinstance(h.get("result"), str)],
+        "dealer_cards": [c for c in details.get("dealer_cards") or [] if isinstance(c, str)],
+        "details_json": json.dumps(details, default=_json_default) if details else None,
+    }
+    decision_rows = [
+        {
+            **base,
+            "decision_index": index,
+            "category": _str(d.get("category")),
+            "scenario_key": _str(d.get("scenarioKey")),
+            "user_action": _str(d.get("userAction")),
+            "optimal_action": _str(d.get("optimalAction")),
+            "is_correct": d["isCorrect"] if isinstance(d.get("isCorrect"), bool) else None,
+            "decision_time": _epoch_ms(d.get("timestamp")),
+        }
+        for index, d in enumerate(decisions)
+    ]
+    return session_time.date().isoformat(), session, decision_rows
+
+
+def learning_rows(item):
+    """(date, learning row, [quiz rows]) for one LearningTable item."""
+    quiz = item.get("quizResults") if isinstance(item.get("quizResults"), dict) else {}
+    cards = [c for c in item.get("completedCardIds") or [] if isinstance(c, str)]
+    updated_at = _server_time(item.get("updatedAt"))
+    base = {"user_id": item["userId"], "game_type": item.get("gameType")}
+    learning = {
+        **base,
+        "skill_level": _str(item.get("skillLevel")),
+        "completed": bool(item.get("completed", False)),
+        "cards_completed": len(cards),
+        "completed_card_ids": cards,
+        "quiz_total": len(quiz),
+        "quiz_correct": sum(1 for q in quiz.values() if isinstance(q, dict) and q.get("correct") is True),
+        "started_at": _server_time(item.get("startedAt")),
+        "updated_at": updated_at,
+        "completed_at": _server_time(item.get("completedAt")),
+    }
+    quiz_rows = [
+        {
+            **base,
+            "card_id": card_id,
+            "correct": result.get("correct") if isinstance(result.get("correct"), bool) else None,
+            "answered_at": _epoch_ms(result.get("answeredAt")),
+        }
+        for card_id, result in quiz.items()
+        if isinstance(result, dict)
+    ]
+    date = updated_at.date().isoformat() if updated_at else "unknown"
+    return date, learning, quiz_rows
+
+
+class PartitionedWriter:
+    """Buffer rows per (dataset, date) and flush them as Parquet part files.
+
+    A partition is written once it holds ``part_rows`` rows (default
+    ``buffer_rows``). When ``buffer_rows`` rows are pending across all
+    partitions, the largest are written until half of that is free.
+    """
+
+    def __init__(self, filesystem, root, buffer_rows, part_rows=None, run_id=None):
+        self.filesystem = filesystem
+        self.root = root
+        self.buffer_rows = buffer_rows
+        self.part_rows = part_rows or buffer_rows
+        self.run_id = run_id or uuid.uuid4().hex
+        self.buffers = {}
+        self.pending = 0
+        self.parts = 0
+        self.rows = {name: 0 for name in SCHEMAS}
+
+    def add(self, dataset, date, rows):
+        if not rows:
+            return
+        buffer = self.buffers.setdefault((dataset, date), [])
+        buffer.extend(rows)
+        self.pending += len(rows)
+        self.rows[dataset] += len(rows)
+        if len(buffer) >= self.part_rows:
+            self._write((dataset, date))
+        if self.pending >= self.buffer_rows:
+            for key in sorted(self.buffers, key=lambda k: len(self.buffers[k]), reverse=True):
+                if self.pending <= self.buffer_rows // 2:
+                    break
+                self._write(key)
+
+    def _write(self, key):
+        dataset, date = key
+        rows = self.buffers.pop(key)
+        self.pending -= len(rows)
+        directory = posixpath.join(self.root, dataset, f"date={date}")
+        self.filesystem.create_dir(directory, recursive=True)
+        table = pa.Table.from_pylist(rows, schema=SCHEMAS[dataset])
+        pq.write_table(
+            table, posixpath.join(directory, f"part-{self.run_id}-{self.parts:05d}.parquet"),
+            filesystem=self.filesystem, compression="zstd",
+        )
+        self.parts += 1
+
+    def flush(self):
+        for key in list(self.buffers):
+            self._write(key)
+
+
+def _scan(table):
+    kwargs = {"Limit": QUERY_PAGE_SIZE}
+    while True:
+        page = table.scan(**kwargs)
+        yield from page.get("Items", [])
+        if "LastEvaluatedKey" not in page:
+            return
+        kwargs["ExclusiveStartKey"] = page["LastEvaluatedKey"]
+
+
+def run(output, buffer_rows=100_000, part_rows=None):
+    """Export both tables under ``output`` (a local path or filesystem URI)."""
+    if "://" not in output:
+        output = os.path.abspath(output)
+    filesystem, root = pyarrow.fs.FileSystem.from_uri(output)
+    writer = PartitionedWriter(filesystem, root, buffer_rows, part_rows)
+    for item in _scan(get_stats_table()):
+        date, session, decisions = session_rows(item)
+        writer.add("sessions", date, [session])
+        writer.add("decisions", date, decisions)
+    for item in _scan(get_learning_table()):
+        date, learning, quiz = learning_rows(item)
+        writer.add("learning", date, [learning])
+        writer.add("quiz_results", date, quiz)
+    writer.flush()
+    return {"run_id": writer.run_id, "rows": writer.rows, "files": writer.parts}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("output", help="local directory or filesystem URI, e.g. s3://bucket/prefix")
+    parser.add_argument("--buffer-rows", type=int, default=100_000,
+                        help="write the largest partitions once this many rows are buffered")
+    parser.add_argument("--part-rows", type=int,
+                        help="write a partition once it holds this many rows (default: --buffer-rows)")
+    args = parser.parse_args()
+    print(json.dumps(run(args.output, args.buffer_rows, args.part_rows), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""Re-key legacy StatsTable items into game-partitioned sort keys.
+
+Items written before sort keys carried the game type (see
+utils/timestamps.py) are copied to ``<gameType>#<UTC ISO>#<suffix>`` and
+the original is deleted. The suffix is derived from the old key, so the
+job is idempotent: re-running it after an interruption finishes the items
+it had copied but not yet deleted. Copies carry ``migratedFrom`` so the
+stream consumer does not count them a second time, and the write-time
+decision counters, so training reads never refetch their decisions.
+
+Run from the backend directory with the production environment loaded:
+
+    python -m jobs.migrate_stats_sort_keys --dry-run
+    python -m jobs.migrate_stats_sort_keys --user <userId>
+    python -m jobs.migrate_stats_sort_keys
+
+Once a full run reports nothing left, set STATS_LEGACY_KEYS=false so
+reads stop querying the legacy range.
+"""
+
+import argparse
+import hashlib
+import json
+from boto3.dynamodb.conditions import Attr, Key
+from botocore.exceptions import ClientError
+from utils.database import get_stats_table
+from utils.decision_codec import DECISION_TOTAL, decisions_of
+from utils.decision_columns import counters_of
+from utils.stats_items import MIGRATED_FROM, game_type_of
+from utils.timestamps import LEGACY_KEY_END, is_legacy_key, new_sort_key, sort_key_time
+
+
+def migrated_key(item):
+    """The game-partitioned sort key for a legacy item."""
+    old = item["timestamp"]
+    parts = old.split("#")
+    suffix = parts[1] if len(parts) > 1 else hashlib.sha256(old.encode()).hexdigest()[:8]
+    return new_sort_key(game_type_of(item), sort_key_time(old), suffix)
+
+
+def iter_legacy_items(table, user_id=None):
+    """Yield legacy items for one user (query) or the whole table (scan)."""
+    if user_id:
+        kwargs = {
+            "KeyConditionExpression": Key("userId").eq(user_id) & Key("timestamp").lt(LEGACY_KEY_END),
+        }
+        read = table.query
+    else:
+        kwargs = {"FilterExpression": Attr("timestamp").lt(LEGACY_KEY_END)}
+        read = table.scan
+    while True:
+        page = read(**kwargs)
+        for item in page.get("Items", []):
+            if is_legacy_key(item["timestamp"]):
+                yield item
+        if "LastEvaluatedKey" not in page:
+            return
+        kwargs["ExclusiveStartKey"] = page["LastEvaluatedKey"]
+
+
+def migrate_item(table, item):
+    """Copy one item to its new key, then delete the original."""
+    old = item["timestamp"]
+    copy = {
+        **item,
+        "timestamp": migrated_key(item),
+        "gameType": game_type_of(item),
+        MIGRATED_FROM: old,
+    }
+    if DECISION_TOTAL not in copy:
+        copy.update(counters_of(decisions_of(item)))
+    try:
+        table.put_item(Item=copy, ConditionExpression=Attr("userId").not_exists())
+    except ClientError as e:
+        # Already copied by an earlier, interrupted run
+        if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+            raise
+    table.delete_item(Key={"userId": item["userId"], "timestamp": old})
+    return copy["timestamp"]
+
+
+def run(user_id=None, dry_run=False):
+    table = get_stats_table()
+    report = {"legacy_items": 0, "migrated": 0, "failed": 0}
+    for item in iter_legacy_items(table, user_id):
+        report["legacy_items"] += 1
+        if dry_run:
+            continue
+        try:
+            migrate_item(table, item)
+            report["migrated"] += 1
+        except Exception as e:
+            print(f"Failed to migrate {item['userId']} {item['timestamp']}: {e}")
+            report["failed"] += 1
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--user", help="only migrate this userId")
+    parser.add_argument("--dry-run", action="store_true", help="count legacy items without writing")
+    args = parser.parse_args()
+    print(json.dumps(run(args.user, args.dry_run), indent=2))
+
+
+if __name__ == "__main__":
+    main()
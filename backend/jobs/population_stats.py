@@ -0,0 +1,206 @@
+"""Population-wide training analytics over StatsTable.
+
+Scans the whole table with DynamoDB parallel Scan: the key space is split
+into ``--segments`` segments, each scanned by a worker process into a
+mergeable ``PopulationAggregate`` (plain counters and a set of user ids),
+and the partials are merged into one report per game type: distinct
+players, session and hand volume, population accuracy per category, the
+hardest scenarios and sessions per day.
+
+Sessions with write-time decision counters are folded from those; older
+items have their decisions decoded and counted through
+utils/decision_columns.py.
+
+Run from the backend directory on a host with enough read capacity
+(process pools are not available inside Lambda):
+
+    python -m jobs.population_stats --segments 16 --workers 8
+    python -m jobs.population_stats --game-type blackjack --output /tmp/population.json
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from utils.database import get_stats_table
+from utils.decision_codec import (
+    DECISION_TOTAL, DECISION_CORRECT, DECISION_CATEGORIES, DECISION_SCENARIOS,
+)
+from utils.decision_columns import DecisionColumns
+from utils.player_stats import weakest_scenarios
+from utils.stats_items import game_type_of
+from utils.timestamps import sort_key_time
+from config import QUERY_PAGE_SIZE
+
+_SCAN_PROJECTION = (
+    "userId, #ts, #res, hands_played, gameType, #det.gameType, "
+    "decision_total, decision_correct, decision_categories, decision_scenarios, "
+    "training_decisions, training_decisions_bin"
+)
+_SCAN_NAMES = {"#ts": "timestamp", "#res": "result", "#det": "details"}
+
+
+def _add_counts(target, source):
+    for key, stats in source.items():
+        entry = target.setdefault(key, {"total": 0, "correct": 0})
+        entry["total"] += int(stats["total"])
+        entry["correct"] += int(stats["correct"])
+
+
+class PopulationAggregate:
+    """Partial aggregate for one game type; ``merge`` is associative."""
+
+    def __init__(self):
+        self.users = set()
+        self.sessions = 0
+        self.hands = 0
+        self.results = {}
+        self.days = {}
+        self.counters = {
+            DECISION_TOTAL: 0, DECISION_CORRECT: 0,
+            DECISION_CATEGORIES: {}, DECISION_SCENARIOS: {},
+        }
+
+    def add_session(self, item):
+        """Count one item's session fields (decisions are added separately)."""
+        self.users.add(item["userId"])
+        self.sessions += 1
+        self.hands += int(item.get("hands_played", 0))
+        result = item.get("result")
+        if result:
+            self.results[result] = self.results.get(result, 0) + 1
+        day = sort_key_time(item["timestamp"]).date().isoformat()
+        self.days[day] = self.days.get(day, 0) + 1
+
+    def add_counters(self, counters):
+        self.counters[DECISION_TOTAL] += int(counters[DECISION_TOTAL])
+        self.counters[DECISION_CORRECT] += int(counters[DECISION_CORRECT])
+        _add_counts(self.counters[DECISION_CATEGORIES], counters.get(DECISION_CATEGORIES, {}))
+        _add_counts(self.counters[DECISION_SCENARIOS], counters.get(DECISION_SCENARIOS, {}))
+
+    def merge(self, other):
+        self.users |= other.users
+        self.sessions += other.sessions
+        self.hands += other.hands
+        for target, source in ((self.results, other.results), (self.days, other.days)):
+            for key, count in source.items():
+                target[key] = target.get(key, 0) + count
+        self.add_counters(other.counters)
+        return self
+
+    def report(self, scenario_limit, min_samples):
+        total = self.counters[DECISION_TOTAL]
+        correct = self.counters[DECISION_CORRECT]
+        categories = [
+            {**stats, "category": key, "accuracy": round(stats["correct"] / stats["total"], 4)}
+            for key, stats in self.counters[DECISION_CATEGORIES].items()
+        ]
+        categories.sort(key=lambda c: c["accuracy"])
+        return {
+            "players": len(self.users),
+            "sessions": self.sessions,
+            "hands_played": self.hands,
+            "results": self.results,
+            "total_decisions": total,
+            "correct_decisions": correct,
+            "overall_accuracy": round(correct / total, 4) if total else 0,
+            "category_stats": categories,
+            "hardest_scenarios": weakest_scenarios(
+                self.counters[DECISION_SCENARIOS], scenario_limit, min_samples
+            ),
+            "sessions_per_day": dict(sorted(self.days.items())),
+        }
+
+
+def _fold_page(partials, items, game_type):
+    legacy = {}
+    for item in items:
+        game = game_type_of(item)
+        if game_type and game != game_type:
+            continue
+        aggregate = partials.get(game)
+        if aggregate is None:
+            aggregate = partials[game] = PopulationAggregate()
+        aggregate.add_session(item)
+        if DECISION_TOTAL in item:
+            aggregate.add_counters(item)
+        else:
+            legacy.setdefault(game, []).append(item)
+    for game, game_items in legacy.items():
+        partials[game].add_counters(DecisionColumns.from_items(game_items).counters())
+
+
+def scan_segment(segment, total_segments, game_type=None):
+    """Scan one parallel-scan segment into {game_type: PopulationAggregate}."""
+    table = get_stats_table()
+    kwargs = {
+        "Segment": segment,
+        "TotalSegments": total_segments,
+        "ProjectionExpression": _SCAN_PROJECTION,
+        "ExpressionAttributeNames": _SCAN_NAMES,
+        "Limit": QUERY_PAGE_SIZE,
+    }
+    partials = {}
+    while True:
+        page = table.scan(**kwargs)
+        _fold_page(partials, page.get("Items", []), game_type)
+        if "LastEvaluatedKey" not in page:
+            return partials
+        kwargs["ExclusiveStartKey"] = page["LastEvaluatedKey"]
+
+
+def _scan_segment_args(args):
+    return scan_segment(*args)
+
+
+def merge_partials(partials):
+    merged = {}
+    for partial in partials:
+        for game, aggregate in partial.items():
+            if game in merged:
+                merged[game].merge(aggregate)
+            else:
+                merged[game] = aggregate
+    return merged
+
+
+def run(segments=8, workers=None, game_type=None, scenario_limit=20, min_samples=50):
+    """Scan every segment (in worker processes unless workers <= 1) and report."""
+    tasks = [(segment, segments, game_type) for segment in range(segments)]
+    if workers is not None and workers <= 1:
+        partials = map(_scan_segment_args, tasks)
+        merged = merge_partials(partials)
+    else:
+        # spawn: boto3 sessions and the table registry must not cross a fork
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+            merged = merge_partials(pool.map(_scan_segment_args, tasks))
+    return {
+        game: aggregate.report(scenario_limit, min_samples)
+        for game, aggregate in sorted(merged.items())
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--segments", type=int, default=8, help="parallel scan TotalSegments")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="worker processes")
+    parser.add_argument("--game-type", help="only report this game type")
+    parser.add_argument("--scenario-limit", type=int, default=20)
+    parser.add_argument("--min-samples", type=int, default=50)
+    parser.add_argument("--output", help="write the report here instead of stdout")
+    args = parser.parse_args()
+
+    report = json.dumps(run(
+        args.segments, args.workers, args.game_type, args.scenario_limit, args.min_samples,
+    ), indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(report)
+    else:
+        print(report)
+
+
+if __name__ == "__main__":
+    main()
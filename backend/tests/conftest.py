@@ -20,6 +20,9 @@ from jose import jwt
 TEST_ENV = {
     "USERS_TABLE": "TestUsersTable",
     "STATS_TABLE": "TestStatsTable",
+    "PLAYER_STATS_TABLE": "TestPlayerStatsTable",
+    "IDEMPOTENCY_TABLE": "TestIdempotencyTable",
+    "REFRESH_TOKENS_TABLE": "TestRefreshTokensTable",
     "LEARNING_TABLE": "TestLearningTable",
     "SECRET_KEY": "test-secret-key",
     "APP_NAME": "TestApp",
@@ -54,6 +57,30 @@ def dynamodb_tables():
                 ],
                 BillingMode="PAY_PER_REQUEST",
             )
+            dynamodb.create_table(
+                TableName="TestPlayerStatsTable",
+                KeySchema=[
+                    {"AttributeName": "userId", "KeyType": "HASH"},
+                    {"AttributeName": "gameType", "KeyType": "RANGE"},
+                ],
+                AttributeDefinitions=[
+                    {"AttributeName": "userId", "AttributeType": "S"},
+                    {"AttributeName": "gameType", "AttributeType": "S"},
+                ],
+                BillingMode="PAY_PER_REQUEST",
+            )
+            dynamodb.create_table(
+                TableName="TestIdempotencyTable",
+                KeySchema=[{"AttributeName": "idempotencyKey", "KeyType": "HASH"}],
+                AttributeDefinitions=[{"AttributeName": "idempotencyKey", "AttributeType": "S"}],
+                BillingMode="PAY_PER_REQUEST",
+            )
+            dynamodb.create_table(
+                TableName="TestRefreshTokensTable",
+                KeySchema=[{"AttributeName": "tokenHash", "KeyType": "HASH"}],
+                AttributeDefinitions=[{"AttributeName": "tokenHash", "AttributeType": "S"}],
+                BillingMode="PAY_PER_REQUEST",
+            )
             dynamodb.create_table(
                 TableName="TestLearningTable",
                 KeySchema=[
@@ -70,10 +97,12 @@ def dynamodb_tables():
             # Reload modules inside mock_aws so boto3 resources use moto
             import config
             from utils import database as db_utils
+            from utils import idempotency as idempotency_utils
             from utils import auth as auth_utils
             from utils import email as email_utils
             from handlers import auth as auth_handlers
             from handlers import stats as stats_handlers
+            from handlers import stats_stream as stats_stream_handlers
             from handlers import training as training_handlers
             from handlers import learning as learning_handlers
             from importlib import reload
@@ -82,14 +111,17 @@ def dynamodb_tables():
             reload(auth_utils)
             reload(email_utils)
             reload(db_utils)
+            reload(idempotency_utils)
             reload(auth_handlers)
             reload(stats_handlers)
+            reload(stats_stream_handlers)
             reload(training_handlers)
             reload(learning_handlers)
 
             yield {
                 "auth": auth_handlers,
                 "stats": stats_handlers,
+                "stats_stream": stats_stream_handlers,
                 "training": training_handlers,
                 "learning": learning_handlers,
                 "dynamodb": dynamodb,
@@ -0,0 +1,249 @@
+"""Tests for token verification, @authenticated, password rehashing and refresh tokens."""
+
+import json
+import time
+import boto3
+from datetime import datetime, timedelta
+from unittest.mock import patch
+from jose import jwt
+from passlib.context import CryptContext
+from utils import auth, refresh_tokens
+from tests.conftest import signup_and_login, signup_user, login_user, make_auth_event, make_authorizer_event
+from config import SECRET_KEY, ALGORITHM
+
+# conftest reloads utils.auth, so always go through the module attributes.
+
+
+def _event(headers):
+    return {"headers": headers}
+
+
+def test_repeat_tokens_skip_verification():
+    auth.claims_cache.clear()
+    token = auth.create_access_token({"sub": "user-1", "email": "a@example.com"})
+    with patch.object(auth.jwt, "decode", wraps=jwt.decode) as decode:
+        for _ in range(3):
+            assert auth.decode_access_token(token)["sub"] == "user-1"
+    assert decode.call_count == 1
+    stats = auth.claims_cache.stats()
+    assert (stats["hits"], stats["misses"], stats["size"]) == (2, 1, 1)
+
+
+def test_cached_claims_are_copies():
+    auth.claims_cache.clear()
+    token = auth.create_access_token({"sub": "user-1"})
+    auth.decode_access_token(token)["sub"] = "someone-else"
+    assert auth.decode_access_token(token)["sub"] == "user-1"
+
+
+def test_invalid_and_expired_tokens_are_not_cached():
+    auth.claims_cache.clear()
+    token = auth.create_access_token({"sub": "user-1"})
+    assert auth.decode_access_token(token[:-2] + "xx") is None
+    expired = jwt.encode(
+        {"sub": "user-1", "exp": datetime.utcnow() - timedelta(seconds=1)},
+        SECRET_KEY, algorithm=ALGORITHM,
+    )
+    assert auth.decode_access_token(expired) is None
+    assert auth.claims_cache.stats()["size"] == 0
+
+
+def test_entries_expire_with_the_token():
+    auth.claims_cache.clear()
+    token = auth.create_access_token({"sub": "user-1"})
+    exp = jwt.get_unverified_claims(token)["exp"]
+    with patch.object(auth.time, "time", return_value=exp - 0.5):
+        auth.decode_access_token(token)
+    (expires_at, _), = auth.claims_cache._entries.values()
+    assert 0 < expires_at - auth.claims_cache.clock() <= 0.5
+
+
+def test_auth_context_from_bearer_token():
+    token = auth.create_access_token({"sub": "user-1", "email": "a@example.com"})
+    context = auth.get_auth_context(_event({"authorization": f"Bearer {token}"}))
+    assert (context.user_id, context.email, context.source) == ("user-1", "a@example.com", "token")
+    assert auth.get_auth_context(_event({"Authorization": token})) is None
+    assert auth.get_auth_context({"headers": None}) is None
+    assert auth.get_auth_context({}) is None
+
+
+def test_authorizer_claims_win_without_local_verification():
+    event = make_authorizer_event("user-1")
+    event["headers"] = {"Authorization": "Bearer not-a-jwt"}
+    with patch.object(auth.jwt, "decode") as decode:
+        context = auth.get_auth_context(event)
+    decode.assert_not_called()
+    assert (context.user_id, context.source) == ("user-1", "authorizer")
+
+
+def test_authenticated_rejects_missing_identity():
+    @auth.authenticated(require="email")
+    def handler(event, context, caller):
+        return {"statusCode": 200, "body": caller.email}
+
+    assert handler({}, None)["statusCode"] == 401
+    # Authorizer claims without an email claim do not satisfy require="email"
+    assert handler(make_authorizer_event("user-1"), None)["statusCode"] == 401
+    token = auth.create_access_token({"sub": "user-1", "email": "a@example.com"})
+    assert handler(make_auth_event(token), None)["body"] == "a@example.com"
+
+
+def test_handlers_accept_authorizer_events(dynamodb_tables, mock_context):
+    h, ctx = dynamodb_tables, mock_context
+    token, user_id, _ = signup_and_login(h, ctx)
+    session = {"result": "win", "mistakes": 0, "hands_played": 3, "details": {"gameType": "blackjack"}}
+    assert h["stats"].save(make_authorizer_event(user_id, session), ctx)["statusCode"] == 200
+
+    via_gateway = make_authorizer_event(user_id)
+    via_gateway["queryStringParameters"] = {"game_type": "blackjack"}
+    via_token = make_auth_event(token, query_params={"game_type": "blackjack"})
+    gateway_body = json.loads(h["training"].get_summary(via_gateway, ctx)["body"])
+    token_body = json.loads(h["training"].get_summary(via_token, ctx)["body"])
+    assert gateway_body == token_body
+    assert gateway_body["session_totals"]["sessions"] == 1
+
+
+def _seed_user(hashed):
+    from utils.database import get_users_table
+    get_users_table().put_item(Item={"id": "user-1", "email": "old@example.com", "password": hashed})
+    return get_users_table()
+
+
+def test_login_rehashes_outdated_cost(dynamodb_tables, mock_context):
+    h, ctx = dynamodb_tables, mock_context
+    old_hash = CryptContext(schemes=["bcrypt"], bcrypt__rounds=4).hash("testpass123")
+    table = _seed_user(old_hash)
+    assert auth.password_needs_rehash(old_hash)
+
+    assert login_user(h, ctx, "old@example.com")["statusCode"] == 200
+    new_hash = table.get_item(Key={"email": "old@example.com"})["Item"]["password"]
+    assert new_hash != old_hash
+    assert not auth.password_needs_rehash(new_hash)
+    assert auth.verify_password("testpass123", new_hash)
+
+    # Current-cost hashes are left alone
+    assert login_user(h, ctx, "old@example.com")["statusCode"] == 200
+    assert table.get_item(Key={"email": "old@example.com"})["Item"]["password"] == new_hash
+
+
+def test_failed_rehash_does_not_fail_login(dynamodb_tables, mock_context):
+    h, ctx = dynamodb_tables, mock_context
+    _seed_user(CryptContext(schemes=["bcrypt"], bcrypt__rounds=4).hash("testpass123"))
+    with patch.object(h["auth"], "get_password_hash", side_effect=RuntimeError("boom")):
+        assert login_user(h, ctx, "old@example.com")["statusCode"] == 200
+    # A wrong password never triggers a rehash
+    with patch.object(h["auth"], "_rehash_password") as rehash:
+        assert login_user(h, ctx, "old@example.com", "wrong-pass")["statusCode"] == 401
+    rehash.assert_not_called()
+
+
+def _refresh(h, ctx, token):
+    return h["auth"].refresh({"body": json.dumps({"refresh_token": token})}, ctx)
+
+
+def _login_tokens(h, ctx):
+    signup_user(h, ctx)
+    body = json.loads(login_user(h, ctx)["body"])
+    return body["access_token"], body["refresh_token"]
+
+
+def test_refresh_rotates_and_issues_access_token(dynamodb_tables, mock_context):
+    h, ctx = dynamodb_tables, mock_context
+    access, refresh = _login_tokens(h, ctx)
+    with patch.object(h["auth"], "verify_password") as verify:
+        resp = _refresh(h, ctx, refresh)
+    verify.assert_not_called()
+    assert resp["statusCode"] == 200
+    body = json.loads(resp["body"])
+    assert body["refresh_token"] != refresh
+    new_claims = auth.decode_access_token(body["access_token"])
+    old_claims = auth.decode_access_token(access)
+    assert (new_claims["sub"], new_claims["email"]) == (old_claims["sub"], old_claims["email"])
+    # Only digests are stored
+    table = boto3.resource("dynamodb").Table("TestRefreshTokensTable")
+    stored = {item["tokenHash"] for item in table.scan()["Items"]}
+    assert refresh not in stored and body["refresh_token"] not in stored
+
+    assert _refresh(h, ctx, body["refresh_token"])["statusCode"] == 200
+
+
+def test_reused_refresh_token_revokes_the_family(dynamodb_tables, mock_context):
+    h, ctx = dynamodb_tables, mock_context
+    _, stolen = _login_tokens(h, ctx)
+    legitimate = json.loads(_refresh(h, ctx, stolen)["body"])["refresh_token"]
+
+    reuse = _refresh(h, ctx, stolen)
+    assert reuse["statusCode"] == 401
+    assert json.loads(reuse["body"])["detail"] == "Refresh token was already used."
+    # The successor dies with its family
+    assert _refresh(h, ctx, legitimate)["statusCode"] == 401
+    # Other sessions (a second login) are unaffected
+    other = json.loads(login_user(h, ctx)["body"])["refresh_token"]
+    assert _refresh(h, ctx, other)["statusCode"] == 200
+
+
+def test_refresh_rejects_unknown_expired_and_logged_out_tokens(dynamodb_tables, mock_context):
+    h, ctx = dynamodb_tables, mock_context
+    _, refresh = _login_tokens(h, ctx)
+    assert _refresh(h, ctx, "not-a-token")["statusCode"] == 401
+    assert h["auth"].refresh({"body": "{}"}, ctx)["statusCode"] == 400
+    with patch.object(refresh_tokens.time, "time", return_value=time.time() + 31 * 86400):
+        assert _refresh(h, ctx, refresh)["statusCode"] == 401
+
+    logout = h["auth"].logout({"body": json.dumps({"refresh_token": refresh})}, ctx)
+    assert logout["statusCode"] == 200
+    assert _refresh(h, ctx, refresh)["statusCode"] == 401
+
+
+def test_sliding_window_is_capped_by_session_lifetime(dynamodb_tables, mock_context):
+    h, ctx = dynamodb_tables, mock_context
+    _, token = _login_tokens(h, ctx)
+    start = time.time()
+    # Refresh every 25 days: each refresh slides the 30-day idle window...
+    for days in (25, 50, 75):
+        with patch.object(refresh_tokens.time, "time", return_value=start + days * 86400):
+            resp = _refresh(h, ctx, token)
+        assert resp["statusCode"] == 200
+        token = json.loads(resp["body"])["refresh_token"]
+    # ...but never past 90 days after the login
+    with patch.object(refresh_tokens.time, "time", return_value=start + 91 * 86400):
+        assert _refresh(h, ctx, token)["statusCode"] == 401
+
+
+def test_password_change_revokes_every_session(dynamodb_tables, mock_context):
+    h, ctx = dynamodb_tables, mock_context
+    access, first = _login_tokens(h, ctx)
+    second = json.loads(login_user(h, ctx)["body"])["refresh_token"]
+    rotated = json.loads(_refresh(h, ctx, first)["body"])["refresh_token"]
+
+    resp = h["auth"].change_password(make_auth_event(access, body={
+        "current_password": "testpass123", "new_password": "newpass1234",
+    }), ctx)
+    assert resp["statusCode"] == 200
+    own = json.loads(resp["body"])["refresh_token"]
+    for token in (rotated, second):
+        revoked = _refresh(h, ctx, token)
+        assert revoked["statusCode"] == 401
+        assert json.loads(revoked["body"])["detail"] == "Refresh token has been revoked."
+    # The device that changed it, and new logins, get sessions under the new epoch
+    assert _refresh(h, ctx, own)["statusCode"] == 200
+    fresh = json.loads(login_user(h, ctx, password="newpass1234")["body"])["refresh_token"]
+    assert _refresh(h, ctx, fresh)["statusCode"] == 200
+
+
+def test_password_reset_revokes_every_session(dynamodb_tables, mock_context):
+    h, ctx = dynamodb_tables, mock_context
+    _, stolen = _login_tokens(h, ctx)
+    email = "test@example.com"
+    otp = json.loads(h["auth"].forgot_password({"body": json.dumps({"email": email})}, ctx)["body"])["dev_otp"]
+    reset_token = json.loads(h["auth"].verify_otp(
+        {"body": json.dumps({"email": email, "otp": otp})}, ctx
+    )["body"])["reset_token"]
+
+    resp = h["auth"].reset_password({"body": json.dumps({
+        "reset_token": reset_token, "new_password": "newpass1234",
+    })}, ctx)
+    assert resp["statusCode"] == 200
+    assert _refresh(h, ctx, stolen)["statusCode"] == 401
+    # The auto-login session issued by the reset keeps working
+    assert _refresh(h, ctx, json.loads(resp["body"])["refresh_token"])["statusCode"] == 200
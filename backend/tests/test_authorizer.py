@@ -0,0 +1,55 @@
+"""Tests for the HTTP API Lambda authorizer (handlers/authorizer.py)."""
+
+from unittest.mock import patch
+from handlers import authorizer
+from utils import auth
+
+
+def _request(headers=None, identity_source=None):
+    """A payload format 2.0 REQUEST authorizer event."""
+    event = {"type": "REQUEST", "routeArn": "arn:aws:execute-api:us-east-1:123:api/$default/GET/stats"}
+    if headers is not None:
+        event["headers"] = headers
+    if identity_source is not None:
+        event["identitySource"] = identity_source
+    return event
+
+
+def test_valid_token_is_authorized_with_claims_context():
+    token = auth.create_access_token({"sub": "user-1", "email": "a@example.com"})
+    response = authorizer.authorize(_request({"authorization": f"Bearer {token}"}), None)
+    assert response == {"isAuthorized": True, "context": {"sub": "user-1", "email": "a@example.com"}}
+
+
+def test_identity_source_is_used_without_headers():
+    token = auth.create_access_token({"sub": "user-1"})
+    response = authorizer.authorize(_request(identity_source=[f"Bearer {token}"]), None)
+    assert response == {"isAuthorized": True, "context": {"sub": "user-1"}}
+
+
+def test_missing_or_invalid_tokens_are_denied():
+    assert authorizer.authorize(_request(), None) == {"isAuthorized": False}
+    assert authorizer.authorize(_request({"authorization": "Bearer nope"}), None) == {"isAuthorized": False}
+    no_sub = auth.create_access_token({"email": "a@example.com"})
+    assert authorizer.authorize(_request({"authorization": f"Bearer {no_sub}"}), None) == {"isAuthorized": False}
+
+
+def test_reset_tokens_are_denied():
+    # Signed with the same key, but only good for POST /auth/reset-password
+    reset = auth.create_reset_token("a@example.com")
+    assert authorizer.authorize(_request({"authorization": f"Bearer {reset}"}), None) == {"isAuthorized": False}
+    assert auth.get_token_claims({"headers": {"Authorization": f"Bearer {reset}"}}) is None
+
+
+def test_handlers_read_the_lambda_authorizer_context():
+    token = auth.create_access_token({"sub": "user-1", "email": "a@example.com"})
+    allowed = authorizer.authorize(_request({"authorization": f"Bearer {token}"}), None)
+    # What API Gateway forwards to the route's integration
+    event = {
+        "headers": {"authorization": f"Bearer {token}"},
+        "requestContext": {"authorizer": {"lambda": allowed["context"]}},
+    }
+    with patch.object(auth.jwt, "decode") as decode:
+        context = auth.get_auth_context(event)
+    decode.assert_not_called()
+    assert (context.user_id, context.email, context.source) == ("user-1", "a@example.com", "authorizer")
@@ -0,0 +1,79 @@
+"""Tests for the decision counter backfill (jobs/backfill_decision_counters.py)."""
+
+import json
+
+import boto3
+from boto3.dynamodb.conditions import Key
+
+from jobs import backfill_decision_counters as backfill
+from tests.conftest import signup_and_login, make_auth_event
+from utils import decision_codec
+
+
+def _items(user_id):
+    return {
+        item["timestamp"]: item
+        for item in boto3.resource("dynamodb").Table("TestStatsTable").query(
+            KeyConditionExpression=Key("userId").eq(user_id)
+        )["Items"]
+    }
+
+
+def _uncounted_sessions(user_id):
+    table = boto3.resource("dynamodb").Table("TestStatsTable")
+    decision = {"category": "hard_total", "scenarioKey": "hard_16_vs_10", "isCorrect": False}
+    table.put_item(Item={
+        "userId": user_id, "timestamp": "2026-01-02 10:00:00.000000",
+        "result": "training_session", "mistakes": 1,
+        "training_decisions": [decision, {**decision, "isCorrect": True}],
+    })
+    table.put_item(Item={
+        "userId": user_id, "timestamp": "blackjack#2026-02-03T10:00:00.000000Z#ab12cd34",
+        "result": "training_session", "mistakes": 0, "gameType": "blackjack",
+        decision_codec.TRAINING_DECISIONS_BIN: decision_codec.encode([{**decision, "isCorrect": True}]),
+    })
+    table.put_item(Item={
+        "userId": user_id, "timestamp": "blackjack#2026-02-04T10:00:00.000000Z#cd34ef56",
+        "result": "win", "mistakes": 0, "gameType": "blackjack",
+    })
+
+
+class TestBackfillDecisionCounters:
+
+    def test_stores_counters_once(self, dynamodb_tables, mock_context):
+        _uncounted_sessions("u1")
+
+        assert backfill.run(dry_run=True) == {"uncounted_items": 3, "backfilled": 0, "failed": 0}
+        assert backfill.run() == {"uncounted_items": 3, "backfilled": 3, "failed": 0}
+        assert backfill.run() == {"uncounted_items": 0, "backfilled": 0, "failed": 0}
+
+        items = _items("u1")
+        legacy = items["2026-01-02 10:00:00.000000"]
+        assert (legacy["decision_total"], legacy["decision_correct"]) == (2, 1)
+        assert legacy["decision_scenarios"]["hard_16_vs_10"] == {"total": 2, "correct": 1}
+        assert items["blackjack#2026-02-03T10:00:00.000000Z#ab12cd34"]["decision_total"] == 1
+        assert items["blackjack#2026-02-04T10:00:00.000000Z#cd34ef56"]["decision_total"] == 0
+        # The payload itself is untouched
+        assert len(legacy["training_decisions"]) == 2
+
+    def test_single_user_run_leaves_others_alone(self, dynamodb_tables, mock_context):
+        _uncounted_sessions("u1")
+        _uncounted_sessions("u2")
+        assert backfill.run(user_id="u1")["backfilled"] == 3
+        assert all("decision_total" not in item for item in _items("u2").values())
+
+    def test_backfilled_history_reads_without_refetching(self, dynamodb_tables, mock_context, monkeypatch):
+        h, ctx = dynamodb_tables, mock_context
+        token, uid, _ = signup_and_login(h, ctx, "backfill@example.com")
+        _uncounted_sessions(uid)
+        backfill.run(user_id=uid)
+
+        table = h["stats"].get_stats_table()
+        fetched = []
+        original = table.get_item
+        monkeypatch.setattr(table, "get_item", lambda **kw: fetched.append(kw) or original(**kw))
+        body = json.loads(h["training"].get_progress(
+            make_auth_event(token, query_params={"game_type": "blackjack"}), ctx
+        )["body"])
+        assert [s["total_decisions"] for s in body["snapshots"]] == [2, 1]
+        assert fetched == []
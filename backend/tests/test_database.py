@@ -0,0 +1,61 @@
+"""Tests for the DynamoDB client/table registry in utils.database."""
+
+import json
+
+from tests.conftest import make_auth_event, signup_and_login
+
+
+class TestClientRegistry:
+    """Table handles are created once per container and reused afterwards."""
+
+    def test_table_handles_are_reused(self, dynamodb_tables):
+        from utils import database as db_utils
+
+        first = db_utils.get_stats_table()
+        second = db_utils.get_stats_table()
+        assert first is second
+
+        users = db_utils.get_users_table()
+        assert users.meta.client is first.meta.client
+
+        stats = db_utils.get_registry_stats()
+        assert stats["resources_created"] == 1
+        assert stats["tables_created"] == 2
+        assert stats["tables_reused"] == 1
+        assert stats["warm"] is True
+
+    def test_client_config_applied(self, dynamodb_tables):
+        from utils import database as db_utils
+
+        client_config = db_utils.get_stats_table().meta.client.meta.config
+        registry_config = db_utils.get_registry_stats()["client_config"]
+        assert client_config.max_pool_connections == registry_config["max_pool_connections"]
+        assert client_config.tcp_keepalive == registry_config["tcp_keepalive"]
+        assert client_config.connect_timeout == registry_config["connect_timeout"]
+        assert client_config.read_timeout == registry_config["read_timeout"]
+        assert client_config.retries["mode"] == registry_config["retry_mode"]
+
+    def test_handlers_share_one_resource_across_invocations(self, dynamodb_tables, mock_context):
+        from utils import database as db_utils
+
+        token, _, _ = signup_and_login(dynamodb_tables, mock_context)
+        for _ in range(3):
+            resp = dynamodb_tables["stats"].save(
+                make_auth_event(token, {"result": "win", "mistakes": 0}), mock_context
+            )
+            assert resp["statusCode"] == 200
+        resp = dynamodb_tables["training"].get_summary(make_auth_event(token), mock_context)
+        assert json.loads(resp["body"])["total_decisions"] == 0
+
+        stats = db_utils.get_registry_stats()
+        assert stats["resources_created"] == 1
+        assert {"TestStatsTable", "TestUsersTable"} <= set(stats["cached_tables"])
+        assert stats["tables_reused"] >= 4
+
+    def test_reset_registry(self, dynamodb_tables):
+        from utils import database as db_utils
+
+        first = db_utils.get_stats_table()
+        db_utils.reset_registry()
+        assert db_utils.get_registry_stats()["resources_created"] == 0
+        assert db_utils.get_stats_table() is not first
@@ -0,0 +1,77 @@
+"""Tests for the compact training_decisions encoding (utils/decision_codec.py)."""
+
+import json
+import random
+from decimal import Decimal
+
+import pytest
+from boto3.dynamodb.types import Binary
+
+from utils import decision_codec
+from utils.decision_codec import DecisionCodecError, decode, decisions_of, encode
+
+CATEGORIES = ["hard_total", "soft_total", "pair_split", "surrender"]
+ACTIONS = ["hit", "stand", "double", "split", "surrender"]
+
+
+def _session(count, seed=21):
+    rng = random.Random(seed)
+    start = 1767225600000
+    decisions = []
+    for i in range(count):
+        category = rng.choice(CATEGORIES)
+        decisions.append({
+            "category": category,
+            "scenarioKey": f"{category}_{rng.randint(5, 21)}_vs_{rng.randint(2, 11)}",
+            "userAction": rng.choice(ACTIONS),
+            "optimalAction": rng.choice(ACTIONS),
+            "isCorrect": rng.random() < 0.8,
+            "timestamp": start + i * rng.randint(800, 9000),
+        })
+    return decisions
+
+
+def test_round_trip_is_lossless():
+    decisions = _session(300)
+    assert decode(encode(decisions)) == decisions
+
+
+def test_irregular_fields_survive_round_trip():
+    decisions = [
+        {"id": "d1", "category": "hard_total", "isCorrect": True, "timestamp": 5},
+        {"category": "ñ_ünïcode", "scenarioKey": None, "isCorrect": "yes"},
+        {"timestamp": "2026-01-01T00:00:00Z", "weight": Decimal("0.25")},
+        {"timestamp": Decimal(3)},
+        {},
+    ]
+    decoded = decode(encode(decisions))
+    assert decoded[0] == decisions[0]
+    assert decoded[1] == decisions[1]
+    assert decoded[2] == decisions[2]
+    assert decoded[3] == {"timestamp": 3}
+    assert decoded[4] == {}
+
+
+def test_encoding_is_much_smaller_than_json():
+    decisions = _session(500)
+    assert len(encode(decisions)) * 5 < len(json.dumps(decisions))
+
+
+def test_rejects_unknown_version_and_garbage():
+    payload = encode(_session(3))
+    with pytest.raises(DecisionCodecError):
+        decode(bytes([99]) + payload[1:])
+    with pytest.raises(DecisionCodecError):
+        decode(payload[:1] + b"not zlib")
+    with pytest.raises(DecisionCodecError):
+        encode(["not a dict"])
+
+
+def test_decisions_of_reads_both_forms():
+    decisions = _session(4)
+    compact = {decision_codec.TRAINING_DECISIONS_BIN: Binary(encode(decisions))}
+    legacy = {decision_codec.TRAINING_DECISIONS: decisions}
+    assert decisions_of(compact) == decisions
+    assert decisions_of(legacy) == decisions
+    assert decisions_of({}) == []
+    assert decisions_of({decision_codec.TRAINING_DECISIONS: "bad"}) == []
@@ -0,0 +1,85 @@
+"""Tests for columnar decision aggregation (utils/decision_columns.py)."""
+
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+from tests.test_decision_codec import _session
+from utils import decision_columns
+from utils.decision_codec import decision_counters
+from utils.decision_columns import DecisionColumns, counters_of
+
+
+def test_counters_match_dict_loop():
+    decisions = _session(500) + [{"isCorrect": True}, {"category": "hard_total", "scenarioKey": ""}]
+    assert DecisionColumns.from_decisions(decisions).counters() == decision_counters(decisions)
+
+
+def test_counters_use_string_keys():
+    # Legacy items may hold non-string keys; DynamoDB map keys must be strings
+    decisions = [{"category": 5, "scenarioKey": 7, "isCorrect": True}, {"isCorrect": False}]
+    for counters in (decision_counters(decisions), DecisionColumns.from_decisions(decisions).counters()):
+        assert counters["decision_categories"] == {
+            "5": {"total": 1, "correct": 1},
+            "unknown": {"total": 1, "correct": 0},
+        }
+        assert counters["decision_scenarios"] == {"7": {"total": 1, "correct": 1}}
+
+def test_sessions_and_series():
+    sessions = [_session(3, seed=1), [], _session(5, seed=2)]
+    columns = DecisionColumns.from_sessions(sessions)
+    totals, correct = columns.session_series()
+    assert totals.tolist() == [3, 0, 5]
+    assert correct.tolist() == [sum(d["isCorrect"] for d in s) for s in sessions]
+    assert columns.totals() == (8, int(correct.sum()))
+
+
+def test_rolling_and_window_accuracy():
+    columns = DecisionColumns.from_decisions(
+        [{"isCorrect": c} for c in (True, False, True, True, False, False)]
+    )
+    np.testing.assert_allclose(columns.rolling_accuracy(2), [1, 0.5, 0.5, 1, 0.5, 0])
+    np.testing.assert_allclose(columns.window_accuracy(4), [0.75])
+    with pytest.raises(ValueError):
+        columns.window_accuracy(0)
+
+
+def test_empty_input():
+    columns = DecisionColumns.from_sessions([])
+    assert columns.totals() == (0, 0)
+    assert columns.counters()["decision_categories"] == {}
+    assert columns.rolling_accuracy(5).size == 0
+
+
+def test_counters_of_switches_to_columns_for_large_sessions(monkeypatch):
+    calls = []
+    original = DecisionColumns.from_decisions.__func__
+    monkeypatch.setattr(DecisionColumns, "from_decisions",
+                        classmethod(lambda cls, d: calls.append(len(d)) or original(cls, d)))
+    monkeypatch.setattr(decision_columns, "COLUMNAR_MIN_DECISIONS", 10)
+    small, large = _session(9), _session(10)
+    assert counters_of(small) == decision_counters(small)
+    assert counters_of(large) == decision_counters(large)
+    assert calls == [10]
+
+
+def test_counters_of_falls_back_without_numpy(monkeypatch):
+    # The Lambda bundle does not ship NumPy (it is in jobs-requirements.txt)
+    monkeypatch.setitem(sys.modules, "numpy", None)
+    monkeypatch.setattr(decision_columns, "COLUMNAR_MIN_DECISIONS", 10)
+    large = _session(50)
+    assert counters_of(large) == decision_counters(large)
+
+def test_handlers_import_without_numpy():
+    # The handlers only need NumPy for very large sessions; it must not load at import
+    code = (
+        "import sys, handlers.stats, handlers.training, handlers.stats_stream; "
+        "from utils.decision_columns import counters_of; "
+        "counters_of([{'category': 'hard_total', 'isCorrect': True}]); "
+        "sys.exit('numpy' in sys.modules)"
+    )
+    backend = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    assert subprocess.run([sys.executable, "-c", code], cwd=backend).returncode == 0
@@ -0,0 +1,50 @@
+"""Tests for /training/progress downsampling (utils/downsample.py)."""
+
+import math
+
+import pytest
+
+from utils.downsample import BucketDownsampler, lttb
+
+
+@pytest.mark.parametrize("count", [1, 7, 8, 9, 100, 1001])
+def test_buckets_stay_bounded_and_conserve_counts(count):
+    sampler = BucketDownsampler(8)
+    for i in range(count):
+        sampler.add(f"t{i:05d}", 10, i % 10)
+    points = sampler.snapshots()
+
+    assert len(points) <= 8
+    assert sum(p["sessions"] for p in points) == count
+    assert sum(p["total_decisions"] for p in points) == 10 * count
+    assert sum(p["correct_decisions"] for p in points) == sum(i % 10 for i in range(count))
+    assert points[0]["start_timestamp"] == "t00000"
+    assert points[-1]["timestamp"] == f"t{count - 1:05d}"
+    # Buckets are contiguous and, apart from the last, equally sized
+    assert len({p["sessions"] for p in points[:-1]}) <= 1
+
+
+def test_bucket_accuracy_is_decision_weighted():
+    sampler = BucketDownsampler(2)
+    sampler.add("a", 1, 1)
+    sampler.add("b", 9, 0)
+    sampler.add("c", 4, 4)
+    first = sampler.snapshots()[0]
+    assert first["sessions"] == 2
+    assert first["overall_accuracy"] == 0.1
+
+
+def test_lttb_keeps_endpoints_and_extremes():
+    points = [{"i": i, "y": math.sin(i / 10)} for i in range(200)]
+    points[97]["y"] = -5  # a single deep dip must survive
+    picked = lttb(points, 20, y=lambda p: p["y"])
+    assert len(picked) == 20
+    assert picked[0] is points[0] and picked[-1] is points[-1]
+    assert points[97] in picked
+    assert [p["i"] for p in picked] == sorted(p["i"] for p in picked)
+
+
+def test_lttb_short_series_unchanged():
+    points = [{"y": 1}, {"y": 2}, {"y": 3}]
+    assert lttb(points, 10, y=lambda p: p["y"]) == points
+    assert lttb(points, 2, y=lambda p: p["y"]) == [points[0], points[-1]]
@@ -10,6 +10,7 @@ import os
 import boto3
 from datetime import datetime, timedelta
 from jose import jwt
+from utils.decision_codec import decisions_of
 
 from tests.conftest import (
     signup_user,
@@ -255,6 +256,56 @@ class TestPasswordResetFlow:
         assert login_user(h, ctx, email, "thirdPass123")["statusCode"] == 200
 
 
+# ============================================================
+# Flow: Login → Refresh → Token Reuse → Logout
+# ============================================================
+
+
+class TestRefreshSessionFlow:
+    """Tests staying signed in with rotating refresh tokens, then signing out."""
+
+    def _refresh(self, h, ctx, token):
+        return h["auth"].refresh({"body": json.dumps({"refresh_token": token})}, ctx)
+
+    def test_user_refreshes_then_reused_token_revokes_then_logs_out(self, dynamodb_tables, mock_context):
+        """login → refresh → replayed old token kills the session → log in again → logout."""
+        h, ctx = dynamodb_tables, mock_context
+        signup_user(h, ctx, "session@example.com", "sessionPass123")
+
+        # Step 1: Log in and keep the refresh token
+        login = json.loads(login_user(h, ctx, "session@example.com", "sessionPass123")["body"])
+        first = login["refresh_token"]
+
+        # Step 2: The access token expires; the app refreshes silently
+        resp = self._refresh(h, ctx, first)
+        assert resp["statusCode"] == 200
+        body = json.loads(resp["body"])
+        current = body["refresh_token"]
+        assert current != first
+        resp = h["training"].get_summary(
+            make_auth_event(body["access_token"], query_params={"game_type": "blackjack"}), ctx,
+        )
+        assert resp["statusCode"] == 200
+
+        # Step 3: Someone replays the old token: the whole session is revoked
+        resp = self._refresh(h, ctx, first)
+        assert resp["statusCode"] == 401
+        assert json.loads(resp["body"])["detail"] == "Refresh token was already used."
+        assert self._refresh(h, ctx, current)["statusCode"] == 401
+
+        # Step 4: The user logs in again and later logs out
+        again = json.loads(login_user(h, ctx, "session@example.com", "sessionPass123")["body"])["refresh_token"]
+        resp = h["auth"].logout({"body": json.dumps({"refresh_token": again})}, ctx)
+        assert resp["statusCode"] == 200
+        assert self._refresh(h, ctx, again)["statusCode"] == 401
+
+    def test_refresh_requires_a_token(self, dynamodb_tables, mock_context):
+        """Missing or unknown refresh tokens are rejected."""
+        h, ctx = dynamodb_tables, mock_context
+        assert h["auth"].refresh({"body": "{}"}, ctx)["statusCode"] == 400
+        assert self._refresh(h, ctx, "made-up-token")["statusCode"] == 401
+
+
 # ============================================================
 # Flow 3: Gameplay → Stats → Training Analytics
 # ============================================================
@@ -701,4 +752,126 @@ class TestExtendedStatsFlow:
         assert item["net_payout"] == 150
         assert item["hands_played"] == 5
         assert item["details"]["sessionId"] == "test-session"
-        assert len(item["training_decisions"]) == 1
+        assert len(decisions_of(item)) == 1
+
+
+# ============================================================
+# Flow: Offline Sessions → Batch Upload → Summary
+# ============================================================
+
+
+class TestBatchUploadFlow:
+    """Tests syncing sessions recorded offline through POST /stats/batch."""
+
+    def test_user_uploads_offline_sessions_then_sees_them_in_summary(self, dynamodb_tables, mock_context):
+        """Sign up, play offline, sync the sessions in one batch, then check the summary."""
+        h, ctx = dynamodb_tables, mock_context
+        token, uid, _ = signup_and_login(h, ctx, "offline@example.com")
+
+        # Step 1: Sessions queued on the device while offline (one is corrupt)
+        sessions = [
+            {"result": "win", "mistakes": 0, "net_payout": 20, "hands_played": 4},
+            {"result": "loss", "mistakes": 2, "net_payout": -10, "hands_played": 3},
+            {"result": "training_session", "mistakes": 1, "training_decisions": [
+                {"id": "d1", "category": "hard_total", "scenarioKey": "hard_16_vs_10",
+                 "userAction": "hit", "optimalAction": "surrender", "isCorrect": False},
+                {"id": "d2", "category": "soft_total", "scenarioKey": "soft_18_vs_9",
+                 "userAction": "hit", "optimalAction": "hit", "isCorrect": True},
+            ]},
+            {"result": "abandoned", "mistakes": 0},
+        ]
+
+        # Step 2: Sync them in one request
+        resp = h["stats"].save_batch(make_auth_event(token, body={"sessions": sessions}), ctx)
+        assert resp["statusCode"] == 200
+        body = json.loads(resp["body"])
+        assert (body["saved"], body["invalid"], body["failed"]) == (3, 1, 0)
+        assert [r["status"] for r in body["results"]] == ["saved", "saved", "saved", "invalid"]
+
+        # Step 3: The summary includes every synced session
+        resp = h["training"].get_summary(
+            make_auth_event(token, query_params={"game_type": "blackjack"}),
+            ctx,
+        )
+        assert resp["statusCode"] == 200
+        summary = json.loads(resp["body"])
+        assert summary["session_totals"]["sessions"] == 3
+        assert summary["session_totals"]["net_payout"] == 10
+        assert summary["session_totals"]["results"]["win"] == 1
+        assert summary["session_totals"]["results"]["loss"] == 1
+        assert (summary["total_decisions"], summary["correct_decisions"]) == (2, 1)
+
+    def test_batch_upload_requires_auth_and_a_session_list(self, dynamodb_tables, mock_context):
+        """An unauthenticated or empty sync is rejected and stores nothing."""
+        h, ctx = dynamodb_tables, mock_context
+        token, uid, _ = signup_and_login(h, ctx, "offline-bad@example.com")
+
+        resp = h["stats"].save_batch({"headers": {}, "body": json.dumps({"sessions": [{}]})}, ctx)
+        assert resp["statusCode"] == 401
+        resp = h["stats"].save_batch(make_auth_event(token, body={"sessions": []}), ctx)
+        assert resp["statusCode"] == 400
+
+        table = boto3.resource("dynamodb").Table("TestStatsTable")
+        items = table.query(
+            KeyConditionExpression=boto3.dynamodb.conditions.Key("userId").eq(uid)
+        )["Items"]
+        assert items == []
+
+
+# ============================================================
+# Flow: Missed Scenario → Next Drill
+# ============================================================
+
+
+class TestNextDrillFlow:
+    """Tests that a missed scenario comes back as the player's next drill."""
+
+    def _decision(self, scenario, correct, user_action, optimal_action):
+        return {
+            "category": "soft_total" if scenario.startswith("soft") else "hard_total",
+            "scenarioKey": scenario,
+            "userAction": user_action,
+            "optimalAction": optimal_action,
+            "isCorrect": correct,
+        }
+
+    def test_user_misses_a_scenario_then_gets_its_drill(self, dynamodb_tables, mock_context):
+        """Play a session that keeps missing soft 18 vs 9, then ask for the next drill."""
+        h, ctx = dynamodb_tables, mock_context
+        token, uid, _ = signup_and_login(h, ctx, "drills@example.com")
+        query = {"game_type": "blackjack"}
+
+        # Step 1: A new player has nothing to drill yet
+        resp = h["training"].get_next_drill(make_auth_event(token, query_params=query), ctx)
+        assert resp["statusCode"] == 200
+        assert json.loads(resp["body"])["drill"] is None
+
+        # Step 2: Play a training session, standing on soft 18 vs 9 every time
+        decisions = (
+            [self._decision("soft_18_vs_9", False, "stand", "hit")] * 6
+            + [self._decision("hard_12_vs_3", False, "stand", "hit")] * 2
+            + [self._decision("hard_12_vs_3", True, "hit", "hit")] * 6
+            + [self._decision("hard_20_vs_6", True, "stand", "stand")] * 5
+        )
+        resp = h["stats"].save(make_auth_event(token, body={
+            "result": "training_session", "mistakes": 8, "training_decisions": decisions,
+        }), ctx)
+        assert resp["statusCode"] == 200
+
+        # Step 3: The missed scenario is dealt as the next drill
+        resp = h["training"].get_next_drill(make_auth_event(token, query_params=query), ctx)
+        assert resp["statusCode"] == 200
+        body = json.loads(resp["body"])
+        drill = body["drill"]
+        assert drill["scenario"] == "soft_18_vs_9"
+        assert drill["drill_id"] == "drill_soft_18_vs_9"
+        assert drill["force_cards"] == {"player": ["A", "7"], "dealer": "9"}
+        assert (drill["total"], drill["correct"], drill["accuracy"]) == (6, 0, 0.0)
+        # The weaker-but-not-hopeless scenario waits behind it; mastered ones never queue
+        assert body["queue"] == ["hard_12_vs_3"]
+
+    def test_next_drill_requires_auth(self, dynamodb_tables, mock_context):
+        """Without a token the drill endpoint is rejected."""
+        h, ctx = dynamodb_tables, mock_context
+        resp = h["training"].get_next_drill({"headers": {}, "queryStringParameters": {}}, ctx)
+        assert resp["statusCode"] == 401
@@ -11,6 +11,7 @@ import json
 import os
 import boto3
 from jose import jwt
+from utils.decision_codec import decisions_of
 
 from tests.conftest import (
     signup_user,
@@ -107,7 +108,7 @@ class TestBearerTokenAuth:
         )["Items"]
         assert len(items) == 1
         assert items[0]["result"] == "training_session"
-        assert len(items[0]["training_decisions"]) == 1
+        assert len(decisions_of(items[0])) == 1
 
 
 # ============================================================
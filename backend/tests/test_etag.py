@@ -0,0 +1,119 @@
+"""Tests for conditional GETs (utils/etag.py)."""
+
+import json
+
+from tests.conftest import signup_and_login, make_auth_event
+from utils.etag import if_none_match, make_etag
+
+
+def _training_session(correct=True):
+    return {
+        "result": "training_session", "mistakes": 0 if correct else 1,
+        "training_decisions": [{"category": "hard_total", "scenarioKey": "hard_16_vs_10", "isCorrect": correct}],
+    }
+
+
+def _conditional(token, etag, params=None):
+    event = make_auth_event(token, query_params=params)
+    event["headers"]["If-None-Match"] = etag
+    return event
+
+
+def test_if_none_match_parsing():
+    etag = make_etag("x")
+    assert if_none_match({"headers": {"if-none-match": etag}}, etag)
+    assert if_none_match({"headers": {"If-None-Match": f'"other", W/{etag}'}}, etag)
+    assert if_none_match({"headers": {"If-None-Match": "*"}}, etag)
+    assert not if_none_match({"headers": {"If-None-Match": '"other"'}}, etag)
+    assert not if_none_match({}, etag)
+
+
+class TestTrainingETags:
+
+    def test_summary_not_modified_until_next_save(self, dynamodb_tables, mock_context, monkeypatch):
+        h, ctx = dynamodb_tables, mock_context
+        token, _, _ = signup_and_login(h, ctx)
+        h["stats"].save(make_auth_event(token, body=_training_session()), ctx)
+
+        for period in ("all", "week"):
+            params = {"game_type": "blackjack", "period": period}
+            first = h["training"].get_summary(make_auth_event(token, query_params=params), ctx)
+            etag = first["headers"]["ETag"]
+            assert first["statusCode"] == 200
+
+            def no_aggregation(*args, **kwargs):
+                raise AssertionError("aggregated on a conditional hit")
+
+            with monkeypatch.context() as m:
+                m.setattr(h["training"], "_window_profile", no_aggregation)
+                m.setattr(h["training"].player_stats, "build_from_history", no_aggregation)
+                repeat = h["training"].get_summary(_conditional(token, etag, params), ctx)
+            assert repeat["statusCode"] == 304
+            assert repeat["headers"]["ETag"] == etag and repeat["body"] == ""
+
+            # Different parameters never share a tag
+            other = h["training"].get_summary(_conditional(token, etag, {**params, "min_samples": "2"}), ctx)
+            assert other["statusCode"] == 200
+
+        params = {"game_type": "blackjack"}
+        etags = {
+            period: h["training"].get_summary(
+                make_auth_event(token, query_params={**params, "period": period}), ctx
+            )["headers"]["ETag"]
+            for period in ("all", "week")
+        }
+        h["stats"].save(make_auth_event(token, body=_training_session(False)), ctx)
+        for period, etag in etags.items():
+            resp = h["training"].get_summary(_conditional(token, etag, {**params, "period": period}), ctx)
+            assert resp["statusCode"] == 200
+            assert json.loads(resp["body"])["total_decisions"] == 2
+            assert resp["headers"]["ETag"] != etag
+
+    def test_progress_not_modified_until_next_save(self, dynamodb_tables, mock_context):
+        h, ctx = dynamodb_tables, mock_context
+        token, _, _ = signup_and_login(h, ctx)
+        h["stats"].save(make_auth_event(token, body=_training_session()), ctx)
+        params = {"game_type": "blackjack", "max_points": "10"}
+
+        etag = h["training"].get_progress(make_auth_event(token, query_params=params), ctx)["headers"]["ETag"]
+        assert h["training"].get_progress(_conditional(token, etag, params), ctx)["statusCode"] == 304
+        assert h["training"].get_progress(
+            _conditional(token, etag, {**params, "downsample": "lttb"}), ctx
+        )["statusCode"] == 200
+
+        h["stats"].save(make_auth_event(token, body=_training_session()), ctx)
+        resp = h["training"].get_progress(_conditional(token, etag, params), ctx)
+        assert resp["statusCode"] == 200
+        assert json.loads(resp["body"])["source_points"] == 2
+
+
+class TestBodyETags:
+
+    def test_learning_and_profile(self, dynamodb_tables, mock_context):
+        h, ctx = dynamodb_tables, mock_context
+        token, _, _ = signup_and_login(h, ctx)
+        progress = {"game_type": "blackjack", "skill_level": "beginner", "completed_card_ids": ["c1"]}
+        h["learning"].save_progress(make_auth_event(token, body=progress), ctx)
+
+        reads = [
+            (h["learning"].get_progress, {"game_type": "blackjack"}),
+            (h["learning"].get_summary, None),
+            (h["auth"].get_profile, None),
+        ]
+        etags = []
+        for handler, params in reads:
+            first = handler(make_auth_event(token, query_params=params), ctx)
+            etags.append(first["headers"]["ETag"])
+            assert handler(_conditional(token, etags[-1], params), ctx)["statusCode"] == 304
+
+        h["learning"].save_progress(make_auth_event(token, body={**progress, "completed_card_ids": ["c1", "c2"]}), ctx)
+        h["auth"].update_profile(make_auth_event(token, body={
+            "first_name": "Ada", "last_name": "L", "dob": "2000-01-01", "country": "UK",
+        }), ctx)
+        for (handler, params), etag in zip(reads, etags):
+            assert handler(_conditional(token, etag, params), ctx)["statusCode"] == 200
+
+    def test_errors_are_not_tagged(self, dynamodb_tables, mock_context):
+        resp = dynamodb_tables["learning"].get_summary({"headers": {"If-None-Match": "*"}}, mock_context)
+        assert resp["statusCode"] == 401
+        assert "headers" not in resp
@@ -0,0 +1,116 @@
+"""Tests for the Parquet export job (jobs/export_parquet.py)."""
+
+from datetime import datetime, timezone
+
+import boto3
+import pytest
+
+pq = pytest.importorskip("pyarrow.parquet")
+
+from jobs import export_parquet  # noqa: E402
+from utils.decision_codec import decision_counters, encode, TRAINING_DECISIONS_BIN  # noqa: E402
+
+
+def _seed():
+    stats = boto3.resource("dynamodb").Table("TestStatsTable")
+    decisions = [
+        {"category": "hard_total", "scenarioKey": "hard_16_vs_10", "userAction": "stand",
+         "optimalAction": "hit", "isCorrect": False, "timestamp": 1780000000000},
+        {"category": "soft_total", "isCorrect": True},
+    ]
+    stats.put_item(Item={
+        "userId": "u1", "timestamp": "blackjack#2026-05-01T10:00:00.000000Z#aaaaaaaa",
+        "result": "training_session", "mistakes": 1, "gameType": "blackjack",
+        TRAINING_DECISIONS_BIN: encode(decisions), **decision_counters(decisions),
+        "details": {"sessionId": "s-1", "bestStreak": 4, "startedAt": 1780000000000},
+    })
+    stats.put_item(Item={
+        "userId": "u2", "timestamp": "2026-05-02 09:00:00.000000",
+        "result": "win", "mistakes": 0, "net_payout": -20, "hands_played": 2,
+        "details": {"hands": [{"cards": ["AH", "KD"], "result": "won", "bet": 10}], "dealer_cards": ["9C"]},
+    })
+    boto3.resource("dynamodb").Table("TestLearningTable").put_item(Item={
+        "userId": "u1", "gameType": "blackjack", "skillLevel": "beginner",
+        "completedCardIds": ["c1", "c2"], "completed": False,
+        "quizResults": {"c1": {"correct": True, "answeredAt": 1780000000000}, "c2": {"correct": False}},
+        "startedAt": "2026-05-01 08:00:00.000000", "updatedAt": "2026-05-03 08:00:00.000000",
+    })
+
+
+def test_exports_partitioned_typed_datasets(dynamodb_tables, tmp_path):
+    _seed()
+    report = export_parquet.run(str(tmp_path), buffer_rows=2)
+    assert report["rows"] == {"sessions": 2, "decisions": 2, "learning": 1, "quiz_results": 2}
+
+    sessions = pq.read_table(tmp_path / "sessions")
+    assert sorted(sessions.column("date").to_pylist()) == ["2026-05-01", "2026-05-02"]
+    rows = {r["user_id"]: r for r in sessions.to_pylist()}
+    assert rows["u1"]["session_id"] == "s-1"
+    assert rows["u1"]["started_at"] == datetime.fromtimestamp(1780000000, timezone.utc)
+    assert (rows["u1"]["decision_total"], rows["u1"]["decision_correct"]) == (2, 1)
+    assert rows["u2"]["game_type"] == "blackjack"
+    assert rows["u2"]["hand_results"] == ["won"]
+    assert rows["u2"]["net_payout"] == -20
+
+    decisions = pq.read_table(tmp_path / "decisions").to_pylist()
+    assert [d["scenario_key"] for d in decisions] == ["hard_16_vs_10", None]
+    assert decisions[0]["is_correct"] is False
+
+    learning = pq.read_table(tmp_path / "learning").to_pylist()[0]
+    assert learning["quiz_correct"] == 1 and learning["completed_card_ids"] == ["c1", "c2"]
+    assert str(learning["date"]) == "2026-05-03"
+    quiz = pq.read_table(tmp_path / "quiz_results").to_pylist()
+    assert {q["card_id"]: q["correct"] for q in quiz} == {"c1": True, "c2": False}
+
+
+def test_writer_memory_is_bounded_by_buffer_rows(tmp_path):
+    from pyarrow.fs import LocalFileSystem
+
+    writer = export_parquet.PartitionedWriter(LocalFileSystem(), str(tmp_path), buffer_rows=3)
+    row = {"user_id": "u1", "game_type": "blackjack", "card_id": "c1", "correct": True, "answered_at": None}
+    for _ in range(7):
+        writer.add("quiz_results", "2026-05-01", [row])
+        assert writer.pending < 3
+    writer.flush()
+    assert writer.parts == 3
+    assert pq.read_table(tmp_path / "quiz_results").num_rows == 7
+
+
+def test_writer_flushes_full_partitions_not_every_buffer(tmp_path):
+    from pyarrow.fs import LocalFileSystem
+
+    writer = export_parquet.PartitionedWriter(
+        LocalFileSystem(), str(tmp_path), buffer_rows=10, part_rows=4, run_id="run1",
+    )
+    row = {"user_id": "u1", "game_type": "blackjack", "card_id": "c1", "correct": True, "answered_at": None}
+    writer.add("quiz_results", "2026-05-01", [row])
+    for _ in range(4):
+        writer.add("quiz_results", "2026-05-02", [row])
+    # Only the partition that reached part_rows was written
+    assert writer.parts == 1
+    assert list(writer.buffers) == [("quiz_results", "2026-05-01")]
+    assert [p.name for p in (tmp_path / "quiz_results" / "date=2026-05-02").iterdir()] == [
+        "part-run1-00000.parquet"
+    ]
+
+    # Hitting buffer_rows writes the largest partitions first
+    for date in ("2026-05-03", "2026-05-04", "2026-05-05"):
+        writer.add("quiz_results", date, [row] * 3)
+    assert writer.pending <= 5
+    assert ("quiz_results", "2026-05-01") in writer.buffers
+
+
+def test_reruns_do_not_overwrite_earlier_parts(dynamodb_tables, tmp_path):
+    _seed()
+    first = export_parquet.run(str(tmp_path))
+    second = export_parquet.run(str(tmp_path))
+    assert first["run_id"] != second["run_id"]
+    files = list((tmp_path / "sessions" / "date=2026-05-01").iterdir())
+    assert len(files) == 2
+    assert {f.name.split("-")[1] for f in files} == {first["run_id"], second["run_id"]}
+
+
+def test_out_of_range_epoch_values_become_null():
+    assert export_parquet._epoch_ms(10 ** 20) is None
+    assert export_parquet._epoch_ms(-(10 ** 20)) is None
+    assert export_parquet._epoch_ms(1780000000000) == datetime.fromtimestamp(1780000000, timezone.utc)
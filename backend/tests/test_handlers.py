@@ -12,6 +12,9 @@ def dynamodb_tables():
     with patch.dict(os.environ, {
         "USERS_TABLE": "TestUsersTable",
         "STATS_TABLE": "TestStatsTable",
+        "PLAYER_STATS_TABLE": "TestPlayerStatsTable",
+        "IDEMPOTENCY_TABLE": "TestIdempotencyTable",
+        "REFRESH_TOKENS_TABLE": "TestRefreshTokensTable",
         "SECRET_KEY": "test-secret-key",
         "APP_NAME": "TestApp",
         "AWS_DEFAULT_REGION": "us-east-1",
@@ -41,11 +44,36 @@ def dynamodb_tables():
                 ],
                 BillingMode="PAY_PER_REQUEST",
             )
+            dynamodb.create_table(
+                TableName="TestPlayerStatsTable",
+                KeySchema=[
+                    {"AttributeName": "userId", "KeyType": "HASH"},
+                    {"AttributeName": "gameType", "KeyType": "RANGE"},
+                ],
+                AttributeDefinitions=[
+                    {"AttributeName": "userId", "AttributeType": "S"},
+                    {"AttributeName": "gameType", "AttributeType": "S"},
+                ],
+                BillingMode="PAY_PER_REQUEST",
+            )
+            dynamodb.create_table(
+                TableName="TestIdempotencyTable",
+                KeySchema=[{"AttributeName": "idempotencyKey", "KeyType": "HASH"}],
+                AttributeDefinitions=[{"AttributeName": "idempotencyKey", "AttributeType": "S"}],
+                BillingMode="PAY_PER_REQUEST",
+            )
+            dynamodb.create_table(
+                TableName="TestRefreshTokensTable",
+                KeySchema=[{"AttributeName": "tokenHash", "KeyType": "HASH"}],
+                AttributeDefinitions=[{"AttributeName": "tokenHash", "AttributeType": "S"}],
+                BillingMode="PAY_PER_REQUEST",
+            )
 
             # Reload config, database, and handlers inside mock_aws so boto3 resources use moto
             global auth_handlers, stats_handlers
             import config
             from utils import database as db_utils
+            from utils import idempotency as idempotency_utils
             from utils import auth as auth_utils
             from utils import email as email_utils
             from handlers import auth as auth_handlers
@@ -55,6 +83,7 @@ def dynamodb_tables():
             reload(auth_utils)
             reload(email_utils)
             reload(db_utils)
+            reload(idempotency_utils)
             reload(auth_handlers)
             reload(stats_handlers)
 
@@ -216,6 +245,150 @@ def test_save_stats_invalid_body(dynamodb_tables, mock_context):
     assert body["detail"] == "Invalid stats data."
 
 
+def test_save_stats_rejects_non_string_decision_keys(dynamodb_tables, mock_context):
+    token = _signup_and_login(mock_context, email="badkeys@example.com")
+    for bad in ({"category": 5, "isCorrect": True}, {"category": "hard_total", "scenarioKey": ["x"]}):
+        event = {
+            "headers": {"Authorization": f"Bearer {token}"},
+            "body": json.dumps({"result": "training_session", "mistakes": 0, "training_decisions": [bad]}),
+        }
+        assert stats_handlers.save(event, mock_context)["statusCode"] == 400
+
+def test_save_stats_survives_a_rollup_failure(dynamodb_tables, mock_context, monkeypatch):
+    token = _signup_and_login(mock_context, email="rollupfail@example.com")
+    user_id = jwt.decode(token, os.environ["SECRET_KEY"], algorithms=[auth_handlers.ALGORITHM])["sub"]
+    event = {
+        "headers": {"Authorization": f"Bearer {token}"},
+        "body": json.dumps({"result": "win", "mistakes": 0}),
+    }
+    assert stats_handlers.save(event, mock_context)["statusCode"] == 200
+
+    def lost_races(*args, **kwargs):
+        raise RuntimeError("lost races")
+
+    monkeypatch.setattr(stats_handlers.player_stats, "record_sessions", lost_races)
+    # The item is stored, so the request succeeds and a retry won't duplicate it
+    assert stats_handlers.save(event, mock_context)["statusCode"] == 200
+    monkeypatch.undo()
+
+    rollups = boto3.resource("dynamodb").Table("TestPlayerStatsTable")
+    assert "Item" not in rollups.get_item(Key={"userId": user_id, "gameType": "blackjack"})
+    # The next write rebuilds the rollup from history, missed session included
+    assert stats_handlers.save(event, mock_context)["statusCode"] == 200
+    rollup = rollups.get_item(Key={"userId": user_id, "gameType": "blackjack"})["Item"]
+    assert rollup["total_sessions"] == 3
+
+
+def _batch_event(token, sessions):
+    return {
+        "headers": {"Authorization": f"Bearer {token}"},
+        "body": json.dumps({"sessions": sessions}),
+    }
+
+
+def test_save_stats_batch_reports_per_item_status(dynamodb_tables, mock_context):
+    token = _signup_and_login(mock_context, email="batch@example.com")
+    sessions = [
+        {"result": "win", "mistakes": 0, "details": {"accuracy": 0.75}},
+        {"result": "bogus", "mistakes": 0},
+        {"result": "training_session", "mistakes": 1,
+         "training_decisions": [{"category": "hard_total", "isCorrect": False}]},
+    ] + [{"result": "loss", "mistakes": 2}] * 30
+    response = stats_handlers.save_batch(_batch_event(token, sessions), mock_context)
+    assert response["statusCode"] == 200
+    body = json.loads(response["body"])
+    assert (body["saved"], body["invalid"], body["failed"]) == (32, 1, 0)
+    assert body["results"][1] == {"index": 1, "status": "invalid"}
+    assert body["results"][0]["status"] == "saved"
+
+    user_id = jwt.decode(token, os.environ["SECRET_KEY"], algorithms=[auth_handlers.ALGORITHM])["sub"]
+    items = boto3.resource("dynamodb").Table("TestStatsTable").query(
+        KeyConditionExpression=boto3.dynamodb.conditions.Key("userId").eq(user_id)
+    )["Items"]
+    assert len(items) == 32
+    rollup = boto3.resource("dynamodb").Table("TestPlayerStatsTable").get_item(
+        Key={"userId": user_id, "gameType": "blackjack"}
+    )["Item"]
+    assert rollup["total_sessions"] == 32
+    assert rollup["total_decisions"] == 1
+
+
+def test_save_stats_batch_rejects_bad_envelope(dynamodb_tables, mock_context):
+    token = _signup_and_login(mock_context, email="batchbad@example.com")
+    assert stats_handlers.save_batch(_batch_event(token, []), mock_context)["statusCode"] == 400
+    too_many = [{"result": "win", "mistakes": 0}] * (stats_handlers.MAX_BATCH_SESSIONS + 1)
+    assert stats_handlers.save_batch(_batch_event(token, too_many), mock_context)["statusCode"] == 400
+    unauthorized = stats_handlers.save_batch({"headers": {}, "body": "{}"}, mock_context)
+    assert unauthorized["statusCode"] == 401
+
+
+def test_save_stats_batch_retries_unprocessed_items(dynamodb_tables, mock_context, monkeypatch):
+    from utils import database as db_utils
+    token = _signup_and_login(mock_context, email="batchretry@example.com")
+    backend = db_utils.get_backend()
+    original = backend.batch_write_item
+    calls = []
+
+    def throttled(RequestItems, **kwargs):
+        calls.append(RequestItems)
+        (table_name, requests), = RequestItems.items()
+        if len(requests) == 2:
+            # Write only the first request and hand back the rest
+            original(RequestItems={table_name: requests[:1]})
+            return {"UnprocessedItems": {table_name: requests[1:]}}
+        if requests[0]["PutRequest"]["Item"]["result"] == "push":
+            return {"UnprocessedItems": {table_name: requests}}
+        return original(RequestItems=RequestItems, **kwargs)
+
+    monkeypatch.setattr(backend, "batch_write_item", throttled)
+    monkeypatch.setattr(db_utils.time, "sleep", lambda seconds: None)
+
+    sessions = [{"result": "win", "mistakes": 0}, {"result": "loss", "mistakes": 1}]
+    body = json.loads(stats_handlers.save_batch(_batch_event(token, sessions), mock_context)["body"])
+    assert body["saved"] == 2
+    assert len(calls) == 2
+
+    calls.clear()
+    body = json.loads(stats_handlers.save_batch(
+        _batch_event(token, [{"result": "push", "mistakes": 0}]), mock_context
+    )["body"])
+    assert body["results"] == [{"index": 0, "status": "failed"}]
+    assert len(calls) == db_utils.BATCH_WRITE_MAX_ATTEMPTS
+
+
+def test_save_stats_batch_folds_chunks_written_before_an_error(dynamodb_tables, mock_context, monkeypatch):
+    from utils import database as db_utils
+    token = _signup_and_login(mock_context, email="batchcrash@example.com")
+    user_id = jwt.decode(token, os.environ["SECRET_KEY"], algorithms=[auth_handlers.ALGORITHM])["sub"]
+    backend = db_utils.get_backend()
+    original = backend.batch_write_item
+    calls = []
+
+    def crash_on_second_chunk(RequestItems, **kwargs):
+        calls.append(RequestItems)
+        if len(calls) == 2:
+            raise RuntimeError("connection reset")
+        return original(RequestItems=RequestItems, **kwargs)
+
+    monkeypatch.setattr(backend, "batch_write_item", crash_on_second_chunk)
+    sessions = [{"result": "win", "mistakes": 0}] * 30
+    response = stats_handlers.save_batch(_batch_event(token, sessions), mock_context)
+    assert response["statusCode"] == 200
+    body = json.loads(response["body"])
+    assert (body["saved"], body["failed"]) == (25, 5)
+    assert [r["status"] for r in body["results"][24:26]] == ["saved", "failed"]
+    rollup = boto3.resource("dynamodb").Table("TestPlayerStatsTable").get_item(
+        Key={"userId": user_id, "gameType": "blackjack"}
+    )["Item"]
+    assert rollup["total_sessions"] == 25
+
+    # Nothing stored: still an error, and safe to retry as a whole
+    calls.clear()
+    calls.append(None)
+    response = stats_handlers.save_batch(_batch_event(token, sessions[:1]), mock_context)
+    assert response["statusCode"] == 500
+
+
 # --- Tests for mandatory details ---
 
 def _signup_and_login(mock_context, email="mandtest@example.com", password="testpass123"):
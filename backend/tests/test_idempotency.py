@@ -0,0 +1,191 @@
+"""Tests for idempotent replay of mutating endpoints (utils/idempotency.py)."""
+
+import json
+import time
+
+import boto3
+from boto3.dynamodb.conditions import Key
+
+from tests.conftest import signup_and_login, make_auth_event
+
+
+def _session(session_id, result="win"):
+    return {"result": result, "mistakes": 0, "details": {"sessionId": session_id, "accuracy": 0.5}}
+
+
+def _stats_items(user_id):
+    return boto3.resource("dynamodb").Table("TestStatsTable").query(
+        KeyConditionExpression=Key("userId").eq(user_id)
+    )["Items"]
+
+
+def _keyed(event, key):
+    event["headers"]["Idempotency-Key"] = key
+    return event
+
+
+class TestStatsIdempotency:
+
+    def test_retried_session_is_saved_once(self, dynamodb_tables, mock_context):
+        h, ctx = dynamodb_tables, mock_context
+        token, uid, _ = signup_and_login(h, ctx)
+
+        first = h["stats"].save(make_auth_event(token, body=_session("sess-1")), ctx)
+        retry = h["stats"].save(make_auth_event(token, body=_session("sess-1")), ctx)
+
+        assert first["statusCode"] == retry["statusCode"] == 200
+        assert retry["body"] == first["body"]
+        assert retry["headers"]["Idempotent-Replayed"] == "true"
+        assert len(_stats_items(uid)) == 1
+        assert boto3.resource("dynamodb").Table("TestPlayerStatsTable").get_item(
+            Key={"userId": uid, "gameType": "blackjack"}
+        )["Item"]["total_sessions"] == 1
+
+    def test_key_reused_with_different_body_is_rejected(self, dynamodb_tables, mock_context):
+        h, ctx = dynamodb_tables, mock_context
+        token, uid, _ = signup_and_login(h, ctx)
+
+        h["stats"].save(make_auth_event(token, body=_session("sess-1")), ctx)
+        resp = h["stats"].save(make_auth_event(token, body=_session("sess-1", result="loss")), ctx)
+        assert resp["statusCode"] == 422
+        assert len(_stats_items(uid)) == 1
+
+    def test_keys_are_scoped_per_user(self, dynamodb_tables, mock_context):
+        h, ctx = dynamodb_tables, mock_context
+        token_a, uid_a, _ = signup_and_login(h, ctx, "a@example.com")
+        token_b, uid_b, _ = signup_and_login(h, ctx, "b@example.com")
+
+        h["stats"].save(make_auth_event(token_a, body=_session("shared")), ctx)
+        resp = h["stats"].save(make_auth_event(token_b, body=_session("shared")), ctx)
+        assert "headers" not in resp
+        assert len(_stats_items(uid_a)) == len(_stats_items(uid_b)) == 1
+
+    def test_server_error_is_not_stored(self, dynamodb_tables, mock_context, monkeypatch):
+        h, ctx = dynamodb_tables, mock_context
+        token, uid, _ = signup_and_login(h, ctx)
+
+        def unavailable():
+            raise RuntimeError("throttled")
+
+        monkeypatch.setattr(h["stats"], "get_stats_table", unavailable)
+        assert h["stats"].save(make_auth_event(token, body=_session("sess-1")), ctx)["statusCode"] == 500
+
+        monkeypatch.undo()
+        resp = h["stats"].save(make_auth_event(token, body=_session("sess-1")), ctx)
+        assert resp["statusCode"] == 200
+        assert "headers" not in resp
+        assert len(_stats_items(uid)) == 1
+
+    def test_concurrent_duplicate_gets_conflict(self, dynamodb_tables, mock_context):
+        h, ctx = dynamodb_tables, mock_context
+        token, uid, _ = signup_and_login(h, ctx)
+        first = h["stats"].save(make_auth_event(token, body=_session("sess-1")), ctx)
+        assert first["statusCode"] == 200
+
+        # Simulate the first attempt still running for a second session
+        table = boto3.resource("dynamodb").Table("TestIdempotencyTable")
+        record = table.get_item(Key={"idempotencyKey": f"stats#{uid}#sess-1"})["Item"]
+        table.put_item(Item={
+            "idempotencyKey": f"stats#{uid}#sess-2",
+            "fingerprint": record["fingerprint"],
+            "status": "IN_PROGRESS",
+            "expires_at": int(time.time()) + 60,
+        })
+        # The header key takes precedence over details.sessionId
+        resp = h["stats"].save(_keyed(make_auth_event(token, body=_session("sess-1")), "sess-2"), ctx)
+        assert resp["statusCode"] == 409
+
+    def test_expired_claim_can_be_retaken(self, dynamodb_tables, mock_context):
+        h, ctx = dynamodb_tables, mock_context
+        token, uid, _ = signup_and_login(h, ctx)
+        boto3.resource("dynamodb").Table("TestIdempotencyTable").put_item(Item={
+            "idempotencyKey": f"stats#{uid}#sess-1",
+            "fingerprint": "stale",
+            "status": "IN_PROGRESS",
+            "expires_at": int(time.time()) - 1,
+        })
+        resp = h["stats"].save(make_auth_event(token, body=_session("sess-1")), ctx)
+        assert resp["statusCode"] == 200
+        assert len(_stats_items(uid)) == 1
+
+    def test_retried_batch_saves_each_session_once(self, dynamodb_tables, mock_context):
+        h, ctx = dynamodb_tables, mock_context
+        token, uid, _ = signup_and_login(h, ctx)
+        batch = {"sessions": [_session("b1"), _session("b2"), _session("b2")]}
+
+        first = json.loads(h["stats"].save_batch(make_auth_event(token, body=batch), ctx)["body"])
+        retry = json.loads(h["stats"].save_batch(make_auth_event(token, body=batch), ctx)["body"])
+
+        assert [r["status"] for r in first["results"]] == ["saved"] * 3
+        assert [r["status"] for r in retry["results"]] == ["saved"] * 3
+        assert len(_stats_items(uid)) == 2
+        assert boto3.resource("dynamodb").Table("TestPlayerStatsTable").get_item(
+            Key={"userId": uid, "gameType": "blackjack"}
+        )["Item"]["total_sessions"] == 2
+
+    def test_batch_overlapping_stats_post_is_not_duplicated(self, dynamodb_tables, mock_context):
+        h, ctx = dynamodb_tables, mock_context
+        token, uid, _ = signup_and_login(h, ctx)
+        h["stats"].save(make_auth_event(token, body=_session("s1")), ctx)
+
+        batch = {"sessions": [_session("s1"), _session("s2", result="loss")]}
+        for _ in range(2):
+            body = json.loads(h["stats"].save_batch(make_auth_event(token, body=batch), ctx)["body"])
+            assert body["saved"] == 2
+        assert len(_stats_items(uid)) == 2
+
+        # A session first stored by a batch replays on POST /stats as well
+        resp = h["stats"].save(make_auth_event(token, body=_session("s2", result="loss")), ctx)
+        assert resp["headers"]["Idempotent-Replayed"] == "true"
+        assert len(_stats_items(uid)) == 2
+
+    def test_batch_session_with_reused_id_is_a_conflict(self, dynamodb_tables, mock_context):
+        h, ctx = dynamodb_tables, mock_context
+        token, uid, _ = signup_and_login(h, ctx)
+        h["stats"].save(make_auth_event(token, body=_session("s1")), ctx)
+
+        batch = {"sessions": [_session("s1", result="loss")]}
+        body = json.loads(h["stats"].save_batch(make_auth_event(token, body=batch), ctx)["body"])
+        assert body["results"] == [{"index": 0, "status": "conflict"}]
+        assert body["conflict"] == 1
+        assert len(_stats_items(uid)) == 1
+
+
+class TestHeaderKeyedEndpoints:
+
+    def test_signup_retry_replays_created_response(self, dynamodb_tables, mock_context):
+        h, ctx = dynamodb_tables, mock_context
+        event = {
+            "headers": {"Idempotency-Key": "signup-1"},
+            "body": json.dumps({"email": "new@example.com", "password": "pw123456"}),
+        }
+        first = h["auth"].signup(event, ctx)
+        retry = h["auth"].signup(event, ctx)
+        assert first["statusCode"] == retry["statusCode"] == 201
+        assert json.loads(retry["body"])["user_id"] == json.loads(first["body"])["user_id"]
+
+        # Without a key the retry still runs and reports the duplicate
+        unkeyed = h["auth"].signup({"body": event["body"]}, ctx)
+        assert unkeyed["statusCode"] == 400
+
+    def test_learning_progress_retry_is_replayed(self, dynamodb_tables, mock_context):
+        h, ctx = dynamodb_tables, mock_context
+        token, uid, _ = signup_and_login(h, ctx)
+        body = {
+            "game_type": "blackjack",
+            "skill_level": "beginner",
+            "completed_card_ids": ["bj_rule_goal"],
+        }
+        first = h["learning"].save_progress(_keyed(make_auth_event(token, body=body), "lp-1"), ctx)
+        retry = h["learning"].save_progress(_keyed(make_auth_event(token, body=body), "lp-1"), ctx)
+        assert first["statusCode"] == 200
+        assert retry["body"] == first["body"]
+        assert retry["headers"]["Idempotent-Replayed"] == "true"
+
+    def test_requests_without_key_are_not_recorded(self, dynamodb_tables, mock_context):
+        h, ctx = dynamodb_tables, mock_context
+        token, uid, _ = signup_and_login(h, ctx)
+        h["stats"].save(make_auth_event(token, body={"result": "win", "mistakes": 0}), ctx)
+        h["stats"].save(make_auth_event(token, body={"result": "win", "mistakes": 0}), ctx)
+        assert len(_stats_items(uid)) == 2
+        assert boto3.resource("dynamodb").Table("TestIdempotencyTable").scan()["Count"] == 0
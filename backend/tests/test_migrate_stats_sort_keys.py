@@ -0,0 +1,126 @@
+"""Tests for the legacy sort key migration (jobs/migrate_stats_sort_keys.py)."""
+
+import json
+
+import boto3
+from boto3.dynamodb.conditions import Key
+
+from jobs import migrate_stats_sort_keys as migration
+from tests.conftest import signup_and_login, make_auth_event
+from utils import stats_items
+
+
+def _items(user_id):
+    return boto3.resource("dynamodb").Table("TestStatsTable").query(
+        KeyConditionExpression=Key("userId").eq(user_id)
+    )["Items"]
+
+
+def _legacy_sessions(user_id):
+    table = boto3.resource("dynamodb").Table("TestStatsTable")
+    decision = {"category": "hard_total", "scenarioKey": "hard_16_vs_10", "isCorrect": False}
+    table.put_item(Item={
+        "userId": user_id, "timestamp": "2026-01-02 10:00:00.000000",
+        "result": "training_session", "mistakes": 1, "training_decisions": [decision],
+    })
+    table.put_item(Item={
+        "userId": user_id, "timestamp": "2026-02-03T10:00:00.000000Z#ab12cd34",
+        "result": "win", "mistakes": 0, "gameType": "blackjack", "net_payout": 10,
+        "training_decisions": [{**decision, "isCorrect": True}],
+        "decision_total": 1, "decision_correct": 1,
+        "decision_categories": {"hard_total": {"total": 1, "correct": 1}},
+        "decision_scenarios": {"hard_16_vs_10": {"total": 1, "correct": 1}},
+    })
+    table.put_item(Item={
+        "userId": user_id, "timestamp": "2026-02-04 10:00:00.000000",
+        "result": "loss", "mistakes": 0, "details": {"gameType": "baccarat"},
+    })
+
+
+def _summary(h, ctx, token):
+    body = json.loads(h["training"].get_summary(
+        make_auth_event(token, query_params={"game_type": "blackjack"}), ctx
+    )["body"])
+    return body["total_decisions"], body["correct_decisions"], body["session_totals"]
+
+
+class TestMigrateStatsSortKeys:
+
+    def test_rekeys_legacy_items_by_game(self, dynamodb_tables, mock_context):
+        _legacy_sessions("u1")
+
+        assert migration.run(dry_run=True) == {"legacy_items": 3, "migrated": 0, "failed": 0}
+        assert migration.run() == {"legacy_items": 3, "migrated": 3, "failed": 0}
+
+        items = {item["timestamp"]: item for item in _items("u1")}
+        assert sorted(key.rsplit("#", 1)[0] for key in items) == [
+            "baccarat#2026-02-04T10:00:00.000000Z",
+            "blackjack#2026-01-02T10:00:00.000000Z",
+            "blackjack#2026-02-03T10:00:00.000000Z",
+        ]
+        migrated = items["blackjack#2026-02-03T10:00:00.000000Z#ab12cd34"]
+        assert migrated["migratedFrom"] == "2026-02-03T10:00:00.000000Z#ab12cd34"
+        assert migrated["net_payout"] == 10
+        # Items that predate the counters gain them on the way
+        by_origin = {item["migratedFrom"]: item for item in items.values()}
+        counted = by_origin["2026-01-02 10:00:00.000000"]
+        assert (counted["decision_total"], counted["decision_correct"]) == (1, 0)
+        assert counted["decision_scenarios"] == {"hard_16_vs_10": {"total": 1, "correct": 0}}
+        assert by_origin["2026-02-04 10:00:00.000000"]["decision_total"] == 0
+
+        # Nothing left to do on a rerun
+        assert migration.run() == {"legacy_items": 0, "migrated": 0, "failed": 0}
+
+    def test_interrupted_copy_is_finished_on_rerun(self, dynamodb_tables, mock_context):
+        _legacy_sessions("u1")
+        table = boto3.resource("dynamodb").Table("TestStatsTable")
+        legacy = table.get_item(Key={"userId": "u1", "timestamp": "2026-01-02 10:00:00.000000"})["Item"]
+        table.put_item(Item={**legacy, "timestamp": migration.migrated_key(legacy), "gameType": "blackjack"})
+
+        assert migration.run(user_id="u1")["migrated"] == 3
+        assert len(_items("u1")) == 3
+        assert all(not key["timestamp"][0].isdigit() for key in _items("u1"))
+
+    def test_summaries_are_unchanged_after_migration(self, dynamodb_tables, mock_context, monkeypatch):
+        h, ctx = dynamodb_tables, mock_context
+        token, uid, _ = signup_and_login(h, ctx)
+        _legacy_sessions(uid)
+        h["stats"].save(make_auth_event(token, body={
+            "result": "training_session", "mistakes": 0,
+            "training_decisions": [{"category": "soft_total", "isCorrect": True}],
+        }), ctx)
+        before = _summary(h, ctx, token)
+        assert before[:2] == (3, 2)
+
+        migration.run(user_id=uid)
+        boto3.resource("dynamodb").Table("TestPlayerStatsTable").delete_item(
+            Key={"userId": uid, "gameType": "blackjack"}
+        )
+        monkeypatch.setattr(stats_items, "STATS_LEGACY_KEYS", False)
+        assert _summary(h, ctx, token) == before
+
+    def test_migrated_items_are_read_without_refetching(self, dynamodb_tables, mock_context, monkeypatch):
+        h, ctx = dynamodb_tables, mock_context
+        token, uid, _ = signup_and_login(h, ctx)
+        _legacy_sessions(uid)
+        migration.run(user_id=uid)
+
+        table = h["stats"].get_stats_table()
+        fetched = []
+        original = table.get_item
+        monkeypatch.setattr(table, "get_item", lambda **kw: fetched.append(kw) or original(**kw))
+        body = json.loads(h["training"].get_progress(
+            make_auth_event(token, query_params={"game_type": "blackjack"}), ctx
+        )["body"])
+        assert [s["total_decisions"] for s in body["snapshots"]] == [1, 1]
+        assert fetched == []
+
+    def test_stream_skips_migrated_copies(self, dynamodb_tables, mock_context):
+        from tests.test_stats_stream import _rollup, _stream_record
+
+        _legacy_sessions("u1")
+        migration.run()
+        records = [_stream_record(item, 100 + i) for i, item in enumerate(_items("u1"))]
+        resp = dynamodb_tables["stats_stream"].consume({"Records": records}, mock_context)
+        assert resp == {"batchItemFailures": []}
+        assert _rollup("u1") is None
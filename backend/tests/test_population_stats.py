@@ -0,0 +1,88 @@
+"""Tests for the parallel-scan population job (jobs/population_stats.py)."""
+
+import os
+from datetime import datetime, timedelta
+from importlib import reload
+from unittest.mock import patch
+
+import boto3
+
+from jobs import population_stats
+from utils.decision_codec import decision_counters
+from utils.timestamps import new_sort_key
+
+START = datetime(2026, 5, 1, 12, 0, 0)
+
+
+def _decision(scenario, is_correct):
+    return {"category": scenario.split("_")[0], "scenarioKey": scenario, "isCorrect": is_correct}
+
+
+def _items():
+    items = []
+    for user in range(6):
+        for session in range(4):
+            decisions = [_decision("hard_16", session % 2 == 0), _decision("soft_18", True)]
+            items.append({
+                "userId": f"user-{user}",
+                "timestamp": new_sort_key("blackjack", START + timedelta(days=session, minutes=user)),
+                "result": "win", "mistakes": 0, "hands_played": 3, "gameType": "blackjack",
+                "training_decisions": decisions,
+                **decision_counters(decisions),
+            })
+    # Legacy item without counters, and another game
+    items.append({
+        "userId": "user-0", "timestamp": "2026-04-30 10:00:00.000000", "result": "loss", "mistakes": 1,
+        "training_decisions": [_decision("hard_16", False)],
+    })
+    items.append({
+        "userId": "user-9", "timestamp": new_sort_key("baccarat", START), "result": "push",
+        "mistakes": 0, "gameType": "baccarat",
+        **decision_counters([]),
+    })
+    return items
+
+
+def _check_blackjack(report):
+    blackjack = report["blackjack"]
+    assert blackjack["players"] == 6
+    assert blackjack["sessions"] == 25
+    assert blackjack["hands_played"] == 72
+    assert blackjack["results"] == {"win": 24, "loss": 1}
+    assert (blackjack["total_decisions"], blackjack["correct_decisions"]) == (49, 36)
+    assert [s["scenario"] for s in blackjack["hardest_scenarios"]] == ["hard_16", "soft_18"]
+    assert blackjack["hardest_scenarios"][0]["total"] == 25
+    assert blackjack["sessions_per_day"]["2026-04-30"] == 1
+    assert sum(blackjack["sessions_per_day"].values()) == 25
+
+
+def test_segments_merge_into_one_report(dynamodb_tables):
+    table = boto3.resource("dynamodb").Table("TestStatsTable")
+    for item in _items():
+        table.put_item(Item=item)
+
+    report = population_stats.run(segments=4, workers=1, min_samples=1)
+    _check_blackjack(report)
+    assert report["baccarat"]["players"] == 1
+    assert report["baccarat"]["total_decisions"] == 0
+
+    assert list(population_stats.run(segments=3, workers=1, game_type="baccarat")) == ["baccarat"]
+
+
+def test_worker_processes_scan_segments(tmp_path):
+    env = {
+        "STORAGE_BACKEND": "sqlite",
+        "SQLITE_PATH": str(tmp_path / "population.sqlite3"),
+        "STATS_TABLE": "LocalStatsTable",
+    }
+    with patch.dict(os.environ, env):
+        import config
+        from utils import database as db_utils
+        reload(config)
+        reload(db_utils)
+        table = db_utils.get_stats_table()
+        for item in _items():
+            table.put_item(Item=item)
+
+        report = population_stats.run(segments=3, workers=2, min_samples=1)
+        _check_blackjack(report)
@@ -0,0 +1,84 @@
+"""Tests for the in-process result cache (utils/result_cache.py)."""
+
+from tests.conftest import signup_and_login, make_auth_event
+from utils.result_cache import ResultCache, summary_cache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_lru_eviction_and_counters():
+    cache = ResultCache(2, 60)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1  # "b" is now least recently used
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["evictions"], stats["size"]) == (2, 1, 1, 2)
+    assert stats["hit_rate"] == round(2 / 3, 4)
+
+
+def test_entries_expire():
+    clock = FakeClock()
+    cache = ResultCache(10, 30, clock=clock)
+    cache.put("a", 1)
+    clock.now = 29.9
+    assert cache.get("a") == 1
+    clock.now = 30
+    assert cache.get("a") is None
+    assert cache.stats()["expirations"] == 1
+    assert cache.stats()["size"] == 0
+
+
+def test_per_entry_ttl_overrides_default():
+    clock = FakeClock()
+    cache = ResultCache(10, 30, clock=clock)
+    cache.put("short", 1, ttl_seconds=5)
+    cache.put("gone", 2, ttl_seconds=0)
+    clock.now = 5
+    assert cache.get("short") is None
+    assert cache.stats()["size"] == 0
+
+
+def test_disabled_cache_stores_nothing():
+    cache = ResultCache(0, 30)
+    cache.put("a", 1)
+    assert cache.get("a") is None
+    assert cache.stats()["size"] == 0
+
+
+def test_training_reads_are_served_from_cache_until_next_save(dynamodb_tables, mock_context, monkeypatch):
+    h, ctx = dynamodb_tables, mock_context
+    token, _, _ = signup_and_login(h, ctx)
+    session = {
+        "result": "training_session", "mistakes": 0,
+        "training_decisions": [{"category": "hard_total", "isCorrect": True}],
+    }
+    h["stats"].save(make_auth_event(token, body=session), ctx)
+    summary_cache.clear()
+    week = make_auth_event(token, query_params={"period": "week"})
+
+    first = h["training"].get_summary(week, ctx)
+    progress = h["training"].get_progress(week, ctx)
+
+    def no_aggregation(*args, **kwargs):
+        raise AssertionError("aggregated on a cache hit")
+
+    with monkeypatch.context() as m:
+        m.setattr(h["training"], "iter_game_items", no_aggregation)
+        m.setattr(h["training"], "_window_profile", no_aggregation)
+        assert h["training"].get_summary(week, ctx)["body"] == first["body"]
+        assert h["training"].get_progress(week, ctx)["body"] == progress["body"]
+    assert summary_cache.stats()["hits"] == 2
+
+    h["stats"].save(make_auth_event(token, body=session), ctx)
+    resp = h["training"].get_summary(week, ctx)
+    assert resp["body"] != first["body"]
+    assert summary_cache.stats()["misses"] == 3
@@ -0,0 +1,150 @@
+"""Tests for the StatsTable stream consumer (handlers/stats_stream.py)."""
+
+import boto3
+from boto3.dynamodb.types import TypeSerializer
+
+_serializer = TypeSerializer()
+
+
+def _stats_item(user_id, timestamp, decisions, result="training_session"):
+    return {
+        "userId": user_id,
+        "timestamp": timestamp,
+        "result": result,
+        "mistakes": sum(0 if d["isCorrect"] else 1 for d in decisions),
+        "gameType": "blackjack",
+        "training_decisions": decisions,
+    }
+
+
+def _decision(category, is_correct):
+    return {"category": category, "scenarioKey": f"{category}_test", "isCorrect": is_correct}
+
+
+def _stream_record(item, sequence_number, event_name="INSERT"):
+    image = {k: _serializer.serialize(v) for k, v in item.items()}
+    return {
+        "eventID": f"evt-{sequence_number}",
+        "eventName": event_name,
+        "eventSource": "aws:dynamodb",
+        "dynamodb": {
+            "Keys": {"userId": image["userId"], "timestamp": image["timestamp"]},
+            "NewImage": image,
+            "SequenceNumber": str(sequence_number),
+        },
+    }
+
+
+def _write_and_record(items, first_sequence=100):
+    """Write items to StatsTable and return the matching stream records."""
+    table = boto3.resource("dynamodb").Table("TestStatsTable")
+    records = []
+    for offset, item in enumerate(items):
+        table.put_item(Item=item)
+        records.append(_stream_record(item, first_sequence + offset))
+    return records
+
+
+def _rollup(user_id):
+    return boto3.resource("dynamodb").Table("TestPlayerStatsTable").get_item(
+        Key={"userId": user_id, "gameType": "blackjack"}
+    ).get("Item")
+
+
+class TestStatsStreamConsumer:
+
+    def test_batch_applies_one_update_per_user(self, dynamodb_tables, mock_context):
+        records = _write_and_record([
+            _stats_item("u1", "2026-01-01 10:00:00", [_decision("hard_total", True)]),
+            _stats_item("u2", "2026-01-01 10:00:01", [_decision("soft_total", False)]),
+            _stats_item("u1", "2026-01-01 10:00:02", [_decision("hard_total", False)]),
+        ])
+
+        resp = dynamodb_tables["stats_stream"].consume({"Records": records}, mock_context)
+        assert resp == {"batchItemFailures": []}
+
+        u1 = _rollup("u1")
+        assert u1["total_sessions"] == 2
+        assert (u1["categories"]["hard_total"]["total"], u1["categories"]["hard_total"]["correct"]) == (2, 1)
+        assert u1["version"] == 1
+        assert _rollup("u2")["total_decisions"] == 1
+
+    def test_redelivered_records_are_not_double_counted(self, dynamodb_tables, mock_context):
+        consume = dynamodb_tables["stats_stream"].consume
+        first = _write_and_record([
+            _stats_item("u1", "2026-01-01 10:00:00", [_decision("hard_total", True)]),
+        ], first_sequence=100)
+        consume({"Records": first}, mock_context)
+
+        second = _write_and_record([
+            _stats_item("u1", "2026-01-01 10:05:00", [_decision("hard_total", False)]),
+        ], first_sequence=200)
+        # Lambda retries from a checkpoint and re-sends an already applied record
+        consume({"Records": first + second}, mock_context)
+        consume({"Records": first + second}, mock_context)
+
+        u1 = _rollup("u1")
+        assert u1["total_sessions"] == 2
+        assert (u1["categories"]["hard_total"]["total"], u1["categories"]["hard_total"]["correct"]) == (2, 1)
+        assert u1["stream_checkpoint"] == 200
+
+    def test_partial_failure_reports_earliest_sequence_of_failed_user(
+        self, dynamodb_tables, mock_context, monkeypatch
+    ):
+        stream = dynamodb_tables["stats_stream"]
+        records = _write_and_record([
+            _stats_item("ok-user", "2026-01-01 10:00:00", [_decision("hard_total", True)]),
+            _stats_item("bad-user", "2026-01-01 10:00:01", [_decision("hard_total", True)]),
+            _stats_item("bad-user", "2026-01-01 10:00:02", [_decision("hard_total", True)]),
+        ], first_sequence=300)
+
+        original = stream.player_stats.apply_stream_records
+
+        def flaky(user_id, game_type, grouped):
+            if user_id == "bad-user":
+                raise RuntimeError("throttled")
+            return original(user_id, game_type, grouped)
+
+        monkeypatch.setattr(stream.player_stats, "apply_stream_records", flaky)
+        resp = stream.consume({"Records": records}, mock_context)
+        assert resp == {"batchItemFailures": [{"itemIdentifier": "301"}]}
+        assert _rollup("ok-user")["total_sessions"] == 1
+        assert _rollup("bad-user") is None
+
+        # Lambda re-delivers from 301 onward; the retry succeeds
+        monkeypatch.setattr(stream.player_stats, "apply_stream_records", original)
+        resp = stream.consume({"Records": records[1:]}, mock_context)
+        assert resp == {"batchItemFailures": []}
+        assert _rollup("bad-user")["total_sessions"] == 2
+
+    def test_failed_group_discards_its_rollup(self, dynamodb_tables, mock_context, monkeypatch):
+        stream = dynamodb_tables["stats_stream"]
+        consume = stream.consume
+        consume({"Records": _write_and_record([
+            _stats_item("u1", "2026-01-01 10:00:00", [_decision("hard_total", True)]),
+        ], first_sequence=100)}, mock_context)
+        assert _rollup("u1")["total_sessions"] == 1
+
+        records = _write_and_record([
+            _stats_item("u1", "2026-01-01 10:05:00", [_decision("hard_total", False)]),
+        ], first_sequence=200)
+
+        def throttled(*args):
+            raise RuntimeError("throttled")
+
+        monkeypatch.setattr(stream.player_stats, "apply_stream_records", throttled)
+        assert consume({"Records": records}, mock_context) == {"batchItemFailures": [{"itemIdentifier": "200"}]}
+        # Even if Lambda gives up on the batch, the rebuild picks the session up
+        assert _rollup("u1") is None
+        monkeypatch.undo()
+        assert dynamodb_tables["training"].player_stats.ensure_profile("u1", "blackjack")["total_sessions"] == 2
+
+    def test_ignores_non_insert_and_malformed_records(self, dynamodb_tables, mock_context):
+        item = _stats_item("u1", "2026-01-01 10:00:00", [_decision("hard_total", True)])
+        records = [
+            _stream_record(item, 1, event_name="REMOVE"),
+            {"eventID": "broken", "eventName": "INSERT", "dynamodb": {}},
+        ]
+        resp = dynamodb_tables["stats_stream"].consume({"Records": records}, mock_context)
+        assert resp == {"batchItemFailures": []}
+        assert _rollup("u1") is None
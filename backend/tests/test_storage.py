@@ -0,0 +1,276 @@
+"""Tests for the local storage engines in utils.storage.
+
+The in-memory and SQLite engines must behave like a boto3 Table for the
+calls our handlers make, so every behaviour test runs against both.
+"""
+
+import json
+import os
+from decimal import Decimal
+from importlib import reload
+from unittest.mock import patch
+
+import pytest
+from boto3.dynamodb.conditions import Attr, Key
+from botocore.exceptions import ClientError
+
+from utils.storage import MemoryBackend, SQLiteBackend
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def backend(request, tmp_path):
+    if request.param == "memory":
+        return MemoryBackend()
+    return SQLiteBackend(str(tmp_path / "local.sqlite3"))
+
+
+@pytest.fixture
+def stats_table(backend):
+    return backend.table("StatsTable", "userId", "timestamp")
+
+
+def _put_sessions(table, user_id, count):
+    for i in range(count):
+        table.put_item(Item={"userId": user_id, "timestamp": f"2026-01-{i + 1:02d}", "n": i})
+
+
+# ============================================================
+# Item operations
+# ============================================================
+
+class TestItemOperations:
+
+    def test_put_and_get_round_trips_dynamodb_types(self, stats_table):
+        stats_table.put_item(Item={
+            "userId": "u1", "timestamp": "t1", "mistakes": 3,
+            "details": {"accuracy": Decimal("0.75"), "tags": ["a"]},
+            "blob": b"\x00\x01", "flag": True,
+        })
+        item = stats_table.get_item(Key={"userId": "u1", "timestamp": "t1"})["Item"]
+        assert item["mistakes"] == Decimal(3)
+        assert item["details"] == {"accuracy": Decimal("0.75"), "tags": ["a"]}
+        assert item["blob"].value == b"\x00\x01"
+        assert item["flag"] is True
+
+    def test_get_missing_item(self, stats_table):
+        assert "Item" not in stats_table.get_item(Key={"userId": "u1", "timestamp": "x"})
+
+    def test_floats_rejected_like_boto3(self, stats_table):
+        with pytest.raises(ClientError):
+            stats_table.put_item(Item={"userId": "u1", "timestamp": "t1", "x": 0.5})
+
+    @pytest.mark.parametrize("item", [
+        {"details": {5: "x"}},
+        {"tags": set()},
+        {"big": Decimal("1e200")},
+        {"timestamp": ""},
+        {"timestamp": {"nested": "key"}},
+    ])
+    def test_values_dynamodb_rejects_are_rejected(self, stats_table, item):
+        with pytest.raises(ClientError) as e:
+            stats_table.put_item(Item={"userId": "u1", "timestamp": "t1", **item})
+        assert e.value.response["Error"]["Code"] == "ValidationException"
+        with pytest.raises(ClientError):
+            stats_table.update_item(
+                Key={"userId": "u1", "timestamp": "t1"},
+                UpdateExpression="SET v = :v", ExpressionAttributeValues={":v": {7: 1}},
+            )
+
+    def test_conditional_put(self, stats_table):
+        item = {"userId": "u1", "timestamp": "t1"}
+        stats_table.put_item(Item=item, ConditionExpression=Attr("userId").not_exists())
+        with pytest.raises(ClientError) as exc:
+            stats_table.put_item(Item=item, ConditionExpression="attribute_not_exists(userId)")
+        assert exc.value.response["Error"]["Code"] == "ConditionalCheckFailedException"
+
+    def test_update_set_add_remove(self, stats_table):
+        key = {"userId": "u1", "timestamp": "t1"}
+        stats_table.put_item(Item={**key, "otp": "123456", "counts": {}})
+        resp = stats_table.update_item(
+            Key=key,
+            UpdateExpression="SET #n = if_not_exists(#n, :zero) + :one, counts.#c = :one "
+                             "ADD hits :one REMOVE otp",
+            ExpressionAttributeNames={"#n": "total", "#c": "hard_total"},
+            ExpressionAttributeValues={":zero": 0, ":one": 1},
+            ReturnValues="ALL_NEW",
+        )
+        item = resp["Attributes"]
+        assert item["total"] == 1
+        assert item["hits"] == 1
+        assert item["counts"] == {"hard_total": 1}
+        assert "otp" not in item
+
+    def test_update_invalid_nested_path(self, stats_table):
+        with pytest.raises(ClientError) as exc:
+            stats_table.update_item(
+                Key={"userId": "u1", "timestamp": "t1"},
+                UpdateExpression="SET missing.child = :v",
+                ExpressionAttributeValues={":v": 1},
+            )
+        assert exc.value.response["Error"]["Code"] == "ValidationException"
+
+    def test_conditional_update_with_version(self, stats_table):
+        key = {"userId": "u1", "timestamp": "t1"}
+        stats_table.put_item(Item={**key, "version": 1})
+        stats_table.update_item(
+            Key=key, UpdateExpression="SET version = :next",
+            ConditionExpression=Attr("version").eq(1),
+            ExpressionAttributeValues={":next": 2},
+        )
+        with pytest.raises(ClientError):
+            stats_table.update_item(
+                Key=key, UpdateExpression="SET version = :next",
+                ConditionExpression=Attr("version").eq(1),
+                ExpressionAttributeValues={":next": 3},
+            )
+
+    def test_delete_item(self, stats_table):
+        key = {"userId": "u1", "timestamp": "t1"}
+        stats_table.put_item(Item=key)
+        stats_table.delete_item(Key=key)
+        assert "Item" not in stats_table.get_item(Key=key)
+
+
+# ============================================================
+# Query / Scan
+# ============================================================
+
+class TestQuery:
+
+    def test_query_orders_and_isolates_partitions(self, stats_table):
+        _put_sessions(stats_table, "u1", 5)
+        _put_sessions(stats_table, "u2", 2)
+        items = stats_table.query(KeyConditionExpression=Key("userId").eq("u1"))["Items"]
+        assert [i["n"] for i in items] == [0, 1, 2, 3, 4]
+
+        items = stats_table.query(
+            KeyConditionExpression=Key("userId").eq("u1"), ScanIndexForward=False,
+        )["Items"]
+        assert [i["n"] for i in items] == [4, 3, 2, 1, 0]
+
+    def test_query_range_conditions(self, stats_table):
+        _put_sessions(stats_table, "u1", 10)
+        between = stats_table.query(
+            KeyConditionExpression=Key("userId").eq("u1")
+            & Key("timestamp").between("2026-01-03", "2026-01-05"),
+        )["Items"]
+        assert [i["n"] for i in between] == [2, 3, 4]
+
+        prefix = stats_table.query(
+            KeyConditionExpression=Key("userId").eq("u1") & Key("timestamp").begins_with("2026-01-1"),
+            ScanIndexForward=False,
+        )["Items"]
+        assert [i["n"] for i in prefix] == [9]
+
+        newer = stats_table.query(
+            KeyConditionExpression="userId = :u AND #ts > :t",
+            ExpressionAttributeNames={"#ts": "timestamp"},
+            ExpressionAttributeValues={":u": "u1", ":t": "2026-01-08"},
+        )["Items"]
+        assert [i["n"] for i in newer] == [8, 9]
+
+    @pytest.mark.parametrize("forward", [True, False])
+    def test_query_pagination(self, stats_table, forward):
+        _put_sessions(stats_table, "u1", 7)
+        seen, kwargs = [], {}
+        while True:
+            page = stats_table.query(
+                KeyConditionExpression=Key("userId").eq("u1"),
+                ScanIndexForward=forward, Limit=3, **kwargs,
+            )
+            seen.extend(i["n"] for i in page["Items"])
+            if "LastEvaluatedKey" not in page:
+                break
+            kwargs = {"ExclusiveStartKey": page["LastEvaluatedKey"]}
+        expected = list(range(7))
+        assert seen == (expected if forward else expected[::-1])
+
+    def test_query_projection_and_filter(self, stats_table):
+        _put_sessions(stats_table, "u1", 4)
+        page = stats_table.query(
+            KeyConditionExpression=Key("userId").eq("u1"),
+            FilterExpression=Attr("n").gte(2),
+            ProjectionExpression="#ts, n",
+            ExpressionAttributeNames={"#ts": "timestamp"},
+            Limit=3,
+        )
+        assert page["ScannedCount"] == 3
+        assert page["Items"] == [{"timestamp": "2026-01-03", "n": 2}]
+        assert "LastEvaluatedKey" in page
+
+    def test_parallel_scan_segments_cover_table(self, stats_table):
+        for user in range(20):
+            _put_sessions(stats_table, f"u{user}", 3)
+        seen = []
+        for segment in range(4):
+            kwargs = {}
+            while True:
+                page = stats_table.scan(Segment=segment, TotalSegments=4, Limit=5, **kwargs)
+                seen.extend((i["userId"], i["timestamp"]) for i in page["Items"])
+                if "LastEvaluatedKey" not in page:
+                    break
+                kwargs = {"ExclusiveStartKey": page["LastEvaluatedKey"]}
+        assert len(seen) == 60
+        assert len(set(seen)) == 60
+
+    def test_numeric_sort_keys_order_by_value(self, backend):
+        table = backend.table("ScoresTable", "userId", "score")
+        # Past float precision, and spanning signs and exponents
+        scores = [
+            Decimal("12345678901234567890.000000000000000001"),
+            Decimal("12345678901234567890"),
+            Decimal("-1.23"), Decimal("-1.2"), Decimal("0"), Decimal("1E-130"),
+            Decimal("99"), Decimal("100"), Decimal("-100"), Decimal("1E+125"),
+        ]
+        for score in scores:
+            table.put_item(Item={"userId": "u1", "score": score})
+        items = table.query(KeyConditionExpression=Key("userId").eq("u1"))["Items"]
+        assert [i["score"] for i in items] == sorted(scores)
+        above = table.query(
+            KeyConditionExpression=Key("userId").eq("u1") & Key("score").gt(Decimal("12345678901234567890")),
+        )["Items"]
+        assert [i["score"] for i in above] == [scores[0], Decimal("1E+125")]
+
+    def test_hash_only_table(self, backend):
+        users = backend.table("UsersTable", "email")
+        users.put_item(Item={"email": "a@example.com", "id": "1"})
+        assert users.get_item(Key={"email": "a@example.com"})["Item"]["id"] == "1"
+        with pytest.raises(ClientError):
+            users.get_item(Key={"email": "a@example.com", "extra": "x"})
+
+
+# ============================================================
+# Handlers on a local backend
+# ============================================================
+
+def test_handlers_run_on_memory_backend(mock_context):
+    env = {
+        "STORAGE_BACKEND": "memory",
+        "STATS_TABLE": "LocalStatsTable",
+        "USERS_TABLE": "LocalUsersTable",
+        "SECRET_KEY": "test-secret-key",
+    }
+    with patch.dict(os.environ, env):
+        import config
+        from utils import database as db_utils
+        from utils import auth as auth_utils
+        from handlers import stats as stats_handlers
+        from handlers import training as training_handlers
+        for module in (config, auth_utils, db_utils, stats_handlers, training_handlers):
+            reload(module)
+
+        token = auth_utils.create_access_token({"sub": "local-user", "email": "l@example.com"})
+        headers = {"Authorization": f"Bearer {token}"}
+        for correct in (True, False, True):
+            resp = stats_handlers.save({"headers": headers, "body": json.dumps({
+                "result": "training_session",
+                "mistakes": 0 if correct else 1,
+                "training_decisions": [{"category": "hard_total", "isCorrect": correct}],
+            })}, mock_context)
+            assert resp["statusCode"] == 200
+
+        resp = training_handlers.get_summary({"headers": headers}, mock_context)
+        body = json.loads(resp["body"])
+        assert body["total_decisions"] == 3
+        assert body["correct_decisions"] == 2
+        assert db_utils.get_registry_stats()["backend"] == "memory"
@@ -0,0 +1,76 @@
+"""Tests for StatsTable sort keys and period windows (utils/timestamps.py)."""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from utils.timestamps import (
+    game_key_bounds, in_window, is_legacy_key, new_sort_key, period_window,
+    sort_key_bounds, sort_key_time,
+)
+
+
+def test_new_sort_keys_are_unique_and_chronological():
+    now = datetime(2026, 3, 1, 12, 0, 0)
+    same_instant = {new_sort_key("blackjack", now) for _ in range(100)}
+    assert len(same_instant) == 100
+    later = new_sort_key("blackjack", now + timedelta(microseconds=1))
+    assert all(key < later for key in same_instant)
+    assert sort_key_time(later) == now + timedelta(microseconds=1)
+
+
+def test_sort_key_time_reads_legacy_keys():
+    assert sort_key_time("2026-03-01 12:00:00.250000") == datetime(2026, 3, 1, 12, 0, 0, 250000)
+    assert sort_key_time("2026-03-01 12:00:00") == datetime(2026, 3, 1, 12, 0, 0)
+    assert sort_key_time("2026-03-01T12:00:00.000000Z#ab12cd34") == datetime(2026, 3, 1, 12, 0, 0)
+    assert is_legacy_key("2026-03-01T12:00:00.000000Z#ab12cd34")
+    assert not is_legacy_key(new_sort_key("blackjack"))
+
+
+def _unprefixed(now):
+    return new_sort_key("blackjack", now).split("#", 1)[1]
+
+
+def test_legacy_bounds_cover_both_key_forms():
+    start, end = datetime(2026, 3, 1, 12, 0, 0), datetime(2026, 3, 8, 12, 0, 0)
+    low, high = sort_key_bounds(start, end)
+    inside = [
+        "2026-03-01 12:00:00.000001",
+        _unprefixed(datetime(2026, 3, 1, 12, 0, 1)),
+        "2026-03-08 11:59:59.999999",
+        _unprefixed(end),
+    ]
+    for key in inside:
+        assert low <= key <= high
+        assert in_window(key, start, end)
+
+    for key in ("2026-02-28 23:59:59.000000", _unprefixed(end + timedelta(seconds=1))):
+        assert not (low <= key <= high) or not in_window(key, start, end)
+    # Inside the key range on the boundary day, trimmed by in_window
+    early = _unprefixed(datetime(2026, 3, 1, 8, 0, 0))
+    assert low <= early <= high
+    assert not in_window(early, start, end)
+
+
+def test_game_bounds_select_one_game():
+    start, end = datetime(2026, 3, 1), datetime(2026, 3, 8)
+    low, high = game_key_bounds("blackjack", start, end)
+    assert low <= new_sort_key("blackjack", start) <= high
+    assert low <= new_sort_key("blackjack", end) <= high
+    for key in (
+        new_sort_key("blackjack", start - timedelta(microseconds=1)),
+        new_sort_key("blackjack", end + timedelta(microseconds=1)),
+        new_sort_key("baccarat", datetime(2026, 3, 4)),
+        new_sort_key("blackjack_v2", datetime(2026, 3, 4)),
+        "2026-03-04 00:00:00.000000",
+    ):
+        assert not low <= key <= high
+
+
+def test_period_window():
+    now = datetime(2026, 3, 31)
+    assert period_window("all", now) is None
+    assert period_window("week", now) == (datetime(2026, 3, 24), now)
+    assert period_window("month", now) == (datetime(2026, 3, 1), now)
+    with pytest.raises(ValueError):
+        period_window("year", now)
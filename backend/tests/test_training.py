@@ -4,8 +4,12 @@ import os
 from unittest.mock import patch, MagicMock
 from moto import mock_aws
 import boto3
-from datetime import datetime
+from botocore.exceptions import ClientError
+from datetime import datetime, timedelta
 from jose import jwt
+from utils.decision_codec import decisions_of
+from utils import stats_items
+from utils.timestamps import new_sort_key
 
 
 @pytest.fixture
@@ -13,6 +17,9 @@ def dynamodb_tables():
     with patch.dict(os.environ, {
         "USERS_TABLE": "TestUsersTable",
         "STATS_TABLE": "TestStatsTable",
+        "PLAYER_STATS_TABLE": "TestPlayerStatsTable",
+        "IDEMPOTENCY_TABLE": "TestIdempotencyTable",
+        "REFRESH_TOKENS_TABLE": "TestRefreshTokensTable",
         "SECRET_KEY": "test-secret-key",
         "APP_NAME": "TestApp",
         "AWS_DEFAULT_REGION": "us-east-1",
@@ -40,10 +47,35 @@ def dynamodb_tables():
                 ],
                 BillingMode="PAY_PER_REQUEST",
             )
+            dynamodb.create_table(
+                TableName="TestPlayerStatsTable",
+                KeySchema=[
+                    {"AttributeName": "userId", "KeyType": "HASH"},
+                    {"AttributeName": "gameType", "KeyType": "RANGE"},
+                ],
+                AttributeDefinitions=[
+                    {"AttributeName": "userId", "AttributeType": "S"},
+                    {"AttributeName": "gameType", "AttributeType": "S"},
+                ],
+                BillingMode="PAY_PER_REQUEST",
+            )
+            dynamodb.create_table(
+                TableName="TestIdempotencyTable",
+                KeySchema=[{"AttributeName": "idempotencyKey", "KeyType": "HASH"}],
+                AttributeDefinitions=[{"AttributeName": "idempotencyKey", "AttributeType": "S"}],
+                BillingMode="PAY_PER_REQUEST",
+            )
+            dynamodb.create_table(
+                TableName="TestRefreshTokensTable",
+                KeySchema=[{"AttributeName": "tokenHash", "KeyType": "HASH"}],
+                AttributeDefinitions=[{"AttributeName": "tokenHash", "AttributeType": "S"}],
+                BillingMode="PAY_PER_REQUEST",
+            )
 
             # Reload modules inside mock_aws
             import config
             from utils import database as db_utils
+            from utils import idempotency as idempotency_utils
             from utils import auth as auth_utils
             from handlers import auth as auth_handlers
             from handlers import stats as stats_handlers
@@ -52,6 +84,7 @@ def dynamodb_tables():
             reload(config)
             reload(auth_utils)
             reload(db_utils)
+            reload(idempotency_utils)
             reload(auth_handlers)
             reload(stats_handlers)
             reload(training_handlers)
@@ -132,8 +165,15 @@ def test_save_stats_with_training_decisions(dynamodb_tables, mock_context):
         KeyConditionExpression=boto3.dynamodb.conditions.Key("userId").eq(decoded["sub"])
     )["Items"]
     assert len(items) == 1
-    assert "training_decisions" in items[0]
-    assert len(items[0]["training_decisions"]) == 2
+    assert "training_decisions_bin" in items[0]
+    assert decisions_of(items[0]) == decisions
+    assert items[0]["decision_total"] == 2
+    assert items[0]["decision_correct"] == 1
+    assert items[0]["decision_categories"] == {
+        "hard_total": {"total": 1, "correct": 1},
+        "soft_total": {"total": 1, "correct": 0},
+    }
+    assert items[0]["decision_scenarios"]["soft_total_test"] == {"total": 1, "correct": 0}
 
 
 def test_save_stats_without_training_decisions_backward_compatible(dynamodb_tables, mock_context):
@@ -280,6 +320,33 @@ def test_get_progress_returns_snapshots(dynamodb_tables, mock_context):
     assert body["snapshots"][1]["overall_accuracy"] == 1.0
 
 
+def test_get_progress_caps_to_most_recent_sessions(dynamodb_tables, mock_context, monkeypatch):
+    handlers = dynamodb_tables
+    token, email = _signup_and_get_token(handlers, mock_context, "capped@example.com")
+    monkeypatch.setattr(handlers["training"], "DEFAULT_PROGRESS_POINTS", 2)
+    for size in (1, 2, 3):
+        _save_stats_with_training(
+            handlers, mock_context, token, email, [_make_decision("hard_total", True)] * size,
+        )
+
+    def progress(**params):
+        event = {
+            "headers": {"Authorization": f"Bearer {token}"},
+            "queryStringParameters": {"game_type": "blackjack", **params},
+        }
+        return json.loads(handlers["training"].get_progress(event, mock_context)["body"])
+
+    # The oldest session is dropped; the rest stay in chronological order
+    body = progress(downsample="recent")
+    assert [s["total_decisions"] for s in body["snapshots"]] == [2, 3]
+    assert body["source_points"] == 2
+    # Without any parameters the series is still bounded by the default
+    body = progress()
+    assert body["downsample"] == "bucket"
+    assert len(body["snapshots"]) <= 2
+    assert sum(s["total_decisions"] for s in body["snapshots"]) == 6
+
+
 def test_get_progress_unauthorized(dynamodb_tables, mock_context):
     handlers = dynamodb_tables
     event = {
@@ -288,3 +355,469 @@ def test_get_progress_unauthorized(dynamodb_tables, mock_context):
     }
     resp = handlers["training"].get_progress(event, mock_context)
     assert resp["statusCode"] == 401
+
+
+def test_summary_and_progress_follow_every_page(dynamodb_tables, mock_context, monkeypatch):
+    from utils import database as db_utils
+    monkeypatch.setattr(db_utils, "QUERY_PAGE_SIZE", 2)
+
+    handlers = dynamodb_tables
+    token, email = _signup_and_get_token(handlers, mock_context, "paged@example.com")
+    for _ in range(5):
+        _save_stats_with_training(handlers, mock_context, token, email, [
+            _make_decision("hard_total", True),
+            _make_decision("soft_total", False, "hit", "stand"),
+        ])
+
+    event = {
+        "headers": {"Authorization": f"Bearer {token}"},
+        "queryStringParameters": {"game_type": "blackjack"},
+    }
+    summary = json.loads(handlers["training"].get_summary(event, mock_context)["body"])
+    assert summary["total_decisions"] == 10
+    assert summary["correct_decisions"] == 5
+
+    progress = json.loads(handlers["training"].get_progress(event, mock_context)["body"])
+    assert len(progress["snapshots"]) == 5
+
+
+def test_progress_counts_legacy_items_in_memory(dynamodb_tables, mock_context, monkeypatch):
+    handlers = dynamodb_tables
+    token, email = _signup_and_get_token(handlers, mock_context, "counters@example.com")
+    user_id = jwt.decode(token, os.environ["SECRET_KEY"], algorithms=["HS256"])["sub"]
+
+    # A session written before per-session counters existed
+    stats_table = boto3.resource("dynamodb").Table("TestStatsTable")
+    stats_table.put_item(Item={
+        "userId": user_id,
+        "timestamp": "2025-01-01 10:00:00.000000",
+        "result": "training_session",
+        "mistakes": 1,
+        "training_decisions": [_make_decision("soft_total", True), _make_decision("soft_total", False)],
+    })
+    for _ in range(3):
+        _save_stats_with_training(handlers, mock_context, token, email, [_make_decision("hard_total", True)])
+
+    table = handlers["stats"].get_stats_table()
+    calls = []
+    for name in ("get_item", "update_item"):
+        original = getattr(table, name)
+        monkeypatch.setattr(table, name, lambda _o=original, _n=name, **kw: calls.append(_n) or _o(**kw))
+    event = {"headers": {"Authorization": f"Bearer {token}"}}
+    progress = json.loads(handlers["training"].get_progress(event, mock_context)["body"])
+
+    assert [s["total_decisions"] for s in progress["snapshots"]] == [2, 1, 1, 1]
+    assert progress["snapshots"][0]["overall_accuracy"] == 0.5
+    assert progress["snapshots"][0]["timestamp"] == "2025-01-01T10:00:00"
+    # Counted from the projected decisions: no per-item read, and no write on a GET
+    assert calls == []
+    legacy = stats_table.get_item(Key={"userId": user_id, "timestamp": "2025-01-01 10:00:00.000000"})["Item"]
+    assert "decision_total" not in legacy
+
+
+def test_summary_and_progress_period_windows(dynamodb_tables, mock_context, monkeypatch):
+    handlers = dynamodb_tables
+    token, email = _signup_and_get_token(handlers, mock_context, "period@example.com")
+    user_id = jwt.decode(token, os.environ["SECRET_KEY"], algorithms=["HS256"])["sub"]
+    table = boto3.resource("dynamodb").Table("TestStatsTable")
+    now = datetime.utcnow()
+
+    # Legacy-keyed sessions without counters: one inside the week, one old
+    for days_ago, correct in ((3, True), (60, False)):
+        table.put_item(Item={
+            "userId": user_id,
+            "timestamp": str(now - timedelta(days=days_ago)),
+            "result": "training_session",
+            "mistakes": 0 if correct else 1,
+            "training_decisions": [_make_decision("soft_total", correct)],
+        })
+    # ISO-keyed session from 20 days ago, plus one saved now
+    table.put_item(Item={
+        "userId": user_id,
+        "timestamp": new_sort_key("blackjack", now - timedelta(days=20)),
+        "result": "win", "mistakes": 0, "gameType": "blackjack", "net_payout": 10,
+        "training_decisions": [_make_decision("pair_split", True)] * 2,
+        "decision_total": 2, "decision_correct": 2,
+        "decision_categories": {"pair_split": {"total": 2, "correct": 2}},
+    })
+    _save_stats_with_training(handlers, mock_context, token, email, [_make_decision("hard_total", False)])
+
+    key_conditions = []
+    original = stats_items.iter_query
+
+    def spy(table, **kwargs):
+        key_conditions.append(kwargs["KeyConditionExpression"])
+        return original(table, **kwargs)
+
+    monkeypatch.setattr(stats_items, "iter_query", spy)
+
+    def summary(period):
+        event = {
+            "headers": {"Authorization": f"Bearer {token}"},
+            "queryStringParameters": {"game_type": "blackjack", "period": period},
+        }
+        return handlers["training"].get_summary(event, mock_context)
+
+    week = json.loads(summary("week")["body"])
+    assert week["period"] == "week"
+    assert (week["total_decisions"], week["correct_decisions"]) == (2, 1)
+    assert week["session_totals"]["sessions"] == 2
+    assert key_conditions[-1].get_expression()["operator"] == "AND"
+
+    month = json.loads(summary("month")["body"])
+    assert (month["total_decisions"], month["correct_decisions"]) == (4, 3)
+    assert month["session_totals"]["net_payout"] == 10
+    assert {c["category"] for c in month["category_stats"]} == {"soft_total", "hard_total", "pair_split"}
+
+    everything = json.loads(summary("all")["body"])
+    assert everything["total_decisions"] == 5
+    assert summary("year")["statusCode"] == 400
+
+    progress = json.loads(handlers["training"].get_progress({
+        "headers": {"Authorization": f"Bearer {token}"},
+        "queryStringParameters": {"period": "week"},
+    }, mock_context)["body"])
+    assert [s["total_decisions"] for s in progress["snapshots"]] == [1, 1]
+
+
+def _scenario_decision(scenario, is_correct):
+    return {"category": scenario.split("_")[0] + "_total", "scenarioKey": scenario, "isCorrect": is_correct}
+
+
+def test_summary_ranks_weakest_scenarios_with_min_samples(dynamodb_tables, mock_context):
+    handlers = dynamodb_tables
+    token, email = _signup_and_get_token(handlers, mock_context, "scenarios@example.com")
+    decisions = (
+        [_scenario_decision("hard_16_vs_10", False)] * 4 + [_scenario_decision("hard_16_vs_10", True)]
+        + [_scenario_decision("soft_18_vs_9", False)] * 3 + [_scenario_decision("soft_18_vs_9", True)] * 3
+        + [_scenario_decision("hard_12_vs_3", True)] * 5
+        + [_scenario_decision("pair_8_vs_10", False)] * 2  # below the sample threshold
+    )
+    _save_stats_with_training(handlers, mock_context, token, email, decisions)
+
+    def summary(**params):
+        event = {"headers": {"Authorization": f"Bearer {token}"}, "queryStringParameters": params}
+        return handlers["training"].get_summary(event, mock_context)
+
+    body = json.loads(summary()["body"])
+    assert [s["scenario"] for s in body["weakest_scenarios"]] == [
+        "hard_16_vs_10", "soft_18_vs_9", "hard_12_vs_3",
+    ]
+    assert body["weakest_scenarios"][0] == {
+        "scenario": "hard_16_vs_10", "total": 5, "correct": 1, "accuracy": 0.2,
+        "error_rate": 0.9, "trend": "insufficient_data",
+    }
+
+    body = json.loads(summary(scenario_limit="1", min_samples="1")["body"])
+    assert body["weakest_scenarios"][0]["scenario"] == "pair_8_vs_10"
+    assert len(body["weakest_scenarios"]) == 1
+
+    # The windowed path folds the same index from write-time counters
+    body = json.loads(summary(period="week")["body"])
+    assert body["weakest_scenarios"][0]["scenario"] == "hard_16_vs_10"
+
+    assert summary(scenario_limit="lots")["statusCode"] == 400
+    assert summary(min_samples="0")["statusCode"] == 400
+
+
+def test_progress_max_points_downsamples(dynamodb_tables, mock_context):
+    handlers = dynamodb_tables
+    token, email = _signup_and_get_token(handlers, mock_context, "points@example.com")
+    for i in range(9):
+        _save_stats_with_training(handlers, mock_context, token, email, [
+            _make_decision("hard_total", i % 3 == 0),
+        ])
+
+    def progress(**params):
+        event = {"headers": {"Authorization": f"Bearer {token}"}, "queryStringParameters": params}
+        return handlers["training"].get_progress(event, mock_context)
+
+    full = json.loads(progress(downsample="recent")["body"])
+    assert len(full["snapshots"]) == 9
+    assert full["source_points"] == 9
+    # Short histories fit the default bound: one bucket per session
+    default = json.loads(progress()["body"])["snapshots"]
+    assert [s["sessions"] for s in default] == [1] * 9
+    assert [s["overall_accuracy"] for s in default] == [s["overall_accuracy"] for s in full["snapshots"]]
+
+    bucketed = json.loads(progress(max_points="4")["body"])
+    assert bucketed["downsample"] == "bucket"
+    assert bucketed["source_points"] == 9
+    assert len(bucketed["snapshots"]) <= 4
+    assert sum(s["total_decisions"] for s in bucketed["snapshots"]) == 9
+    assert sum(s["correct_decisions"] for s in bucketed["snapshots"]) == 3
+
+    # Snapshots carry plain ISO times, never the internal sort keys
+    for snapshot in full["snapshots"] + bucketed["snapshots"]:
+        assert "#" not in snapshot["timestamp"]
+        datetime.fromisoformat(snapshot["timestamp"])
+    assert bucketed["snapshots"][0]["start_timestamp"] == full["snapshots"][0]["timestamp"]
+    assert bucketed["snapshots"][-1]["timestamp"] == full["snapshots"][-1]["timestamp"]
+
+    picked = json.loads(progress(max_points="4", downsample="lttb")["body"])["snapshots"]
+    assert len(picked) == 4
+    assert picked[0] == full["snapshots"][0] and picked[-1] == full["snapshots"][-1]
+
+    assert progress(max_points="1")["statusCode"] == 400
+    assert progress(max_points="many")["statusCode"] == 400
+    assert progress(max_points="4", downsample="median")["statusCode"] == 400
+
+
+def _trend_after(errors):
+    from utils import player_stats
+    counters = {}
+    for error in errors:
+        player_stats._bump(counters, "k", not error)
+    return player_stats.trend_of(counters["k"])
+
+
+def test_trend_compares_last_two_complete_windows():
+    window = [1] * 10 + [0] * 10  # 50% errors
+    assert _trend_after(window)["trend"] == "insufficient_data"
+    assert _trend_after(window + [0] * 20)["trend"] == "improving"
+    assert _trend_after([0] * 20 + window)["trend"] == "declining"
+    assert _trend_after(window + window)["trend"] == "stable"
+    # A partly filled window does not move the comparison
+    assert _trend_after(window + [0] * 20 + [1] * 19)["trend"] == "improving"
+    assert _trend_after([1] * 40 + [0] * 30)["error_rate"] == pytest.approx(0.9 ** 30, abs=1e-4)
+
+
+def test_summary_reports_trends_from_rollup(dynamodb_tables, mock_context):
+    handlers = dynamodb_tables
+    token, email = _signup_and_get_token(handlers, mock_context, "trend@example.com")
+    _save_stats_with_training(handlers, mock_context, token, email, (
+        [_scenario_decision("hard_16_vs_10", False)] * 15 + [_scenario_decision("hard_16_vs_10", True)] * 5
+    ))
+    _save_stats_with_training(handlers, mock_context, token, email, (
+        [_scenario_decision("hard_16_vs_10", True)] * 18 + [_scenario_decision("hard_16_vs_10", False)] * 2
+    ))
+    event = {"headers": {"Authorization": f"Bearer {token}"}}
+    body = json.loads(handlers["training"].get_summary(event, mock_context)["body"])
+    assert body["category_stats"][0]["trend"] == "improving"
+    assert body["weakest_scenarios"][0]["trend"] == "improving"
+    assert body["weakest_scenarios"][0]["error_rate"] < 0.5
+
+    event["queryStringParameters"] = {"period": "week"}
+    body = json.loads(handlers["training"].get_summary(event, mock_context)["body"])
+    assert body["category_stats"][0]["trend"] == "improving"
+
+
+# ============================================================
+# Tests for the player_stats rollup
+# ============================================================
+
+def test_save_maintains_player_stats_rollup(dynamodb_tables, mock_context):
+    handlers = dynamodb_tables
+    token, email = _signup_and_get_token(handlers, mock_context, "rollup@example.com")
+    user_id = jwt.decode(token, os.environ["SECRET_KEY"], algorithms=["HS256"])["sub"]
+
+    _save_stats_with_training(handlers, mock_context, token, email, [
+        _make_decision("hard_total", True),
+        _make_decision("hard_total", False, "hit", "stand"),
+    ])
+    for result, payout in (("win", 15), ("loss", -10), ("push", 0)):
+        handlers["stats"].save({
+            "headers": {"Authorization": f"Bearer {token}"},
+            "body": json.dumps({"result": result, "mistakes": 1, "net_payout": payout, "hands_played": 2}),
+        }, mock_context)
+
+    rollup = boto3.resource("dynamodb").Table("TestPlayerStatsTable").get_item(
+        Key={"userId": user_id, "gameType": "blackjack"}
+    )["Item"]
+    assert rollup["total_sessions"] == 4
+    assert rollup["total_hands"] == 6
+    assert rollup["net_payout"] == 5
+    assert rollup["results"] == {"training_session": 1, "win": 1, "loss": 1, "push": 1}
+    assert (rollup["categories"]["hard_total"]["total"], rollup["categories"]["hard_total"]["correct"]) == (2, 1)
+    assert (rollup["scenarios"]["hard_total_test"]["total"], rollup["scenarios"]["hard_total_test"]["correct"]) == (2, 1)
+    assert rollup["version"] == 4
+
+    event = {"headers": {"Authorization": f"Bearer {token}"}}
+    summary = json.loads(handlers["training"].get_summary(event, mock_context)["body"])
+    assert summary["total_decisions"] == 2
+    assert summary["session_totals"]["results"]["win"] == 1
+    assert summary["session_totals"]["net_payout"] == 5
+
+
+def test_rollup_seeds_from_history_for_existing_users(dynamodb_tables, mock_context):
+    handlers = dynamodb_tables
+    token, email = _signup_and_get_token(handlers, mock_context, "legacy@example.com")
+    user_id = jwt.decode(token, os.environ["SECRET_KEY"], algorithms=["HS256"])["sub"]
+
+    # A session written before the rollup existed
+    boto3.resource("dynamodb").Table("TestStatsTable").put_item(Item={
+        "userId": user_id,
+        "timestamp": "2025-01-01 10:00:00.000000",
+        "result": "training_session",
+        "mistakes": 0,
+        "training_decisions": [_make_decision("soft_total", True)],
+    })
+    event = {"headers": {"Authorization": f"Bearer {token}"}}
+    summary = json.loads(handlers["training"].get_summary(event, mock_context)["body"])
+    assert summary["total_decisions"] == 1
+
+    _save_stats_with_training(handlers, mock_context, token, email, [
+        _make_decision("hard_total", False, "hit", "stand"),
+    ])
+    summary = json.loads(handlers["training"].get_summary(event, mock_context)["body"])
+    assert summary["total_decisions"] == 2
+    assert summary["correct_decisions"] == 1
+    assert summary["session_totals"]["sessions"] == 2
+
+
+def test_summary_stores_the_rollup_it_builds(dynamodb_tables, mock_context, monkeypatch):
+    handlers = dynamodb_tables
+    token, email = _signup_and_get_token(handlers, mock_context, "seedonce@example.com")
+    user_id = jwt.decode(token, os.environ["SECRET_KEY"], algorithms=["HS256"])["sub"]
+    _save_stats_with_training(handlers, mock_context, token, email, [_make_decision("hard_total", True)])
+    rollups = boto3.resource("dynamodb").Table("TestPlayerStatsTable")
+    rollups.delete_item(Key={"userId": user_id, "gameType": "blackjack"})
+
+    player_stats = handlers["training"].player_stats
+    builds = []
+    original = player_stats.build_from_history
+    monkeypatch.setattr(player_stats, "build_from_history", lambda *a: builds.append(a) or original(*a))
+    event = {"headers": {"Authorization": f"Bearer {token}"}}
+    for _ in range(2):
+        summary = json.loads(handlers["training"].get_summary(event, mock_context)["body"])
+        assert summary["total_decisions"] == 1
+
+    assert len(builds) == 1
+    assert rollups.get_item(Key={"userId": user_id, "gameType": "blackjack"})["Item"]["total_sessions"] == 1
+
+
+def test_rollup_retries_read_consistently_and_back_off(dynamodb_tables, mock_context, monkeypatch):
+    handlers = dynamodb_tables
+    player_stats = handlers["training"].player_stats
+    table = player_stats.get_player_stats_table()
+    reads, sleeps, lost = [], [], [2]
+    original_get, original_put = table.get_item, table.put_item
+
+    def get_item(**kwargs):
+        reads.append(kwargs.get("ConsistentRead"))
+        return original_get(**kwargs)
+
+    def put_item(**kwargs):
+        if lost[0]:
+            lost[0] -= 1
+            raise ClientError({"Error": {"Code": "ConditionalCheckFailedException"}}, "PutItem")
+        return original_put(**kwargs)
+
+    monkeypatch.setattr(table, "get_item", get_item)
+    monkeypatch.setattr(table, "put_item", put_item)
+    monkeypatch.setattr(player_stats, "get_player_stats_table", lambda: table)
+    monkeypatch.setattr(player_stats.time, "sleep", sleeps.append)
+
+    profile = player_stats.record_session("racer", "blackjack", {
+        "userId": "racer", "timestamp": "blackjack#2026-01-01T00:00:00.000000Z#a",
+        "gameType": "blackjack", "result": "win", "mistakes": 0,
+    })
+    assert profile["version"] == 1
+    assert reads == [True, True, True]
+    assert len(sleeps) == 2
+    assert 0 <= sleeps[0] <= 0.04 and 0 <= sleeps[1] <= 0.08
+
+    lost[0] = 10
+    sleeps.clear()
+    with pytest.raises(RuntimeError):
+        player_stats.record_session("racer", "blackjack", {
+            "userId": "racer", "timestamp": "blackjack#2026-01-02T00:00:00.000000Z#b",
+            "gameType": "blackjack", "result": "win", "mistakes": 0,
+        })
+    assert len(sleeps) == player_stats.MAX_WRITE_ATTEMPTS - 1
+    assert max(sleeps) <= 0.5
+
+
+def test_reads_touch_only_the_requested_game(dynamodb_tables, mock_context, monkeypatch):
+    handlers = dynamodb_tables
+    token, email = _signup_and_get_token(handlers, mock_context, "games@example.com")
+    for game_type, correct in (("blackjack", True), ("baccarat", False), ("baccarat", False)):
+        handlers["stats"].save({
+            "headers": {"Authorization": f"Bearer {token}"},
+            "body": json.dumps({
+                "result": "training_session", "mistakes": 0, "game_type": game_type,
+                "training_decisions": [_make_decision("hard_total", correct)],
+            }),
+        }, mock_context)
+
+    read = []
+    original = stats_items.iter_query
+
+    def spy(table, **kwargs):
+        for item in original(table, **kwargs):
+            read.append(item["timestamp"])
+            yield item
+
+    monkeypatch.setattr(stats_items, "iter_query", spy)
+    progress = json.loads(handlers["training"].get_progress({
+        "headers": {"Authorization": f"Bearer {token}"},
+        "queryStringParameters": {"game_type": "blackjack", "period": "week"},
+    }, mock_context)["body"])
+    assert [s["correct_decisions"] for s in progress["snapshots"]] == [1]
+    assert len(read) == 1 and read[0].startswith("blackjack#")
+
+    bad = handlers["stats"].save({
+        "headers": {"Authorization": f"Bearer {token}"},
+        "body": json.dumps({"result": "win", "mistakes": 0, "game_type": "black#jack"}),
+    }, mock_context)
+    assert bad["statusCode"] == 400
+
+
+def test_drill_configs_force_the_scenario():
+    from utils.drills import drill_config
+
+    assert drill_config("pair_8_vs_10")["force_cards"] == {"player": ["8", "8"], "dealer": "10"}
+    assert "split" in drill_config("pair_A_vs_6")["allowed_actions"]
+    assert drill_config("soft_18_vs_9")["force_cards"]["player"] == ["A", "7"]
+    assert drill_config("soft_21_vs_6")["force_cards"]["player"] == ["A", "5", "5"]
+    assert drill_config("hard_16_vs_10")["force_cards"]["player"] == ["10", "6"]
+    assert drill_config("hard_20_vs_A")["force_cards"]["player"] == ["K", "Q"]
+    assert drill_config("hard_5_vs_2")["force_cards"]["player"] == ["2", "3"]
+    assert drill_config("insurance_offered")["force_cards"]["dealer"] == "A"
+    assert drill_config("hard_test") is None
+    assert drill_config("soft_12_vs_2") is None
+
+
+def test_next_drill_is_read_from_the_write_time_queue(dynamodb_tables, mock_context, monkeypatch):
+    handlers = dynamodb_tables
+    token, email = _signup_and_get_token(handlers, mock_context, "drill@example.com")
+
+    def next_drill():
+        event = {"headers": {"Authorization": f"Bearer {token}"}, "queryStringParameters": {"game_type": "blackjack"}}
+        return json.loads(handlers["training"].get_next_drill(event, mock_context)["body"])
+
+    assert next_drill() == {"game_type": "blackjack", "drill": None, "queue": []}
+
+    decisions = (
+        [_scenario_decision("hard_16_vs_10", False)] * 8 + [_scenario_decision("hard_16_vs_10", True)] * 2
+        + [_scenario_decision("pair_8_vs_10", False)] * 2  # few samples: shrunk
+        + [_scenario_decision("soft_18_vs_9", False)] * 3 + [_scenario_decision("soft_18_vs_9", True)] * 7
+        + [_scenario_decision("hard_12_vs_3", True)] * 10  # never missed: not queued
+    )
+    _save_stats_with_training(handlers, mock_context, token, email, decisions)
+
+    def no_full_read(*args, **kwargs):
+        raise AssertionError("read the full rollup")
+
+    monkeypatch.setattr(handlers["training"].player_stats, "get_profile", no_full_read)
+    body = next_drill()
+    assert body["drill"]["scenario"] == "hard_16_vs_10"
+    assert body["drill"]["drill_id"] == "drill_hard_16_vs_10"
+    assert body["drill"]["force_cards"] == {"player": ["10", "6"], "dealer": "10"}
+    assert (body["drill"]["total"], body["drill"]["correct"]) == (10, 2)
+    assert set(body["queue"]) == {"pair_8_vs_10", "soft_18_vs_9"}
+
+
+def test_recently_practised_drills_rotate():
+    from datetime import datetime, timedelta
+    from utils.drills import build_queue, rank_queue
+
+    now = datetime(2026, 6, 1, 12)
+    scenarios = {
+        "hard_16_vs_10": {"total": 20, "correct": 10, "last_seen": now.isoformat()},
+        "soft_18_vs_9": {"total": 20, "correct": 12, "last_seen": (now - timedelta(days=3)).isoformat()},
+    }
+    queue = build_queue(scenarios)
+    assert [e["scenario"] for e in queue] == ["hard_16_vs_10", "soft_18_vs_9"]
+    assert [e["scenario"] for e in rank_queue(queue, now)] == ["soft_18_vs_9", "hard_16_vs_10"]
+    assert [e["scenario"] for e in rank_queue(queue, now + timedelta(days=2))] == ["hard_16_vs_10", "soft_18_vs_9"]
@@ -1,11 +1,26 @@
+import functools
+import hashlib
+import json
 import secrets
+import time
+from dataclasses import dataclass, field
 from datetime import datetime, timedelta
+from typing import Optional
 from passlib.context import CryptContext
 from jose import jwt
-from config import SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES, RESET_TOKEN_EXPIRE_MINUTES
+from utils.result_cache import ResultCache
+from config import (
+    SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES, RESET_TOKEN_EXPIRE_MINUTES,
+    CLAIMS_CACHE_MAX_ENTRIES, BCRYPT_ROUNDS,
+)
 
 # --- Password Hashing ---
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+
+# --- Verified Claims Cache ---
+# Keyed by the token's digest, so the cache never holds a usable bearer
+# token; each entry expires with the token's own exp claim.
+claims_cache = ResultCache(CLAIMS_CACHE_MAX_ENTRIES, 0)
 
 # --- Utility Functions ---
 def get_password_hash(password):
@@ -14,6 +29,10 @@ def get_password_hash(password):
 def verify_password(plain_password, hashed_password):
     return pwd_context.verify(plain_password, hashed_password)
 
+def password_needs_rehash(hashed_password):
+    """True when the hash's scheme or cost no longer matches BCRYPT_ROUNDS."""
+    return pwd_context.needs_update(hashed_password)
+
 def create_access_token(data: dict):
     to_encode = data.copy()
     expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
@@ -22,11 +41,89 @@ def create_access_token(data: dict):
     return encoded_jwt
 
 def decode_access_token(token: str):
+    """Verified claims of ``token`` or None; repeat tokens are served from claims_cache.
+
+    Access tokens carry no ``type`` claim; other tokens signed with the same
+    key (e.g. password reset tokens) are rejected.
+    """
+    digest = hashlib.sha256(token.encode()).digest()
+    claims = claims_cache.get(digest)
+    if claims is not None:
+        return dict(claims)
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        return payload
     except Exception:
         return None
+    if "type" in payload:
+        return None
+    exp = payload.get("exp")
+    if isinstance(exp, (int, float)):
+        claims_cache.put(digest, dict(payload), ttl_seconds=exp - time.time())
+    return payload
+
+
+def bearer_token(event):
+    """The Bearer token from the Authorization header, or None."""
+    for key, value in (event.get("headers") or {}).items():
+        if key.lower() == "authorization" and value and value.startswith("Bearer "):
+            return value[7:]
+    return None
+
+
+def get_token_claims(event):
+    """Verified claims of the request's bearer token, or None."""
+    token = bearer_token(event)
+    return decode_access_token(token) if token else None
+
+
+@dataclass(frozen=True)
+class AuthContext:
+    """The authenticated caller handed to @authenticated handlers."""
+    user_id: Optional[str]
+    email: Optional[str]
+    source: str  # "authorizer" (verified by API Gateway) or "token" (verified here)
+    claims: dict = field(default_factory=dict, repr=False)
+
+
+def _authorizer_claims(event):
+    """Claims API Gateway already verified, if the route has an authorizer.
+
+    ``jwt.claims`` comes from a gateway JWT authorizer, ``lambda`` from the
+    context returned by handlers/authorizer.py.
+    """
+    authorizer = (event.get("requestContext") or {}).get("authorizer") or {}
+    for claims in ((authorizer.get("jwt") or {}).get("claims"), authorizer.get("lambda")):
+        if isinstance(claims, dict) and claims.get("sub"):
+            return claims
+    return None
+
+
+def get_auth_context(event):
+    """Resolve the caller from authorizer claims, else the bearer token; None if neither."""
+    claims, source = _authorizer_claims(event), "authorizer"
+    if claims is None:
+        claims, source = get_token_claims(event), "token"
+    if not claims:
+        return None
+    return AuthContext(claims.get("sub"), claims.get("email"), source, claims)
+
+
+def authenticated(handler=None, *, require="user_id"):
+    """Call ``handler(event, context, auth)`` with the caller's AuthContext.
+
+    Requests without a verified identity, or whose context lacks the
+    ``require`` field, get a 401 without reaching the handler.
+    """
+    if handler is None:
+        return functools.partial(authenticated, require=require)
+
+    @functools.wraps(handler)
+    def wrapper(event, context):
+        auth = get_auth_context(event)
+        if auth is None or not getattr(auth, require):
+            return {"statusCode": 401, "body": json.dumps({"detail": "Unauthorized"})}
+        return handler(event, context, auth)
+    return wrapper
 
 
 def generate_otp():
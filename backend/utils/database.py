@@ -1,20 +1,233 @@
+import random
+import time
 import boto3
-from config import USERS_TABLE, STATS_TABLE, LEARNING_TABLE
+from botocore.config import Config
+from config import (
+    USERS_TABLE, STATS_TABLE, LEARNING_TABLE, PLAYER_STATS_TABLE, IDEMPOTENCY_TABLE,
+    REFRESH_TOKENS_TABLE,
+    DYNAMODB_MAX_POOL_CONNECTIONS, DYNAMODB_TCP_KEEPALIVE,
+    DYNAMODB_CONNECT_TIMEOUT, DYNAMODB_READ_TIMEOUT,
+    DYNAMODB_RETRY_MODE, DYNAMODB_MAX_ATTEMPTS,
+    STORAGE_BACKEND, SQLITE_PATH, QUERY_PAGE_SIZE,
+    BATCH_WRITE_MAX_ATTEMPTS, BATCH_WRITE_BASE_DELAY, BATCH_WRITE_MAX_DELAY,
+)
+from utils.storage import DynamoDBBackend, MemoryBackend, SQLiteBackend
+
+
+# Key schema per table (mirrors serverless.yml); local engines need it.
+TABLE_KEY_SCHEMAS = {
+    USERS_TABLE: ("email", None),
+    STATS_TABLE: ("userId", "timestamp"),
+    LEARNING_TABLE: ("userId", "gameType"),
+    PLAYER_STATS_TABLE: ("userId", "gameType"),
+    IDEMPOTENCY_TABLE: ("idempotencyKey", None),
+    REFRESH_TOKENS_TABLE: ("tokenHash", None),
+}
+
+
+# --- Client / Table Registry ---
+# Module-level state survives warm Lambda invocations, so the boto3 session,
+# endpoint resolution and pooled HTTPS connections are paid for once per
+# container instead of once per request.
+_resource = None
+_backend = None
+_tables = {}
+_registry_stats = {
+    "resources_created": 0,
+    "tables_created": 0,
+    "tables_reused": 0,
+}
+
+
+def _client_config():
+    """Build the botocore client config shared by every DynamoDB handle."""
+    return Config(
+        max_pool_connections=DYNAMODB_MAX_POOL_CONNECTIONS,
+        tcp_keepalive=DYNAMODB_TCP_KEEPALIVE,
+        connect_timeout=DYNAMODB_CONNECT_TIMEOUT,
+        read_timeout=DYNAMODB_READ_TIMEOUT,
+        retries={"mode": DYNAMODB_RETRY_MODE, "max_attempts": DYNAMODB_MAX_ATTEMPTS},
+    )
+
+
+def get_dynamodb_resource():
+    """Return the container-wide DynamoDB service resource, creating it once."""
+    global _resource
+    if _resource is None:
+        _resource = boto3.resource("dynamodb", config=_client_config())
+        _registry_stats["resources_created"] += 1
+    return _resource
+
+
+def get_backend():
+    """Return the configured storage backend (see utils.storage)."""
+    global _backend
+    if _backend is None:
+        if STORAGE_BACKEND == "memory":
+            _backend = MemoryBackend()
+        elif STORAGE_BACKEND == "sqlite":
+            _backend = SQLiteBackend(SQLITE_PATH)
+        elif STORAGE_BACKEND == "dynamodb":
+            _backend = DynamoDBBackend(get_dynamodb_resource())
+        else:
+            raise ValueError(f"Unknown STORAGE_BACKEND: {STORAGE_BACKEND}")
+    return _backend
+
+
+def get_table(name):
+    """Return a cached Table handle for the given table name."""
+    table = _tables.get(name)
+    if table is None:
+        hash_key, range_key = TABLE_KEY_SCHEMAS.get(name, (None, None))
+        table = get_backend().table(name, hash_key, range_key)
+        _tables[name] = table
+        _registry_stats["tables_created"] += 1
+    else:
+        _registry_stats["tables_reused"] += 1
+    return table
+
+
+def _connection_stats():
+    """Report pooled HTTP connections held by the shared DynamoDB client.
+
+    Reads urllib3 pool internals through botocore private attributes, so it
+    degrades to an empty mapping if those ever change shape.
+    """
+    if _resource is None:
+        return {}
+    try:
+        pools = _resource.meta.client._endpoint.http_session._manager.pools
+        stats = {}
+        for key in pools.keys():
+            pool = pools[key]
+            stats[f"{key.key_scheme}://{key.key_host}:{key.key_port}"] = {
+                "num_connections": pool.num_connections,
+                "num_requests": pool.num_requests,
+                "idle": pool.pool.qsize() if pool.pool is not None else 0,
+            }
+        return stats
+    except AttributeError:
+        return {}
+
+
+def get_registry_stats():
+    """Return reuse counters and connection counts for the client registry."""
+    return {
+        **_registry_stats,
+        "backend": STORAGE_BACKEND,
+        "warm": _registry_stats["resources_created"] <= 1 and _registry_stats["tables_reused"] > 0,
+        "cached_tables": sorted(_tables),
+        "client_config": {
+            "max_pool_connections": DYNAMODB_MAX_POOL_CONNECTIONS,
+            "tcp_keepalive": DYNAMODB_TCP_KEEPALIVE,
+            "connect_timeout": DYNAMODB_CONNECT_TIMEOUT,
+            "read_timeout": DYNAMODB_READ_TIMEOUT,
+            "retry_mode": DYNAMODB_RETRY_MODE,
+            "max_attempts": DYNAMODB_MAX_ATTEMPTS,
+        },
+        "connections": _connection_stats(),
+    }
+
+
+def reset_registry():
+    """Drop all cached handles (tests and credential rotation).
+
+    For the memory backend this also discards the stored data.
+    """
+    global _resource, _backend
+    _resource = None
+    _backend = None
+    _tables.clear()
+    for key in _registry_stats:
+        _registry_stats[key] = 0
+
+
+def iter_query(table, **kwargs):
+    """Yield every item matching a query, following LastEvaluatedKey lazily.
+
+    Pages are fetched QUERY_PAGE_SIZE items at a time (unless the caller
+    passes its own Limit), so memory stays bounded by one page.
+    """
+    kwargs.setdefault("Limit", QUERY_PAGE_SIZE)
+    while True:
+        response = table.query(**kwargs)
+        yield from response.get("Items", [])
+        last_key = response.get("LastEvaluatedKey")
+        if not last_key:
+            return
+        kwargs["ExclusiveStartKey"] = last_key
+
+
+BATCH_WRITE_CHUNK = 25  # DynamoDB BatchWriteItem limit
+
+
+class BatchWriteError(Exception):
+    """A BatchWriteItem call raised partway through ``batch_put_items``.
+
+    ``unwritten`` holds every item not confirmed written (the failing
+    chunk's pending requests, later chunks, and anything left unprocessed
+    by earlier ones); the rest of the input is stored.
+    """
+
+    def __init__(self, cause, unwritten):
+        super().__init__(str(cause))
+        self.unwritten = unwritten
+
+
+def batch_put_items(table_name, items, sleep=None):
+    """Write items with chunked BatchWriteItem calls.
+
+    UnprocessedItems are retried with full-jitter exponential backoff, up to
+    BATCH_WRITE_MAX_ATTEMPTS calls per chunk. Returns the items that were
+    still unprocessed after the last attempt (empty on full success). If a
+    call raises, BatchWriteError reports which items were not written.
+    """
+    sleep = sleep or time.sleep
+    get_table(table_name)  # local backends create tables on first use
+    backend = get_backend()
+    failed = []
+    for start in range(0, len(items), BATCH_WRITE_CHUNK):
+        pending = [{"PutRequest": {"Item": item}} for item in items[start:start + BATCH_WRITE_CHUNK]]
+        for attempt in range(1, BATCH_WRITE_MAX_ATTEMPTS + 1):
+            try:
+                response = backend.batch_write_item(RequestItems={table_name: pending})
+            except Exception as e:
+                unwritten = [request["PutRequest"]["Item"] for request in pending]
+                raise BatchWriteError(e, failed + unwritten + items[start + BATCH_WRITE_CHUNK:]) from e
+            pending = response.get("UnprocessedItems", {}).get(table_name, [])
+            if not pending:
+                break
+            if attempt < BATCH_WRITE_MAX_ATTEMPTS:
+                sleep(random.uniform(0, min(BATCH_WRITE_MAX_DELAY, BATCH_WRITE_BASE_DELAY * 2 ** attempt)))
+        failed.extend(request["PutRequest"]["Item"] for request in pending)
+    return failed
 
 
 def get_users_table():
     """Return the DynamoDB Table resource for users."""
-    dynamodb = boto3.resource("dynamodb")
-    return dynamodb.Table(USERS_TABLE)
+    return get_table(USERS_TABLE)
 
 
 def get_stats_table():
     """Return the DynamoDB Table resource for stats."""
-    dynamodb = boto3.resource("dynamodb")
-    return dynamodb.Table(STATS_TABLE)
+    return get_table(STATS_TABLE)
 
 
 def get_learning_table():
     """Return the DynamoDB Table resource for learning progress."""
-    dynamodb = boto3.resource("dynamodb")
-    return dynamodb.Table(LEARNING_TABLE)
+    return get_table(LEARNING_TABLE)
+
+
+def get_player_stats_table():
+    """Return the DynamoDB Table resource for per-user stats rollups."""
+    return get_table(PLAYER_STATS_TABLE)
+
+
+def get_idempotency_table():
+    """Return the DynamoDB Table resource for idempotency records."""
+    return get_table(IDEMPOTENCY_TABLE)
+
+
+def get_refresh_tokens_table():
+    """Return the DynamoDB Table resource for hashed refresh tokens."""
+    return get_table(REFRESH_TOKENS_TABLE)
@@ -0,0 +1,257 @@
+"""Compact binary encoding for training_decisions.
+
+Stored as a list of maps, every decision repeats the keys ``category``,
+``scenarioKey``, ``userAction``, ``optimalAction`` and ``isCorrect``, so a
+long session costs several times its information content in write/read
+units and creeps toward the 400 KB item limit. stats.save instead stores
+a single binary attribute (TRAINING_DECISIONS_BIN):
+
+    byte 0      format version (1)
+    bytes 1..   zlib-compressed body:
+        varint  decision count n
+        varint  string table size, then each string as varint length + UTF-8
+        4 x n   varint string index + 1 per field (0 = field absent)
+        bitmap  isCorrect present, bitmap isCorrect value
+        bitmap  timestamp present, then zigzag varint deltas between them
+        varint  length + JSON of [[index, {key: value}], ...] for any other
+                keys or values the columns above cannot hold
+
+Decoding is lossless for what the client sends. ``decisions_of`` reads
+either representation, so items written before this format stay readable.
+"""
+
+import json
+import zlib
+from decimal import Decimal
+
+FORMAT_VERSION = 1
+TRAINING_DECISIONS = "training_decisions"
+TRAINING_DECISIONS_BIN = "training_decisions_bin"
+DECISION_TOTAL = "decision_total"
+DECISION_CORRECT = "decision_correct"
+DECISION_CATEGORIES = "decision_categories"
+DECISION_SCENARIOS = "decision_scenarios"
+STRING_FIELDS = ("category", "scenarioKey", "userAction", "optimalAction")
+
+
+class DecisionCodecError(ValueError):
+    """Raised when a binary payload cannot be decoded."""
+
+
+def _write_varint(out, value):
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return
+
+
+def _read_varint(data, pos):
+    result = shift = 0
+    while True:
+        if pos >= len(data):
+            raise DecisionCodecError("truncated varint")
+        byte = data[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return result, pos
+        shift += 7
+
+
+def _zigzag(value):
+    return value * 2 if value >= 0 else -value * 2 - 1
+
+
+def _unzigzag(value):
+    return value // 2 if not value & 1 else -(value + 1) // 2
+
+
+def _pack_bits(flags):
+    packed = bytearray((len(flags) + 7) // 8)
+    for i, flag in enumerate(flags):
+        if flag:
+            packed[i >> 3] |= 1 << (i & 7)
+    return packed
+
+
+def _unpack_bits(data, pos, count):
+    size = (count + 7) // 8
+    if pos + size > len(data):
+        raise DecisionCodecError("truncated bitmap")
+    chunk = data[pos:pos + size]
+    return [bool(chunk[i >> 3] & (1 << (i & 7))) for i in range(count)], pos + size
+
+
+def _as_int(value):
+    """Integral numbers (int, or a Decimal read back from DynamoDB) as int."""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, int):
+        return value
+    if isinstance(value, Decimal) and value == value.to_integral_value():
+        return int(value)
+    return None
+
+
+def _json_default(value):
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def encode(decisions):
+    """Encode a list of decision dicts into the versioned binary format."""
+    strings = {}
+    columns = {field: [] for field in STRING_FIELDS}
+    correct_present, correct_values = [], []
+    ts_present, ts_deltas = [], []
+    extras = []
+    previous_ts = 0
+
+    for index, decision in enumerate(decisions):
+        if not isinstance(decision, dict):
+            raise DecisionCodecError("training_decisions entries must be objects")
+        leftover = {}
+        for key, value in decision.items():
+            if key not in STRING_FIELDS and key not in ("isCorrect", "timestamp"):
+                leftover[key] = value
+
+        for field in STRING_FIELDS:
+            value = decision.get(field)
+            if isinstance(value, str):
+                columns[field].append(strings.setdefault(value, len(strings)) + 1)
+            else:
+                columns[field].append(0)
+                if field in decision:
+                    leftover[field] = value
+
+        value = decision.get("isCorrect")
+        correct_present.append(isinstance(value, bool))
+        correct_values.append(value is True)
+        if "isCorrect" in decision and not isinstance(value, bool):
+            leftover["isCorrect"] = value
+
+        ts = _as_int(decision.get("timestamp"))
+        ts_present.append(ts is not None)
+        if ts is not None:
+            ts_deltas.append(_zigzag(ts - previous_ts))
+            previous_ts = ts
+        elif "timestamp" in decision:
+            leftover["timestamp"] = decision["timestamp"]
+
+        if leftover:
+            extras.append([index, leftover])
+
+    body = bytearray()
+    _write_varint(body, len(decisions))
+    _write_varint(body, len(strings))
+    for value in strings:  # dicts keep insertion order == index order
+        raw = value.encode("utf-8")
+        _write_varint(body, len(raw))
+        body.extend(raw)
+    for field in STRING_FIELDS:
+        for ref in columns[field]:
+            _write_varint(body, ref)
+    body.extend(_pack_bits(correct_present))
+    body.extend(_pack_bits(correct_values))
+    body.extend(_pack_bits(ts_present))
+    for delta in ts_deltas:
+        _write_varint(body, delta)
+    raw_extras = json.dumps(extras, separators=(",", ":"), default=_json_default).encode() if extras else b""
+    _write_varint(body, len(raw_extras))
+    body.extend(raw_extras)
+
+    return bytes([FORMAT_VERSION]) + zlib.compress(bytes(body), 9)
+
+
+def decode(payload):
+    """Decode bytes produced by ``encode`` back into a list of decision dicts."""
+    if hasattr(payload, "value"):  # boto3 Binary
+        payload = payload.value
+    payload = bytes(payload)
+    if not payload:
+        raise DecisionCodecError("empty payload")
+    if payload[0] != FORMAT_VERSION:
+        raise DecisionCodecError(f"unsupported decision format version {payload[0]}")
+    try:
+        data = zlib.decompress(payload[1:])
+    except zlib.error as e:
+        raise DecisionCodecError(str(e)) from e
+
+    count, pos = _read_varint(data, 0)
+    table_size, pos = _read_varint(data, pos)
+    strings = []
+    for _ in range(table_size):
+        length, pos = _read_varint(data, pos)
+        strings.append(data[pos:pos + length].decode("utf-8"))
+        pos += length
+
+    decisions = [{} for _ in range(count)]
+    for field in STRING_FIELDS:
+        for decision in decisions:
+            ref, pos = _read_varint(data, pos)
+            if ref:
+                decision[field] = strings[ref - 1]
+
+    correct_present, pos = _unpack_bits(data, pos, count)
+    correct_values, pos = _unpack_bits(data, pos, count)
+    ts_present, pos = _unpack_bits(data, pos, count)
+    previous_ts = 0
+    for i, decision in enumerate(decisions):
+        if correct_present[i]:
+            decision["isCorrect"] = correct_values[i]
+        if ts_present[i]:
+            delta, pos = _read_varint(data, pos)
+            previous_ts += _unzigzag(delta)
+            decision["timestamp"] = previous_ts
+
+    extras_length, pos = _read_varint(data, pos)
+    if extras_length:
+        for index, leftover in json.loads(data[pos:pos + extras_length], parse_float=Decimal):
+            decisions[index].update(leftover)
+    return decisions
+
+
+def decisions_of(item):
+    """Return a stats item's training decisions in either stored form."""
+    if TRAINING_DECISIONS_BIN in item:
+        return decode(item[TRAINING_DECISIONS_BIN])
+    decisions = item.get(TRAINING_DECISIONS, [])
+    return decisions if isinstance(decisions, list) else []
+
+
+def decision_counters(decisions):
+    """Per-session counters stored alongside the decisions at write time.
+
+    Training read paths project these instead of the decision payload.
+    """
+    total = 0
+    correct = 0
+    categories = {}
+    scenarios = {}
+    for d in decisions:
+        is_correct = bool(d.get("isCorrect", False))
+        total += 1
+        if is_correct:
+            correct += 1
+        # Map keys must be strings; older items may hold other types
+        keys = [(categories, str(d.get("category", "unknown")))]
+        if d.get("scenarioKey"):
+            keys.append((scenarios, str(d["scenarioKey"])))
+        for counters, key in keys:
+            stats = counters.get(key)
+            if stats is None:
+                stats = counters[key] = {"total": 0, "correct": 0}
+            stats["total"] += 1
+            if is_correct:
+                stats["correct"] += 1
+    return {
+        DECISION_TOTAL: total,
+        DECISION_CORRECT: correct,
+        DECISION_CATEGORIES: categories,
+        DECISION_SCENARIOS: scenarios,
+    }
@@ -0,0 +1,165 @@
+"""Columnar (NumPy) aggregation of training decisions.
+
+Decisions are loaded once into parallel arrays:
+
+    category   int32 codes into ``categories``
+    scenario   int32 codes into ``scenarios`` (-1 = no scenarioKey)
+    correct    bool
+    session    int32 index of the session (stats item) each decision came from
+
+after which totals, per-category / per-scenario counts and windowed
+accuracy series are single ``bincount`` / ``cumsum`` passes instead of
+per-decision dict updates. ``counters()`` returns exactly what
+``decision_codec.decision_counters`` does, so write-time counters, the
+request handlers and offline analytics (jobs/) agree on the numbers.
+
+Loading still walks the decision dicts once; the array passes after it
+are what is cheap. For a handful of decisions the dict loop is faster, so
+``counters_of`` switches at ``COLUMNAR_MIN_DECISIONS`` (measured with
+benchmarks/decision_columns.py).
+
+NumPy is imported inside the methods that need it: the request handlers
+import this module for ``counters_of``, and typical sessions never reach
+the columnar path, so cold starts don't pay for loading NumPy. It is only
+a jobs dependency; ``counters_of`` falls back to the dict loop without it.
+"""
+
+from utils.decision_codec import (
+    decisions_of, decision_counters,
+    DECISION_TOTAL, DECISION_CORRECT, DECISION_CATEGORIES, DECISION_SCENARIOS,
+)
+
+# Below this many decisions the plain dict loop is faster.
+COLUMNAR_MIN_DECISIONS = 1000
+
+
+class DecisionColumns:
+    """Training decisions as categorical-coded NumPy columns."""
+
+    def __init__(self, category, categories, scenario, scenarios, correct, session, sessions):
+        self.category = category
+        self.categories = categories
+        self.scenario = scenario
+        self.scenarios = scenarios
+        self.correct = correct
+        self.session = session
+        self.sessions = sessions
+
+    @classmethod
+    def from_sessions(cls, sessions):
+        """Build columns from an iterable of per-session decision lists."""
+        import numpy as np
+        category_codes, scenario_codes = {}, {}
+        category, scenario, correct, session = [], [], [], []
+        count = 0
+        for index, decisions in enumerate(sessions):
+            count = index + 1
+            for d in decisions:
+                category.append(category_codes.setdefault(str(d.get("category", "unknown")), len(category_codes)))
+                key = d.get("scenarioKey")
+                scenario.append(scenario_codes.setdefault(str(key), len(scenario_codes)) if key else -1)
+                correct.append(bool(d.get("isCorrect", False)))
+                session.append(index)
+        return cls(
+            np.array(category, dtype=np.int32), list(category_codes),
+            np.array(scenario, dtype=np.int32), list(scenario_codes),
+            np.array(correct, dtype=bool),
+            np.array(session, dtype=np.int32), count,
+        )
+
+    @classmethod
+    def from_decisions(cls, decisions):
+        """Columns for a single session's decisions."""
+        return cls.from_sessions([decisions])
+
+    @classmethod
+    def from_items(cls, items):
+        """Columns for StatsTable items, one session per item (either decision encoding)."""
+        return cls.from_sessions(decisions_of(item) for item in items)
+
+    def __len__(self):
+        return len(self.correct)
+
+    def totals(self):
+        """(total, correct) over every decision."""
+        import numpy as np
+        return len(self.correct), int(np.count_nonzero(self.correct))
+
+    def _grouped(self, codes, labels):
+        import numpy as np
+        present = codes >= 0
+        codes = codes[present]
+        totals = np.bincount(codes, minlength=len(labels))
+        correct = np.bincount(codes, weights=self.correct[present], minlength=len(labels))
+        return {
+            label: {"total": int(t), "correct": int(c)}
+            for label, t, c in zip(labels, totals, correct)
+            if t
+        }
+
+    def by_category(self):
+        """{category: {"total", "correct"}}."""
+        return self._grouped(self.category, self.categories)
+
+    def by_scenario(self):
+        """{scenarioKey: {"total", "correct"}}, skipping decisions without one."""
+        return self._grouped(self.scenario, self.scenarios)
+
+    def accuracies(self, by="category"):
+        """{key: accuracy} per category or scenario."""
+        grouped = self.by_category() if by == "category" else self.by_scenario()
+        return {key: stats["correct"] / stats["total"] for key, stats in grouped.items()}
+
+    def counters(self):
+        """Same shape as ``decision_codec.decision_counters``."""
+        total, correct = self.totals()
+        return {
+            DECISION_TOTAL: total,
+            DECISION_CORRECT: correct,
+            DECISION_CATEGORIES: self.by_category(),
+            DECISION_SCENARIOS: self.by_scenario(),
+        }
+
+    def session_series(self):
+        """(totals, correct) int arrays with one entry per session."""
+        import numpy as np
+        totals = np.bincount(self.session, minlength=self.sessions)
+        correct = np.bincount(self.session, weights=self.correct, minlength=self.sessions)
+        return totals, correct.astype(np.int64)
+
+    def rolling_accuracy(self, window):
+        """Accuracy over the trailing ``window`` decisions, one value per decision.
+
+        The first ``window - 1`` values cover the decisions seen so far.
+        """
+        import numpy as np
+        if window < 1:
+            raise ValueError("window must be at least 1")
+        hits = np.concatenate(([0], np.cumsum(self.correct, dtype=np.int64)))
+        ends = np.arange(1, len(self.correct) + 1)
+        starts = np.maximum(ends - window, 0)
+        return (hits[ends] - hits[starts]) / (ends - starts)
+
+    def window_accuracy(self, window):
+        """Accuracy of consecutive, non-overlapping ``window``-decision blocks.
+
+        A trailing partial block is dropped.
+        """
+        if window < 1:
+            raise ValueError("window must be at least 1")
+        complete = len(self.correct) // window * window
+        return self.correct[:complete].reshape(-1, window).mean(axis=1)
+
+
+def counters_of(decisions):
+    """``decision_counters`` for one session, columnar for large sessions.
+
+    NumPy ships with the jobs (jobs-requirements.txt), not the Lambda
+    bundle, so without it large sessions take the dict loop too.
+    """
+    if len(decisions) >= COLUMNAR_MIN_DECISIONS:
+        try:
+            return DecisionColumns.from_decisions(decisions).counters()
+        except ImportError:
+            pass
+    return decision_counters(decisions)
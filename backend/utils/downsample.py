@@ -0,0 +1,110 @@
+"""Downsampling for /training/progress snapshot series.
+
+Three modes, all bounded by ``max_points``:
+
+bucket  Streaming equal-count buckets. Sessions are appended to the last
+        bucket until it holds ``capacity`` sessions; when the bucket count
+        would exceed max_points, adjacent pairs are merged and capacity
+        doubles. Memory stays O(max_points) however long the history is,
+        and each point reports the decision-weighted accuracy of the
+        sessions it covers.
+lttb    Largest-Triangle-Three-Buckets over the session sequence. Keeps
+        original snapshots that best preserve the visual shape of the
+        accuracy curve (peaks and dips survive). It needs the whole series,
+        so the streamed snapshots are collected first.
+recent  No aggregation: the most recent ``max_points`` sessions, read
+        newest first so older pages are never fetched.
+"""
+
+MODES = ("bucket", "lttb", "recent")
+
+
+class BucketDownsampler:
+    """Fold a stream of session snapshots into at most ``max_points`` buckets."""
+
+    def __init__(self, max_points):
+        if max_points < 2:
+            raise ValueError("max_points must be at least 2")
+        self.max_points = max_points
+        self.capacity = 1
+        self.buckets = []
+        self.count = 0
+
+    def add(self, timestamp, total, correct):
+        self.count += 1
+        if self.buckets and self.buckets[-1]["sessions"] < self.capacity:
+            bucket = self.buckets[-1]
+            bucket["sessions"] += 1
+            bucket["total"] += total
+            bucket["correct"] += correct
+            bucket["end"] = timestamp
+            return
+        self.buckets.append({
+            "start": timestamp, "end": timestamp,
+            "sessions": 1, "total": total, "correct": correct,
+        })
+        if len(self.buckets) > self.max_points:
+            self._halve()
+
+    def _halve(self):
+        merged = []
+        for i in range(0, len(self.buckets), 2):
+            first = self.buckets[i]
+            if i + 1 < len(self.buckets):
+                second = self.buckets[i + 1]
+                first["end"] = second["end"]
+                first["sessions"] += second["sessions"]
+                first["total"] += second["total"]
+                first["correct"] += second["correct"]
+            merged.append(first)
+        self.buckets = merged
+        self.capacity *= 2
+
+    def snapshots(self):
+        return [
+            {
+                "timestamp": b["end"],
+                "start_timestamp": b["start"],
+                "sessions": b["sessions"],
+                "total_decisions": b["total"],
+                "correct_decisions": b["correct"],
+                "overall_accuracy": round(b["correct"] / b["total"], 4) if b["total"] else 0,
+            }
+            for b in self.buckets
+        ]
+
+
+def lttb(points, max_points, y):
+    """Select at most ``max_points`` of ``points`` by Largest-Triangle-Three-Buckets.
+
+    x is the position in the series; ``y(point)`` gives the value. The first
+    and last points are always kept.
+    """
+    n = len(points)
+    if max_points >= n:
+        return list(points)
+    if max_points < 3:
+        return [points[0], points[-1]]
+
+    selected = [points[0]]
+    every = (n - 2) / (max_points - 2)
+    a = 0
+    for i in range(max_points - 2):
+        # Average of the next bucket is the third triangle vertex
+        next_start = int((i + 1) * every) + 1
+        next_end = min(int((i + 2) * every) + 1, n)
+        avg_x = (next_start + next_end - 1) / 2
+        avg_y = sum(y(p) for p in points[next_start:next_end]) / (next_end - next_start)
+
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        ax, ay = a, y(points[a])
+        best, best_area = start, -1.0
+        for j in range(start, end):
+            area = abs((ax - avg_x) * (y(points[j]) - ay) - (ax - j) * (avg_y - ay))
+            if area > best_area:
+                best, best_area = j, area
+        selected.append(points[best])
+        a = best
+    selected.append(points[-1])
+    return selected
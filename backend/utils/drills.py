@@ -0,0 +1,124 @@
+"""Next-drill recommendations from the player_stats scenario index.
+
+Scenario keys (see frontend game/strategy.ts) map to Drill Configs that
+force the matching deal:
+
+    pair_8_vs_10      player ["8", "8"],   dealer "10"
+    soft_18_vs_9      player ["A", "7"],   dealer "9"
+    hard_16_vs_10     player ["10", "6"],  dealer "10"
+    insurance_offered player "ANY",        dealer "A"
+
+Every rollup write (utils/player_stats._update) rebuilds ``drill_queue``:
+the DRILL_QUEUE_SIZE scenarios with the highest base priority, each with
+its ready drill config. The base priority is the EWMA error rate shrunk
+by sample size, n / (n + DRILL_SAMPLE_PRIOR), so a couple of unlucky hands
+do not outrank a persistent leak. Recency is applied when the queue is
+read. A scenario practised in the last few hours is damped by up to half,
+recovering with a DRILL_RECENCY_HOURS half-life, so drills rotate instead
+of repeating. /training/next-drill therefore costs one projected GetItem.
+"""
+
+import heapq
+import re
+from datetime import datetime
+from decimal import Decimal
+from config import DRILL_QUEUE_SIZE, DRILL_SAMPLE_PRIOR, DRILL_RECENCY_HOURS, DRILL_SUCCESS_STREAK
+
+DRILL_QUEUE = "drill_queue"
+_SCENARIO = re.compile(r"(hard|soft|pair)_(\d+|A)_vs_(\d+|A)")
+_ACTIONS = ["hit", "stand", "double", "surrender"]
+
+
+def _player_cards(kind, value):
+    if kind == "pair":
+        return [value, value]
+    total = int(value)
+    if kind == "soft":
+        if not 13 <= total <= 21:
+            return None
+        # A,10 would be a blackjack, not a soft 21 the player acts on
+        return ["A", str(total - 11)] if total < 21 else ["A", "5", "5"]
+    if not 5 <= total <= 21:
+        return None
+    if total <= 12:
+        return ["2", str(total - 2)]
+    if total <= 19:
+        return ["10", str(total - 10)]
+    # Two equal ranks would be a pair, and 21 needs a third card
+    return ["K", "Q"] if total == 20 else ["10", "5", "6"]
+
+
+def drill_config(scenario):
+    """The Drill Config that deals ``scenario``, or None for unknown keys."""
+    if scenario == "insurance_offered":
+        return {
+            "drill_id": "drill_insurance_offered",
+            "force_cards": {"player": "ANY", "dealer": "A"},
+            "allowed_actions": ["insurance", "decline_insurance"],
+            "success_criteria": f"{DRILL_SUCCESS_STREAK}_correct_row",
+        }
+    match = _SCENARIO.fullmatch(scenario)
+    if not match:
+        return None
+    kind, value, dealer = match.groups()
+    player = _player_cards(kind, value)
+    if player is None:
+        return None
+    return {
+        "drill_id": f"drill_{scenario}",
+        "force_cards": {"player": player, "dealer": dealer},
+        "allowed_actions": _ACTIONS + ["split"] if kind == "pair" else list(_ACTIONS),
+        "success_criteria": f"{DRILL_SUCCESS_STREAK}_correct_row",
+    }
+
+
+def _base_priority(stats):
+    total = int(stats["total"])
+    if "ewma_error" in stats:
+        error = float(stats["ewma_error"])
+    else:
+        error = 1 - int(stats["correct"]) / total if total else 0
+    return error * total / (total + DRILL_SAMPLE_PRIOR)
+
+
+def build_queue(scenarios):
+    """Top DRILL_QUEUE_SIZE drillable scenarios by base priority, highest first."""
+    candidates = (
+        (_base_priority(stats), key, stats)
+        for key, stats in scenarios.items()
+        if int(stats["total"]) > 0
+    )
+    queue = []
+    for priority, key, stats in heapq.nlargest(DRILL_QUEUE_SIZE * 2, candidates, key=lambda c: c[:2]):
+        config = drill_config(key) if priority > 0 else None
+        if config is None:
+            continue
+        queue.append({
+            "scenario": key,
+            "total": int(stats["total"]),
+            "correct": int(stats["correct"]),
+            "priority": Decimal(str(round(priority, 6))),
+            "last_seen": stats.get("last_seen"),
+            "drill": config,
+        })
+        if len(queue) == DRILL_QUEUE_SIZE:
+            break
+    return queue
+
+
+def _recency_factor(last_seen, now):
+    if not last_seen:
+        return 1.0
+    hours = max((now - datetime.fromisoformat(last_seen)).total_seconds() / 3600, 0)
+    return 1 - 0.5 * 0.5 ** (hours / DRILL_RECENCY_HOURS)
+
+
+def rank_queue(queue, now=None):
+    """Queue entries ordered by base priority damped for recent practice."""
+    now = now or datetime.utcnow()
+    scored = [
+        (float(entry["priority"]) * _recency_factor(entry.get("last_seen"), now), entry)
+        for entry in queue
+    ]
+    scored.sort(key=lambda s: -s[0])
+    return [{**entry, "priority": round(score, 4)} for score, entry in scored]
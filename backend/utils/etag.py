@@ -0,0 +1,71 @@
+"""Conditional GETs (ETag / If-None-Match) for dashboard reads.
+
+Every app open re-requests the same summaries. GET handlers tag 200
+responses with a strong ETag and answer a matching ``If-None-Match`` with
+an empty 304, so an unchanged body is never sent twice.
+
+Two ways to derive the tag:
+
+    make_etag(...)  from a cheap per-user version marker, checked before any
+                    aggregation runs (training summary/progress: the rollup
+                    version and the first/last sort keys of the ranges read)
+    @etagged        from the response body itself, for handlers whose body
+                    is a single small read (learning progress/summary,
+                    user profile); saves the transfer, not the read
+
+Tags include ETAG_FORMAT, so a deploy that changes a response shape
+invalidates every cached copy.
+"""
+
+import functools
+import hashlib
+import json
+
+ETAG_FORMAT = 1
+CACHE_CONTROL = "private, no-cache"
+
+
+def make_etag(*parts):
+    """A strong ETag over JSON-serializable parts."""
+    canonical = json.dumps([ETAG_FORMAT, *parts], separators=(",", ":"), default=str)
+    return f'"{hashlib.sha256(canonical.encode()).hexdigest()[:32]}"'
+
+
+def if_none_match(event, etag):
+    """True when the request's If-None-Match covers ``etag`` (weak comparison)."""
+    for key, value in (event.get("headers") or {}).items():
+        if key.lower() == "if-none-match" and value:
+            candidates = [tag.strip() for tag in value.split(",")]
+            return "*" in candidates or etag in (
+                tag[2:] if tag.startswith("W/") else tag for tag in candidates
+            )
+    return False
+
+
+def not_modified(etag):
+    return {
+        "statusCode": 304,
+        "headers": {"ETag": etag, "Cache-Control": CACHE_CONTROL},
+        "body": "",
+    }
+
+
+def with_etag(response, etag):
+    """Attach the ETag to a 200 response."""
+    if response.get("statusCode") == 200:
+        response.setdefault("headers", {}).update({"ETag": etag, "Cache-Control": CACHE_CONTROL})
+    return response
+
+
+def etagged(handler):
+    """Tag 200 responses with a hash of their body and answer repeats with 304."""
+    @functools.wraps(handler)
+    def wrapper(event, context):
+        response = handler(event, context)
+        if response.get("statusCode") != 200:
+            return response
+        etag = make_etag(response.get("body", ""))
+        if if_none_match(event, etag):
+            return not_modified(etag)
+        return with_etag(response, etag)
+    return wrapper
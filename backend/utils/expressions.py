@@ -0,0 +1,566 @@
+"""DynamoDB expression evaluation for the local storage engines.
+
+Parses the string forms of KeyConditionExpression, ConditionExpression,
+FilterExpression, UpdateExpression and ProjectionExpression and evaluates
+them against plain Python items, so the in-memory and SQLite engines in
+utils.storage accept the same keyword arguments as a boto3 Table.
+
+boto3 condition objects (``Key(...)``/``Attr(...)``) are first rendered to
+strings with boto3's own ConditionExpressionBuilder, so both spellings go
+through one evaluator.
+"""
+
+import re
+from decimal import Decimal
+from boto3.dynamodb.conditions import ConditionBase, ConditionExpressionBuilder
+from boto3.dynamodb.types import (
+    Binary, TypeDeserializer, TypeSerializer, DYNAMODB_CONTEXT,
+)
+
+
+class ExpressionError(ValueError):
+    """Raised for malformed expressions or invalid document paths."""
+
+
+_serializer = TypeSerializer()
+_deserializer = TypeDeserializer()
+
+
+def _validate_wire(value):
+    """Reject what boto3 serializes but the service refuses."""
+    (kind, inner), = value.items()
+    if kind == "M":
+        for key, member in inner.items():
+            if not isinstance(key, str):
+                raise TypeError(f"Map keys must be strings, got {key!r}")
+            _validate_wire(member)
+    elif kind == "L":
+        for member in inner:
+            _validate_wire(member)
+    elif kind in ("SS", "NS", "BS") and not inner:
+        raise TypeError("Sets may not be empty")
+
+
+def normalize(value):
+    """Round-trip a Python value through the DynamoDB type system.
+
+    Mirrors what a boto3 Table does on write/read: ints become Decimal,
+    bytes become Binary, and unsupported types (e.g. float) raise TypeError.
+    Values the service would reject (non-string map keys, empty sets,
+    numbers beyond 38 digits or its exponent range) raise TypeError too.
+    """
+    try:
+        wire = _serializer.serialize(value)
+    except ArithmeticError as e:
+        # DYNAMODB_CONTEXT traps Inexact/Overflow/Underflow
+        raise TypeError(f"Number is outside DynamoDB's precision or range: {value!r}") from e
+    _validate_wire(wire)
+    return _deserializer.deserialize(wire)
+
+
+# ============================================================
+# Tokenizer
+# ============================================================
+
+_TOKEN_RE = re.compile(
+    r"\s*(?:"
+    r"(?P<name>#[A-Za-z0-9_]+)"
+    r"|(?P<value>:[A-Za-z0-9_]+)"
+    r"|(?P<number>\d+)"
+    r"|(?P<ident>[A-Za-z_][A-Za-z0-9_]*)"
+    r"|(?P<op><>|<=|>=|[=<>(),.\[\]+-])"
+    r")"
+)
+
+_KEYWORDS = {"AND", "OR", "NOT", "BETWEEN", "IN", "SET", "REMOVE", "ADD", "DELETE"}
+
+
+def _tokenize(expression):
+    tokens = []
+    pos = 0
+    expression = expression.strip()
+    while pos < len(expression):
+        match = _TOKEN_RE.match(expression, pos)
+        if not match or match.end() == pos:
+            raise ExpressionError(f"Invalid expression near: {expression[pos:]!r}")
+        kind = match.lastgroup
+        text = match.group(kind)
+        if kind == "ident" and text.upper() in _KEYWORDS:
+            kind, text = "kw", text.upper()
+        tokens.append((kind, text))
+        pos = match.end()
+    return tokens
+
+
+class _Parser:
+    """Recursive-descent parser shared by all expression kinds."""
+
+    def __init__(self, expression, names, values):
+        self.tokens = _tokenize(expression)
+        self.pos = 0
+        self.names = names or {}
+        self.values = values or {}
+
+    # --- token helpers ---
+    def peek(self, offset=0):
+        index = self.pos + offset
+        return self.tokens[index] if index < len(self.tokens) else (None, None)
+
+    def take(self, kind=None, text=None):
+        tok_kind, tok_text = self.peek()
+        if tok_kind is None:
+            raise ExpressionError("Unexpected end of expression")
+        if (kind and tok_kind != kind) or (text and tok_text != text):
+            raise ExpressionError(f"Unexpected token {tok_text!r}")
+        self.pos += 1
+        return tok_text
+
+    def accept(self, kind, text=None):
+        tok_kind, tok_text = self.peek()
+        if tok_kind == kind and (text is None or tok_text == text):
+            self.pos += 1
+            return True
+        return False
+
+    def done(self):
+        if self.pos != len(self.tokens):
+            raise ExpressionError(f"Unexpected token {self.peek()[1]!r}")
+
+    # --- operands ---
+    def path(self):
+        parts = [self._name()]
+        while True:
+            if self.accept("op", "."):
+                parts.append(self._name())
+            elif self.accept("op", "["):
+                parts.append(int(self.take("number")))
+                self.take("op", "]")
+            else:
+                return tuple(parts)
+
+    def _name(self):
+        kind, text = self.peek()
+        if kind == "name":
+            self.pos += 1
+            if text not in self.names:
+                raise ExpressionError(f"Undefined attribute name placeholder {text}")
+            return self.names[text]
+        return self.take("ident")
+
+    def operand(self):
+        kind, text = self.peek()
+        if kind == "value":
+            self.pos += 1
+            if text not in self.values:
+                raise ExpressionError(f"Undefined attribute value placeholder {text}")
+            try:
+                return ("value", normalize(self.values[text]))
+            except TypeError as e:
+                raise ExpressionError(f"Invalid value for {text}: {e}")
+        if kind == "ident" and text in ("size", "if_not_exists", "list_append") \
+                and self.peek(1) == ("op", "("):
+            self.pos += 2
+            if text == "size":
+                node = ("size", self.path())
+            elif text == "if_not_exists":
+                target = self.path()
+                self.take("op", ",")
+                node = ("if_not_exists", target, self.operand())
+            else:
+                first = self.operand()
+                self.take("op", ",")
+                node = ("list_append", first, self.operand())
+            self.take("op", ")")
+            return node
+        return ("path", self.path())
+
+    # --- conditions ---
+    def condition(self):
+        node = self._and()
+        while self.accept("kw", "OR"):
+            node = ("or", node, self._and())
+        return node
+
+    def _and(self):
+        node = self._not()
+        while self.accept("kw", "AND"):
+            node = ("and", node, self._not())
+        return node
+
+    def _not(self):
+        if self.accept("kw", "NOT"):
+            return ("not", self._not())
+        return self._primary()
+
+    def _primary(self):
+        if self.accept("op", "("):
+            node = self.condition()
+            self.take("op", ")")
+            return node
+        kind, text = self.peek()
+        if kind == "ident" and self.peek(1) == ("op", "(") and text in (
+            "attribute_exists", "attribute_not_exists", "attribute_type",
+            "begins_with", "contains",
+        ):
+            self.pos += 2
+            target = self.path()
+            args = []
+            while self.accept("op", ","):
+                args.append(self.operand())
+            self.take("op", ")")
+            return (text, target, *args)
+        left = self.operand()
+        if self.accept("kw", "BETWEEN"):
+            low = self.operand()
+            self.take("kw", "AND")
+            return ("between", left, low, self.operand())
+        if self.accept("kw", "IN"):
+            self.take("op", "(")
+            options = [self.operand()]
+            while self.accept("op", ","):
+                options.append(self.operand())
+            self.take("op", ")")
+            return ("in", left, options)
+        comparator = self.take("op")
+        if comparator not in ("=", "<>", "<", "<=", ">", ">="):
+            raise ExpressionError(f"Unexpected comparator {comparator!r}")
+        return ("cmp", comparator, left, self.operand())
+
+    # --- updates ---
+    def update(self):
+        actions = {"SET": [], "REMOVE": [], "ADD": [], "DELETE": []}
+        while self.peek()[0] is not None:
+            clause = self.take("kw")
+            if clause not in actions:
+                raise ExpressionError(f"Unexpected clause {clause}")
+            while True:
+                if clause == "SET":
+                    target = self.path()
+                    self.take("op", "=")
+                    value = self.operand()
+                    if self.peek() in (("op", "+"), ("op", "-")):
+                        sign = self.take("op")
+                        value = ("arith", sign, value, self.operand())
+                    actions["SET"].append((target, value))
+                elif clause == "REMOVE":
+                    actions["REMOVE"].append(self.path())
+                else:
+                    target = self.path()
+                    actions[clause].append((target, self.operand()))
+                if not self.accept("op", ","):
+                    break
+        return actions
+
+
+# ============================================================
+# Document paths
+# ============================================================
+
+_MISSING = object()
+
+
+def get_path(item, path):
+    """Return the value at ``path`` or the module's missing sentinel."""
+    current = item
+    for part in path:
+        if isinstance(part, int):
+            if not isinstance(current, list) or part >= len(current):
+                return _MISSING
+            current = current[part]
+        else:
+            if not isinstance(current, dict) or part not in current:
+                return _MISSING
+            current = current[part]
+    return current
+
+
+def _parent(item, path):
+    parent = get_path(item, path[:-1]) if len(path) > 1 else item
+    if parent is _MISSING:
+        raise ExpressionError("The document path provided in the update expression is invalid for update")
+    return parent
+
+
+def _set_path(item, path, value):
+    parent = _parent(item, path)
+    last = path[-1]
+    if isinstance(last, int):
+        if not isinstance(parent, list):
+            raise ExpressionError("The document path provided in the update expression is invalid for update")
+        if last >= len(parent):
+            parent.append(value)
+        else:
+            parent[last] = value
+    else:
+        if not isinstance(parent, dict):
+            raise ExpressionError("The document path provided in the update expression is invalid for update")
+        parent[last] = value
+
+
+def _remove_path(item, path):
+    parent = get_path(item, path[:-1]) if len(path) > 1 else item
+    last = path[-1]
+    if isinstance(last, int):
+        if isinstance(parent, list) and last < len(parent):
+            del parent[last]
+    elif isinstance(parent, dict):
+        parent.pop(last, None)
+
+
+# ============================================================
+# Evaluation
+# ============================================================
+
+def _type_code(value):
+    if isinstance(value, str):
+        return "S"
+    if isinstance(value, bool):
+        return "BOOL"
+    if isinstance(value, Decimal):
+        return "N"
+    if isinstance(value, Binary):
+        return "B"
+    if value is None:
+        return "NULL"
+    if isinstance(value, list):
+        return "L"
+    if isinstance(value, dict):
+        return "M"
+    if isinstance(value, set):
+        sample = next(iter(value))
+        return {"S": "SS", "N": "NS", "B": "BS"}[_type_code(sample)]
+    raise ExpressionError(f"Unsupported type {type(value).__name__}")
+
+
+def _sortable(value):
+    return value.value if isinstance(value, Binary) else value
+
+
+def _operand_value(node, item):
+    kind = node[0]
+    if kind == "value":
+        return node[1]
+    if kind == "path":
+        return get_path(item, node[1])
+    if kind == "size":
+        target = get_path(item, node[1])
+        if target is _MISSING:
+            return _MISSING
+        if isinstance(target, Binary):
+            return Decimal(len(target.value))
+        return Decimal(len(target))
+    if kind == "if_not_exists":
+        existing = get_path(item, node[1])
+        return _operand_value(node[2], item) if existing is _MISSING else existing
+    if kind == "list_append":
+        first, second = _operand_value(node[1], item), _operand_value(node[2], item)
+        if not isinstance(first, list) or not isinstance(second, list):
+            raise ExpressionError("list_append requires two lists")
+        return first + second
+    if kind == "arith":
+        left, right = _operand_value(node[2], item), _operand_value(node[3], item)
+        if not isinstance(left, Decimal) or not isinstance(right, Decimal):
+            raise ExpressionError("An operand in the update expression has an incorrect data type")
+        if node[1] == "+":
+            return DYNAMODB_CONTEXT.add(left, right)
+        return DYNAMODB_CONTEXT.subtract(left, right)
+    raise ExpressionError(f"Unknown operand {kind}")
+
+
+def _compare(op, left, right):
+    if left is _MISSING or right is _MISSING:
+        return op == "<>" and not (left is _MISSING and right is _MISSING)
+    if op == "=":
+        return left == right
+    if op == "<>":
+        return left != right
+    if _type_code(left) != _type_code(right) or _type_code(left) not in ("S", "N", "B"):
+        return False
+    left, right = _sortable(left), _sortable(right)
+    return {
+        "<": left < right,
+        "<=": left <= right,
+        ">": left > right,
+        ">=": left >= right,
+    }[op]
+
+
+def _evaluate(node, item):
+    kind = node[0]
+    if kind == "and":
+        return _evaluate(node[1], item) and _evaluate(node[2], item)
+    if kind == "or":
+        return _evaluate(node[1], item) or _evaluate(node[2], item)
+    if kind == "not":
+        return not _evaluate(node[1], item)
+    if kind == "cmp":
+        return _compare(node[1], _operand_value(node[2], item), _operand_value(node[3], item))
+    if kind == "between":
+        value = _operand_value(node[1], item)
+        return _compare(">=", value, _operand_value(node[2], item)) and \
+            _compare("<=", value, _operand_value(node[3], item))
+    if kind == "in":
+        value = _operand_value(node[1], item)
+        return value is not _MISSING and any(value == _operand_value(o, item) for o in node[2])
+    if kind == "attribute_exists":
+        return get_path(item, node[1]) is not _MISSING
+    if kind == "attribute_not_exists":
+        return get_path(item, node[1]) is _MISSING
+    if kind == "attribute_type":
+        value = get_path(item, node[1])
+        return value is not _MISSING and _type_code(value) == _operand_value(node[2], item)
+    if kind == "begins_with":
+        value, prefix = get_path(item, node[1]), _operand_value(node[2], item)
+        if isinstance(value, str) and isinstance(prefix, str):
+            return value.startswith(prefix)
+        if isinstance(value, Binary) and isinstance(prefix, Binary):
+            return value.value.startswith(prefix.value)
+        return False
+    if kind == "contains":
+        value, needle = get_path(item, node[1]), _operand_value(node[2], item)
+        if isinstance(value, str) and isinstance(needle, str):
+            return needle in value
+        if isinstance(value, (set, list)):
+            return needle in value
+        return False
+    raise ExpressionError(f"Unknown condition {kind}")
+
+
+def _render(expression, names, values, is_key_condition=False):
+    """Turn a boto3 condition object into (string, names, values)."""
+    if isinstance(expression, ConditionBase):
+        built = ConditionExpressionBuilder().build_expression(
+            expression, is_key_condition=is_key_condition
+        )
+        return (
+            built.condition_expression,
+            {**(names or {}), **built.attribute_name_placeholders},
+            {**(values or {}), **built.attribute_value_placeholders},
+        )
+    return expression, names, values
+
+
+def compile_condition(expression, names=None, values=None, is_key_condition=False):
+    """Parse a condition (string or boto3 object) into an evaluable tree."""
+    expression, names, values = _render(expression, names, values, is_key_condition)
+    parser = _Parser(expression, names, values)
+    tree = parser.condition()
+    parser.done()
+    return tree
+
+
+def matches(tree, item):
+    """Evaluate a compiled condition against an item (missing item = {})."""
+    return _evaluate(tree, item or {})
+
+
+def split_key_condition(expression, hash_key, range_key, names=None, values=None):
+    """Split a KeyConditionExpression into (hash value, range condition).
+
+    The range condition is ``None`` or a tuple of (operator, *operands) with
+    operator one of ``=``, ``<``, ``<=``, ``>``, ``>=``, ``between`` or
+    ``begins_with``.
+    """
+    tree = compile_condition(expression, names, values, is_key_condition=True)
+    clauses = []
+    while tree[0] == "and":
+        clauses.append(tree[2])
+        tree = tree[1]
+    clauses.append(tree)
+
+    hash_value, range_condition = _MISSING, None
+    for clause in clauses:
+        if clause[0] == "cmp" and clause[2] == ("path", (hash_key,)) and clause[1] == "=":
+            hash_value = clause[3][1]
+        elif clause[0] == "cmp" and clause[2] == ("path", (range_key,)):
+            range_condition = (clause[1], clause[3][1])
+        elif clause[0] == "between" and clause[1] == ("path", (range_key,)):
+            range_condition = ("between", clause[2][1], clause[3][1])
+        elif clause[0] == "begins_with" and clause[1] == (range_key,):
+            range_condition = ("begins_with", clause[2][1])
+        else:
+            raise ExpressionError("Query key condition not supported")
+    if hash_value is _MISSING:
+        raise ExpressionError("Query condition missed key schema element")
+    return hash_value, range_condition
+
+
+def compile_update(expression, names=None, values=None):
+    parser = _Parser(expression, names, values)
+    actions = parser.update()
+    parser.done()
+    return actions
+
+
+def apply_update(actions, item, key_attributes=()):
+    """Apply compiled update actions to ``item`` in place."""
+    touched = [path for path, _ in actions["SET"]] + actions["REMOVE"] + \
+        [path for path, _ in actions["ADD"]] + [path for path, _ in actions["DELETE"]]
+    for path in touched:
+        if path[0] in key_attributes:
+            raise ExpressionError(
+                f"Cannot update attribute {path[0]}. This attribute is part of the key"
+            )
+
+    # Every SET right-hand side sees the item as it was before the update.
+    resolved = [(path, _operand_value(value, item)) for path, value in actions["SET"]]
+    for path, value in resolved:
+        if value is _MISSING:
+            raise ExpressionError(
+                "The provided expression refers to an attribute that does not exist in the item"
+            )
+        _set_path(item, path, value)
+
+    for path in sorted(actions["REMOVE"], key=lambda p: [str(x) for x in p], reverse=True):
+        _remove_path(item, path)
+
+    for path, operand in actions["ADD"]:
+        delta = _operand_value(operand, item)
+        existing = get_path(item, path)
+        if existing is _MISSING:
+            _set_path(item, path, delta)
+        elif isinstance(existing, Decimal) and isinstance(delta, Decimal):
+            _set_path(item, path, DYNAMODB_CONTEXT.add(existing, delta))
+        elif isinstance(existing, set) and isinstance(delta, set):
+            existing |= delta
+        else:
+            raise ExpressionError("An operand in the update expression has an incorrect data type")
+
+    for path, operand in actions["DELETE"]:
+        existing = get_path(item, path)
+        if isinstance(existing, set):
+            existing -= _operand_value(operand, item)
+            if not existing:
+                _remove_path(item, path)
+    return item
+
+
+def compile_projection(expression, names=None):
+    """Parse a ProjectionExpression into a list of document paths."""
+    parser = _Parser(expression, names, None)
+    paths = [parser.path()]
+    while parser.accept("op", ","):
+        paths.append(parser.path())
+    parser.done()
+    return paths
+
+
+def project(item, paths):
+    """Return a copy of ``item`` holding only the given document paths."""
+    result = {}
+    for path in paths:
+        value = get_path(item, path)
+        if value is _MISSING:
+            continue
+        target = result
+        for index, part in enumerate(path[:-1]):
+            nxt = path[index + 1]
+            if isinstance(part, int):
+                break
+            target = target.setdefault(part, [] if isinstance(nxt, int) else {})
+        else:
+            if isinstance(target, list):
+                target.append(value)
+            else:
+                target[path[-1]] = value
+    return result
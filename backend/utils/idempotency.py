@@ -0,0 +1,195 @@
+"""Idempotent replay for mutating endpoints.
+
+A client retry of POST /stats, PUT /learning/progress or POST /signup must
+not write a second item (or pay for a second bcrypt hash). Requests that
+carry an idempotency key are recorded in IdempotencyTable:
+
+    idempotencyKey  — "<scope>#<caller>#<client key>"
+    fingerprint     — HMAC-SHA256 of the canonical request body
+    status          — "IN_PROGRESS" | "COMPLETED"
+    response        — the stored Lambda response (JSON), once completed
+    expires_at      — epoch seconds; DynamoDB TTL attribute
+
+The client key comes from the ``Idempotency-Key`` header or, where an
+endpoint opts in, from the body (the training client's details.sessionId).
+A repeat with the same body gets the stored response back; a repeat with a
+different body gets 422, and one that arrives while the first is still
+running gets 409. Responses with a 5xx status are not stored, so those
+requests can be retried. Requests without a key run unchanged.
+
+Handlers that write several keyed records per request (POST /stats/batch,
+one per session) use claim/complete/release directly.
+"""
+
+import functools
+import hashlib
+import hmac
+import json
+import time
+from decimal import Decimal
+from boto3.dynamodb.conditions import Attr
+from botocore.exceptions import ClientError
+from utils.database import get_idempotency_table
+from utils.auth import get_auth_context
+from config import SECRET_KEY, IDEMPOTENCY_TTL_SECONDS, IDEMPOTENCY_IN_PROGRESS_SECONDS
+
+HEADER = "idempotency-key"
+MAX_KEY_LENGTH = 255
+
+
+def _header(event, name):
+    for key, value in (event.get("headers") or {}).items():
+        if key.lower() == name:
+            return value
+    return None
+
+
+def _caller(event):
+    """Scope keys to the token subject so users cannot replay each other."""
+    auth = get_auth_context(event)
+    return auth.user_id if auth and auth.user_id else "anonymous"
+
+
+def _fingerprint(body):
+    # Keyed so a stored fingerprint of a signup body cannot be brute-forced
+    # back to the password.
+    canonical = json.dumps(body, sort_keys=True, separators=(",", ":"), default=str)
+    return hmac.new(SECRET_KEY.encode(), canonical.encode(), hashlib.sha256).hexdigest()
+
+
+def _error(status, detail):
+    return {"statusCode": status, "body": json.dumps({"detail": detail})}
+
+
+def _replay(record):
+    response = json.loads(record["response"])
+    response["headers"] = {**response.get("headers", {}), "Idempotent-Replayed": "true"}
+    return response
+
+
+def _claim(table, key, fingerprint, now):
+    """Write an IN_PROGRESS record.
+
+    Returns (True, None) when the claim succeeded, else (False, record) with
+    the live record (None if it vanished between the two calls).
+    """
+    try:
+        table.put_item(
+            Item={
+                "idempotencyKey": key,
+                "fingerprint": fingerprint,
+                "status": "IN_PROGRESS",
+                "expires_at": now + IDEMPOTENCY_IN_PROGRESS_SECONDS,
+            },
+            # TTL deletion is lazy, so an expired record counts as absent
+            ConditionExpression=Attr("idempotencyKey").not_exists() | Attr("expires_at").lt(now),
+        )
+        return True, None
+    except ClientError as e:
+        if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+            raise
+    return False, table.get_item(Key={"idempotencyKey": key}, ConsistentRead=True).get("Item")
+
+
+def _key(scope, caller, client_key):
+    return f"{scope}#{caller}#{client_key}"
+
+
+def _complete(table, key, fingerprint, response):
+    table.put_item(Item={
+        "idempotencyKey": key,
+        "fingerprint": fingerprint,
+        "status": "COMPLETED",
+        "response": json.dumps(response),
+        "expires_at": int(time.time()) + IDEMPOTENCY_TTL_SECONDS,
+    })
+
+
+def claim(scope, caller, client_key, body):
+    """Claim one key outside the decorator.
+
+    Returns "claimed", "replayed" (completed earlier with the same body),
+    "conflict" (used with a different body) or "in_progress". Like the
+    decorator, a store error fails open as "claimed".
+    """
+    try:
+        claimed, existing = _claim(get_idempotency_table(), _key(scope, caller, client_key),
+                                   _fingerprint(body), int(time.time()))
+    except Exception as e:
+        print(f"Idempotency claim error for {scope}: {e}")
+        return "claimed"
+    if claimed:
+        return "claimed"
+    if existing is not None and existing.get("fingerprint") != _fingerprint(body):
+        return "conflict"
+    if existing is not None and existing.get("status") == "COMPLETED":
+        return "replayed"
+    return "in_progress"
+
+
+def complete(scope, caller, client_key, body, response):
+    """Store ``response`` for a key taken with claim()."""
+    try:
+        _complete(get_idempotency_table(), _key(scope, caller, client_key), _fingerprint(body), response)
+    except Exception as e:
+        print(f"Idempotency record error for {scope}: {e}")
+
+
+def release(scope, caller, client_key):
+    """Drop a claim whose write did not happen, so a retry can run."""
+    try:
+        get_idempotency_table().delete_item(Key={"idempotencyKey": _key(scope, caller, client_key)})
+    except Exception as e:
+        print(f"Idempotency record error for {scope}: {e}")
+
+
+def idempotent(scope, body_key=None):
+    """Decorate a Lambda handler so keyed retries replay the first response.
+
+    ``body_key(body)`` may return a fallback key from the parsed body when
+    the request has no Idempotency-Key header.
+    """
+    def decorator(handler):
+        @functools.wraps(handler)
+        def wrapper(event, context):
+            try:
+                body = json.loads(event.get("body") or "{}", parse_float=Decimal)
+            except (TypeError, ValueError):
+                return handler(event, context)
+
+            client_key = _header(event, HEADER)
+            if not client_key and body_key is not None and isinstance(body, dict):
+                client_key = body_key(body)
+            if not client_key or not isinstance(client_key, str):
+                return handler(event, context)
+            if len(client_key) > MAX_KEY_LENGTH:
+                return _error(400, "Idempotency key is too long.")
+
+            key = _key(scope, _caller(event), client_key)
+            fingerprint = _fingerprint(body)
+            table = get_idempotency_table()
+            try:
+                claimed, existing = _claim(table, key, fingerprint, int(time.time()))
+            except Exception as e:
+                # Fail open: a store outage should not take the endpoint down
+                print(f"Idempotency claim error for {scope}: {e}")
+                return handler(event, context)
+
+            if not claimed:
+                if existing is not None and existing.get("fingerprint") != fingerprint:
+                    return _error(422, "Idempotency key was reused with a different request body.")
+                if existing is not None and existing.get("status") == "COMPLETED":
+                    return _replay(existing)
+                return _error(409, "A request with this idempotency key is already in progress.")
+
+            response = handler(event, context)
+            try:
+                if response.get("statusCode", 500) >= 500:
+                    table.delete_item(Key={"idempotencyKey": key})
+                else:
+                    _complete(table, key, fingerprint, response)
+            except Exception as e:
+                print(f"Idempotency record error for {scope}: {e}")
+            return response
+        return wrapper
+    return decorator
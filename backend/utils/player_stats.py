@@ -0,0 +1,315 @@
+"""Materialized per-user rollup of StatsTable ("player_stats").
+
+One PlayerStatsTable item per (userId, gameType) holds running totals so
+/training/summary is a single GetItem instead of a re-aggregation of raw
+session items:
+
+    total_sessions, total_hands, total_mistakes, net_payout
+    results:     {win|loss|push|training_session: count}
+    total_decisions, correct_decisions
+    categories:  {category:    {total, correct, <trend state>}}
+    scenarios:   {scenarioKey: {total, correct, last_seen, <trend state>}}
+    drill_queue: the scenarios to drill next (see utils/drills.py)
+
+The trend state (see ``_track_trend``) is updated in O(1) per decision, so
+``trend_of`` can say whether a weakness is improving without replaying
+sessions.
+
+Writes are read-modify-write guarded by a ``version`` attribute, so
+concurrent writers retry instead of losing increments. The rollup is fed
+either inline by stats.save or by the StatsTable stream consumer
+(handlers/stats_stream.py), depending on STATS_AGGREGATION.
+"""
+
+import heapq
+import random
+import time
+from datetime import datetime
+from decimal import Decimal
+from boto3.dynamodb.conditions import Attr
+from botocore.exceptions import ClientError
+from config import (
+    TREND_EWMA_ALPHA, TREND_WINDOW, TREND_THRESHOLD, ROLLUP_RETRY_BASE_DELAY, ROLLUP_RETRY_MAX_DELAY,
+)
+from utils.database import get_player_stats_table
+from utils.stats_items import iter_game_items
+from utils.timestamps import sort_key_time
+from utils import drills
+from utils.decision_codec import (
+    decisions_of, DECISION_TOTAL, DECISION_CORRECT, DECISION_CATEGORIES, DECISION_SCENARIOS,
+)
+
+MAX_WRITE_ATTEMPTS = 5
+
+
+def empty_profile(user_id, game_type):
+    return {
+        "userId": user_id,
+        "gameType": game_type,
+        "version": 0,
+        "total_sessions": 0,
+        "total_hands": 0,
+        "total_mistakes": 0,
+        "net_payout": 0,
+        "results": {},
+        "total_decisions": 0,
+        "correct_decisions": 0,
+        "categories": {},
+        "scenarios": {},
+    }
+
+
+def _track_trend(entry, error):
+    """Fold one decision (error 0 or 1) into a counter's trend state.
+
+    ewma_error:   exponentially weighted error rate (TREND_EWMA_ALPHA)
+    window:       [decisions, errors] of the window being filled
+    last_window:  the most recent complete window of TREND_WINDOW decisions
+    prior_window: the complete window before it
+    """
+    ewma = entry.get("ewma_error")
+    ewma = float(error) if ewma is None else float(ewma) + TREND_EWMA_ALPHA * (error - float(ewma))
+    entry["ewma_error"] = Decimal(str(round(ewma, 6)))
+
+    decisions, errors = entry.get("window", [0, 0])
+    window = [int(decisions) + 1, int(errors) + error]
+    if window[0] >= TREND_WINDOW:
+        if "last_window" in entry:
+            entry["prior_window"] = entry["last_window"]
+        entry["last_window"] = window
+        window = [0, 0]
+    entry["window"] = window
+
+
+def _bump(counters, key, is_correct):
+    entry = counters.get(key)
+    if entry is None:
+        entry = counters[key] = {"total": 0, "correct": 0}
+    entry["total"] += 1
+    if is_correct:
+        entry["correct"] += 1
+    _track_trend(entry, 0 if is_correct else 1)
+
+
+def trend_of(entry):
+    """{"error_rate", "trend"} for a category or scenario counter.
+
+    trend is "improving" / "declining" / "stable" from the last two complete
+    windows, or "insufficient_data" until two windows have been filled.
+    """
+    last, prior = entry.get("last_window"), entry.get("prior_window")
+    if last and prior:
+        delta = int(prior[1]) / int(prior[0]) - int(last[1]) / int(last[0])
+        if delta >= TREND_THRESHOLD:
+            trend = "improving"
+        elif delta <= -TREND_THRESHOLD:
+            trend = "declining"
+        else:
+            trend = "stable"
+    else:
+        trend = "insufficient_data"
+
+    if "ewma_error" in entry:
+        error_rate = float(entry["ewma_error"])
+    else:
+        total = int(entry.get("total", 0))
+        error_rate = 1 - int(entry.get("correct", 0)) / total if total else 0
+    return {"error_rate": round(error_rate, 4), "trend": trend}
+
+
+def _fold_session_fields(profile, item):
+    profile["total_sessions"] += 1
+    result = item.get("result")
+    if result:
+        profile["results"][result] = profile["results"].get(result, 0) + 1
+    profile["total_hands"] += int(item.get("hands_played", 0))
+    profile["total_mistakes"] += int(item.get("mistakes", 0))
+    profile["net_payout"] += int(item.get("net_payout", 0))
+
+
+def fold_stats_item(profile, item):
+    """Add one StatsTable item to a profile in place.
+
+    Returns False (and changes nothing) for items already covered by the
+    history seed, identified by sort key.
+    """
+    seeded_through = profile.get("seeded_through")
+    if seeded_through and item.get("timestamp", "") <= seeded_through:
+        return False
+
+    _fold_session_fields(profile, item)
+    seen = sort_key_time(item["timestamp"]).isoformat() if item.get("timestamp") else None
+    for d in decisions_of(item):
+        is_correct = bool(d.get("isCorrect", False))
+        profile["total_decisions"] += 1
+        if is_correct:
+            profile["correct_decisions"] += 1
+        _bump(profile["categories"], d.get("category", "unknown"), is_correct)
+        scenario = d.get("scenarioKey")
+        if scenario:
+            _bump(profile["scenarios"], scenario, is_correct)
+            if seen and seen > profile["scenarios"][scenario].get("last_seen", ""):
+                profile["scenarios"][scenario]["last_seen"] = seen
+    return True
+
+
+def fold_session_counters(profile, item, counters):
+    """Add a session to a profile from its write-time decision counters.
+
+    Used by windowed reads that project counters instead of decisions.
+    """
+    _fold_session_fields(profile, item)
+    profile["total_decisions"] += int(counters[DECISION_TOTAL])
+    profile["correct_decisions"] += int(counters[DECISION_CORRECT])
+    for field, source in (("categories", DECISION_CATEGORIES), ("scenarios", DECISION_SCENARIOS)):
+        for key, stats in counters.get(source, {}).items():
+            entry = profile[field].setdefault(key, {"total": 0, "correct": 0})
+            entry["total"] += int(stats["total"])
+            entry["correct"] += int(stats["correct"])
+
+
+def weakest_scenarios(scenarios, limit, min_samples):
+    """Top ``limit`` scenarios by lowest accuracy among those with enough samples.
+
+    A heap selection over the rollup's scenario index, so the cost is
+    O(S log limit) in distinct scenarios and never touches history. Ties
+    favour the scenario seen more often.
+    """
+    candidates = (
+        (int(stats["correct"]) / int(stats["total"]), -int(stats["total"]), key, stats)
+        for key, stats in scenarios.items()
+        if int(stats["total"]) >= min_samples
+    )
+    return [
+        {
+            "scenario": key,
+            "total": int(stats["total"]),
+            "correct": int(stats["correct"]),
+            "accuracy": round(accuracy, 4),
+        }
+        for accuracy, _, key, stats in heapq.nsmallest(limit, candidates, key=lambda c: c[:3])
+    ]
+
+
+def build_profile(user_id, game_type, items):
+    """Fold an iterable of StatsTable items into a fresh profile."""
+    profile = empty_profile(user_id, game_type)
+    for item in items:
+        fold_stats_item(profile, item)
+    return profile
+
+
+def build_from_history(user_id, game_type):
+    """Stream a user's full StatsTable history into a fresh profile.
+
+    ``seeded_through`` records the newest sort key folded, so later inline
+    or stream updates for those same items are skipped.
+    """
+    profile = empty_profile(user_id, game_type)
+    for item in iter_game_items(user_id, game_type):
+        fold_stats_item(profile, item)
+        profile["seeded_through"] = item["timestamp"]
+    return profile
+
+
+def get_profile(user_id, game_type, consistent=False):
+    """Return the stored rollup item, or None if it was never built."""
+    return get_player_stats_table().get_item(
+        Key={"userId": user_id, "gameType": game_type}, ConsistentRead=consistent,
+    ).get("Item")
+
+
+def discard_profile(user_id, game_type):
+    """Delete the rollup so the next update or read rebuilds it from history.
+
+    Used when a stored session could not be folded in: later folds only add
+    the items they are handed, so a rebuild is the only way to pick it up.
+    """
+    get_player_stats_table().delete_item(Key={"userId": user_id, "gameType": game_type})
+
+
+def get_drill_queue(user_id, game_type):
+    """The stored drill queue, or None if the rollup has none yet."""
+    item = get_player_stats_table().get_item(
+        Key={"userId": user_id, "gameType": game_type},
+        ProjectionExpression=drills.DRILL_QUEUE,
+    ).get("Item")
+    return item.get(drills.DRILL_QUEUE) if item else None
+
+
+def _update(user_id, game_type, fold):
+    """Load (or seed) the rollup, apply ``fold`` and write it back atomically.
+
+    The drill queue is rebuilt from the folded scenario index on every write.
+
+    ``fold(profile)`` returns False when it had nothing to add, in which case
+    an existing rollup is left untouched. The version is read strongly
+    consistent, and lost races back off with full jitter before retrying.
+    """
+    table = get_player_stats_table()
+    for attempt in range(1, MAX_WRITE_ATTEMPTS + 1):
+        profile = get_profile(user_id, game_type, consistent=True)
+        if profile is None:
+            profile = build_from_history(user_id, game_type)
+            fold(profile)
+            condition = Attr("userId").not_exists()
+        else:
+            if not fold(profile):
+                return profile
+            condition = Attr("version").eq(profile["version"])
+
+        profile[drills.DRILL_QUEUE] = drills.build_queue(profile["scenarios"])
+        profile["version"] = int(profile["version"]) + 1
+        profile["updatedAt"] = datetime.utcnow().isoformat()
+        try:
+            table.put_item(Item=profile, ConditionExpression=condition)
+            return profile
+        except ClientError as e:
+            if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+                raise
+        if attempt < MAX_WRITE_ATTEMPTS:
+            time.sleep(random.uniform(0, min(ROLLUP_RETRY_MAX_DELAY, ROLLUP_RETRY_BASE_DELAY * 2 ** attempt)))
+    raise RuntimeError(f"player_stats update for {user_id} lost {MAX_WRITE_ATTEMPTS} races")
+
+
+def record_session(user_id, game_type, item):
+    """Fold a freshly written stats item into the user's rollup."""
+    return record_sessions(user_id, game_type, [item])
+
+
+def record_sessions(user_id, game_type, items):
+    """Fold several freshly written stats items into the rollup in one write."""
+    def fold(profile):
+        folded = [fold_stats_item(profile, item) for item in items]
+        return any(folded)
+
+    return _update(user_id, game_type, fold)
+
+
+def ensure_profile(user_id, game_type):
+    """Return the rollup, building and storing it from history if missing.
+
+    The put is conditional on the rollup still being absent, so concurrent
+    first reads store it once and the loser returns the winner's item.
+    """
+    return _update(user_id, game_type, lambda profile: False)
+
+
+def apply_stream_records(user_id, game_type, records):
+    """Fold stream records [(sequence_number, item), ...] in one write.
+
+    ``stream_checkpoint`` stores the highest sequence number applied for the
+    user; records at or below it are skipped, so a re-delivered batch (after
+    a partial failure or a retry) is never counted twice.
+    """
+    def fold(profile):
+        checkpoint = int(profile.get("stream_checkpoint", 0))
+        fresh = [(seq, item) for seq, item in records if seq > checkpoint]
+        if not fresh:
+            return False
+        for _, item in fresh:
+            fold_stats_item(profile, item)
+        profile["stream_checkpoint"] = max(seq for seq, _ in fresh)
+        return True
+
+    return _update(user_id, game_type, fold)
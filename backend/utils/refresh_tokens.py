@@ -0,0 +1,148 @@
+"""Rotating refresh tokens for POST /auth/refresh.
+
+Access tokens stay short-lived. Instead of sending the player back through
+``login`` (a deliberately slow bcrypt verify), the client trades its
+refresh token for a new access token and a new refresh token, which costs
+a couple of key lookups. Tokens are opaque random strings; RefreshTokensTable
+stores only their SHA-256 digest:
+
+    tokenHash   — sha256 hex of the token, or "family#<familyId>"
+    userId, email, familyId
+    status      — "ACTIVE" | "ROTATED" (token items)
+    revoked     — bool (family items)
+    tokenEpoch  — the user's token_epoch when the family started (family items)
+    expires_at  — epoch seconds; DynamoDB TTL attribute
+
+Every login starts a family. Each refresh rotates: the presented token is
+marked ROTATED with a conditional write and its successor gets a fresh
+REFRESH_TOKEN_EXPIRE_DAYS idle window (a sliding session), capped at
+REFRESH_SESSION_MAX_DAYS after the login. Presenting a ROTATED token again
+means it was copied, so the whole family is revoked and the legitimate
+holder has to log in again. Logout revokes the family the same way.
+
+Changing or resetting the password bumps ``token_epoch`` on the UsersTable
+item (see handlers/auth.py). Families started under an older epoch stop
+refreshing, which revokes every session at once without having to find
+them in RefreshTokensTable.
+"""
+
+import hashlib
+import secrets
+import time
+import uuid
+from botocore.exceptions import ClientError
+from utils.database import get_refresh_tokens_table, get_users_table
+from config import REFRESH_TOKEN_EXPIRE_DAYS, REFRESH_SESSION_MAX_DAYS
+
+_DAY = 86400
+
+
+class RefreshTokenError(ValueError):
+    """The refresh token is unknown, expired, revoked or was reused."""
+
+
+def _digest(token):
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def _family_key(family_id):
+    return f"family#{family_id}"
+
+
+def _put_token(table, user_id, email, family_id, session_expires_at, now):
+    token = secrets.token_urlsafe(32)
+    table.put_item(Item={
+        "tokenHash": _digest(token),
+        "userId": user_id,
+        "email": email,
+        "familyId": family_id,
+        "status": "ACTIVE",
+        "expires_at": min(now + REFRESH_TOKEN_EXPIRE_DAYS * _DAY, session_expires_at),
+    })
+    return token
+
+
+def issue(user_id, email, token_epoch=0):
+    """Start a new family at login and return its first refresh token.
+
+    ``token_epoch`` is the user's current UsersTable token_epoch.
+    """
+    table = get_refresh_tokens_table()
+    now = int(time.time())
+    family_id = uuid.uuid4().hex
+    session_expires_at = now + REFRESH_SESSION_MAX_DAYS * _DAY
+    table.put_item(Item={
+        "tokenHash": _family_key(family_id),
+        "userId": user_id,
+        "revoked": False,
+        "tokenEpoch": int(token_epoch),
+        "expires_at": session_expires_at,
+    })
+    return _put_token(table, user_id, email, family_id, session_expires_at, now)
+
+
+def _revoke_family(table, family_id):
+    table.update_item(
+        Key={"tokenHash": _family_key(family_id)},
+        UpdateExpression="SET revoked = :t",
+        ExpressionAttributeValues={":t": True},
+    )
+
+
+def _current_epoch(email):
+    """The user's token_epoch, or None if the account no longer exists."""
+    user = get_users_table().get_item(
+        Key={"email": email}, ProjectionExpression="token_epoch", ConsistentRead=True,
+    ).get("Item") if email else None
+    return int(user.get("token_epoch", 0)) if user is not None else None
+
+
+def rotate(token):
+    """Consume ``token`` and return (user_id, email, next refresh token).
+
+    Raises RefreshTokenError; a reused token also revokes its family, and a
+    family from before the last password change is revoked on sight.
+    """
+    table = get_refresh_tokens_table()
+    now = int(time.time())
+    # TTL deletion is lazy, so expired items are checked explicitly
+    item = table.get_item(Key={"tokenHash": _digest(token)}, ConsistentRead=True).get("Item")
+    if item is None or "familyId" not in item or item["expires_at"] <= now:
+        raise RefreshTokenError("Invalid refresh token.")
+    family = table.get_item(Key={"tokenHash": _family_key(item["familyId"])}, ConsistentRead=True).get("Item")
+    if family is None or family.get("revoked") or family["expires_at"] <= now:
+        raise RefreshTokenError("Refresh token has been revoked.")
+    if _current_epoch(item.get("email")) != int(family.get("tokenEpoch", 0)):
+        _revoke_family(table, item["familyId"])
+        raise RefreshTokenError("Refresh token has been revoked.")
+    if item["status"] != "ACTIVE":
+        _revoke_family(table, item["familyId"])
+        raise RefreshTokenError("Refresh token was already used.")
+
+    try:
+        table.update_item(
+            Key={"tokenHash": item["tokenHash"]},
+            UpdateExpression="SET #st = :rotated, rotated_at = :now",
+            # Two concurrent refreshes with the same token: only one wins
+            ConditionExpression="#st = :active",
+            ExpressionAttributeNames={"#st": "status"},
+            ExpressionAttributeValues={":rotated": "ROTATED", ":active": "ACTIVE", ":now": now},
+        )
+    except ClientError as e:
+        if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+            raise
+        _revoke_family(table, item["familyId"])
+        raise RefreshTokenError("Refresh token was already used.")
+
+    next_token = _put_token(
+        table, item["userId"], item.get("email"), item["familyId"], int(family["expires_at"]), now,
+    )
+    return item["userId"], item.get("email"), next_token
+
+
+def revoke(token):
+    """Revoke the family ``token`` belongs to (logout). Unknown tokens are ignored."""
+    table = get_refresh_tokens_table()
+    item = table.get_item(Key={"tokenHash": _digest(token)}).get("Item")
+    if item is not None and "familyId" in item:
+        _revoke_family(table, item["familyId"])
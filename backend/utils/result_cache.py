@@ -0,0 +1,68 @@
+"""Bounded in-process LRU cache with TTL for computed response bodies.
+
+Module-level, so it survives warm Lambda invocations like the table
+registry in utils/database.py. Callers key entries by something that
+changes whenever the underlying data does (the training handlers use the
+ETag from utils/etag.py), so a hit is always current; the TTL only bounds
+how long memory is held for users who stop asking.
+"""
+
+import time
+from collections import OrderedDict
+from config import RESULT_CACHE_MAX_ENTRIES, RESULT_CACHE_TTL_SECONDS
+
+
+class ResultCache:
+    """LRU of at most ``max_entries`` values, each valid for ``ttl_seconds``."""
+
+    def __init__(self, max_entries, ttl_seconds, clock=None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock or time.monotonic
+        self._entries = OrderedDict()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0}
+
+    def get(self, key):
+        if self.max_entries <= 0:
+            return None
+        entry = self._entries.get(key)
+        if entry is None:
+            self._stats["misses"] += 1
+            return None
+        expires_at, value = entry
+        if expires_at <= self.clock():
+            del self._entries[key]
+            self._stats["expirations"] += 1
+            self._stats["misses"] += 1
+            return None
+        self._entries.move_to_end(key)
+        self._stats["hits"] += 1
+        return value
+
+    def put(self, key, value, ttl_seconds=None):
+        """Store ``value``; ``ttl_seconds`` overrides the cache-wide TTL."""
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        if self.max_entries <= 0 or ttl <= 0:
+            return
+        self._entries[key] = (self.clock() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def clear(self):
+        self._entries.clear()
+        for key in self._stats:
+            self._stats[key] = 0
+
+    def stats(self):
+        lookups = self._stats["hits"] + self._stats["misses"]
+        return {
+            **self._stats,
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "hit_rate": round(self._stats["hits"] / lookups, 4) if lookups else 0,
+        }
+
+
+summary_cache = ResultCache(RESULT_CACHE_MAX_ENTRIES, RESULT_CACHE_TTL_SECONDS)
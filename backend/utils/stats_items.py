@@ -0,0 +1,136 @@
+"""Reads of one user's StatsTable items for a single game.
+
+Game-partitioned items (see utils/timestamps.py) are read with a key
+condition on their ``<gameType>#`` range, so other games' sessions are
+never touched. While STATS_LEGACY_KEYS is on, the unprefixed legacy range
+is read first (it sorts before every game prefix and predates it) and
+filtered by game type in code.
+
+Items written before the write-time decision counters existed get them
+through ``store_counters`` (jobs/backfill_decision_counters.py); until
+then the training read path counts them in memory.
+"""
+
+from boto3.dynamodb.conditions import Attr, Key
+from botocore.exceptions import ClientError
+from utils.database import get_stats_table, iter_query
+from utils.decision_codec import DECISION_TOTAL
+from utils.timestamps import (
+    LEGACY_KEY_END, game_key_bounds, in_window, sort_key_bounds,
+)
+from config import STATS_LEGACY_KEYS
+
+DEFAULT_GAME_TYPE = "blackjack"
+# Set on items re-keyed by jobs/migrate_stats_sort_keys.py (old sort key).
+MIGRATED_FROM = "migratedFrom"
+
+# Legacy items may only carry their game type inside details.
+_LEGACY_GAME_FIELDS = "#gt, #det.#gt"
+_LEGACY_GAME_NAMES = {"#gt": "gameType", "#det": "details"}
+
+
+def game_type_of(item):
+    """Game type of a StatsTable item (older items only carry it in details)."""
+    details = item.get("details")
+    return item.get("gameType") or (
+        details.get("gameType") if isinstance(details, dict) else None
+    ) or DEFAULT_GAME_TYPE
+
+
+def store_counters(user_id, timestamp, counters):
+    """Write decision counters onto an existing item that predates them.
+
+    Conditional on the item still existing without counters, so racing
+    backfills (or a migration that already moved the item) are harmless.
+    Returns True if this call wrote them.
+    """
+    names = {f"#c{i}": name for i, name in enumerate(counters)}
+    values = {f":c{i}": value for i, value in enumerate(counters.values())}
+    try:
+        get_stats_table().update_item(
+            Key={"userId": user_id, "timestamp": timestamp},
+            UpdateExpression="SET " + ", ".join(f"#c{i} = :c{i}" for i in range(len(counters))),
+            ConditionExpression=Attr("userId").exists() & Attr(DECISION_TOTAL).not_exists(),
+            ExpressionAttributeNames=names,
+            ExpressionAttributeValues=values,
+        )
+    except ClientError as e:
+        if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+            raise
+        return False
+    return True
+
+
+def _query(user_id, range_condition, projection, names, forward=True):
+    kwargs = {
+        "KeyConditionExpression": Key("userId").eq(user_id) & range_condition,
+        "ScanIndexForward": forward,
+    }
+    if projection:
+        kwargs["ProjectionExpression"] = projection
+    if names:
+        kwargs["ExpressionAttributeNames"] = names
+    return iter_query(get_stats_table(), **kwargs)
+
+
+def _ranges(game_type, window):
+    """(is_legacy, range condition) for each key range a game read covers."""
+    if STATS_LEGACY_KEYS:
+        if window is None:
+            yield True, Key("timestamp").lt(LEGACY_KEY_END)
+        else:
+            yield True, Key("timestamp").between(*sort_key_bounds(*window))
+    if window is None:
+        yield False, Key("timestamp").begins_with(f"{game_type}#")
+    else:
+        yield False, Key("timestamp").between(*game_key_bounds(game_type, *window))
+
+
+def iter_game_items(user_id, game_type, window=None, projection=None, names=None, newest_first=False):
+    """Stream a user's items for one game in sort key order.
+
+    ``window`` is an optional (start, end) pair of naive UTC datetimes and
+    becomes a ``between`` key condition. ``projection``/``names`` are passed
+    through as ProjectionExpression/ExpressionAttributeNames. With
+    ``newest_first`` the order is reversed, so a caller that stops early
+    reads only the most recent pages.
+    """
+    ranges = list(_ranges(game_type, window))
+    if newest_first:
+        ranges.reverse()
+    forward = not newest_first
+    for legacy, key_range in ranges:
+        if not legacy:
+            yield from _query(user_id, key_range, projection, names, forward)
+            continue
+        legacy_projection, legacy_names = projection, names
+        if projection and _LEGACY_GAME_FIELDS not in projection:
+            legacy_projection = f"{projection}, {_LEGACY_GAME_FIELDS}"
+            legacy_names = {**(names or {}), **_LEGACY_GAME_NAMES}
+        for item in _query(user_id, key_range, legacy_projection, legacy_names, forward):
+            if game_type_of(item) != game_type:
+                continue
+            if window is None or in_window(item["timestamp"], *window):
+                yield item
+
+
+def range_markers(user_id, game_type, window=None):
+    """First and last sort key of each range ``iter_game_items`` reads.
+
+    Items are append-only with increasing keys, so if these are unchanged
+    the read would return the same items. Costs one Limit=1 keys-only query
+    per range end.
+    """
+    markers = []
+    table = get_stats_table()
+    for _, key_range in _ranges(game_type, window):
+        for forward in (True, False):
+            items = table.query(
+                KeyConditionExpression=Key("userId").eq(user_id) & key_range,
+                ScanIndexForward=forward,
+                Limit=1,
+                ProjectionExpression="#ts",
+                ExpressionAttributeNames={"#ts": "timestamp"},
+            ).get("Items", [])
+            markers.append(items[0]["timestamp"] if items else None)
+    return markers
@@ -0,0 +1,684 @@
+"""Pluggable storage backends behind utils.database.
+
+Handlers talk to a Table-shaped object with the boto3 Table method names and
+keyword arguments (get_item, put_item, update_item, delete_item, query,
+scan, batch_writer). Three backends provide it:
+
+    dynamodb — the real boto3 Table (production)
+    memory   — per-partition sorted dicts, for tests and laptop benchmarks
+    sqlite   — one SQLite file, for larger-than-memory local runs
+
+Local engines store values in DynamoDB's type system (Decimal numbers,
+Binary, sets), raise the same botocore ClientError codes, and honour key
+conditions, Limit, ScanIndexForward, ExclusiveStartKey/LastEvaluatedKey,
+ProjectionExpression, FilterExpression and parallel-scan segments.
+"""
+
+import base64
+import bisect
+import copy
+import json
+import sqlite3
+import threading
+import zlib
+from decimal import Decimal
+from botocore.exceptions import ClientError
+from boto3.dynamodb.types import Binary, TypeDeserializer, TypeSerializer
+from utils.expressions import (
+    ExpressionError, apply_update, compile_condition, compile_projection,
+    compile_update, matches, normalize, project, split_key_condition,
+)
+
+
+def _client_error(code, message, operation):
+    return ClientError({"Error": {"Code": code, "Message": message}}, operation)
+
+
+# ============================================================
+# Backend interface
+# ============================================================
+
+class StorageBackend:
+    """Factory for Table-shaped handles. Subclasses implement ``table``."""
+
+    name = ""
+
+    def table(self, name, hash_key, range_key=None):
+        raise NotImplementedError
+
+    def batch_write_item(self, RequestItems, **kwargs):
+        """Apply PutRequest/DeleteRequest entries across tables."""
+        for table_name, requests in RequestItems.items():
+            table = self._tables[table_name]
+            for request in requests:
+                if "PutRequest" in request:
+                    table.put_item(Item=request["PutRequest"]["Item"])
+                else:
+                    table.delete_item(Key=request["DeleteRequest"]["Key"])
+        return {"UnprocessedItems": {}}
+
+
+class DynamoDBBackend(StorageBackend):
+    """Hands out boto3 Table resources from a shared service resource."""
+
+    name = "dynamodb"
+
+    def __init__(self, resource):
+        self.resource = resource
+
+    def table(self, name, hash_key, range_key=None):
+        return self.resource.Table(name)
+
+    def batch_write_item(self, RequestItems, **kwargs):
+        return self.resource.batch_write_item(RequestItems=RequestItems, **kwargs)
+
+
+class MemoryBackend(StorageBackend):
+    """Process-local tables held in sorted in-memory partitions."""
+
+    name = "memory"
+
+    def __init__(self):
+        self._tables = {}
+
+    def table(self, name, hash_key, range_key=None):
+        if name not in self._tables:
+            self._tables[name] = MemoryTable(name, hash_key, range_key)
+        return self._tables[name]
+
+
+class SQLiteBackend(StorageBackend):
+    """Tables stored in a single SQLite database file."""
+
+    name = "sqlite"
+
+    def __init__(self, path):
+        self.path = path
+        self._conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._lock = threading.RLock()
+        self._tables = {}
+
+    def table(self, name, hash_key, range_key=None):
+        if name not in self._tables:
+            self._tables[name] = SQLiteTable(self._conn, self._lock, name, hash_key, range_key)
+        return self._tables[name]
+
+
+# ============================================================
+# Shared local-table behaviour
+# ============================================================
+
+def _partition_token(value):
+    """Stable string form of a hash-key value (used for storage and segments)."""
+    if isinstance(value, Binary):
+        return "B:" + base64.b64encode(value.value).decode()
+    if isinstance(value, Decimal):
+        return "N:" + str(value)
+    return "S:" + value
+
+
+def _valid_key_value(value):
+    """Key attributes must be a non-empty string or binary, or a number."""
+    if isinstance(value, Decimal):
+        return True
+    if isinstance(value, (str, Binary)):
+        return len(value) > 0
+    return False
+
+
+def _sort_token(value):
+    if isinstance(value, Binary):
+        return value.value
+    return value
+
+
+class _LocalTable:
+    """Request handling common to the memory and SQLite engines."""
+
+    def __init__(self, name, hash_key, range_key):
+        self.name = name
+        self.hash_key = hash_key
+        self.range_key = range_key
+        self.key_attributes = (hash_key,) if range_key is None else (hash_key, range_key)
+
+    # --- storage primitives implemented by subclasses ---
+    def _load(self, hash_value, range_value):
+        raise NotImplementedError
+
+    def _store(self, item):
+        raise NotImplementedError
+
+    def _discard(self, hash_value, range_value):
+        raise NotImplementedError
+
+    def _range(self, hash_value, range_condition, forward, start_after):
+        """Yield items of one partition in sort order, after ``start_after``."""
+        raise NotImplementedError
+
+    def _scan_items(self, segment, total_segments, start_after):
+        raise NotImplementedError
+
+    def _transaction(self):
+        raise NotImplementedError
+
+    # --- helpers ---
+    def _key_values(self, key, operation):
+        try:
+            key = normalize(key)
+            hash_value = key[self.hash_key]
+            range_value = key[self.range_key] if self.range_key else None
+        except (KeyError, TypeError):
+            raise _client_error(
+                "ValidationException",
+                "The provided key element does not match the schema", operation,
+            )
+        if len(key) != len(self.key_attributes) or not all(
+            _valid_key_value(key[k]) for k in self.key_attributes
+        ):
+            raise _client_error(
+                "ValidationException",
+                "The provided key element does not match the schema", operation,
+            )
+        return hash_value, range_value
+
+    def _key_of(self, item):
+        key = {self.hash_key: item[self.hash_key]}
+        if self.range_key:
+            key[self.range_key] = item[self.range_key]
+        return key
+
+    def _check(self, kwargs, item, operation):
+        condition = kwargs.get("ConditionExpression")
+        if condition is None:
+            return
+        tree = self._compile(
+            compile_condition, operation, condition,
+            kwargs.get("ExpressionAttributeNames"), kwargs.get("ExpressionAttributeValues"),
+        )
+        if not matches(tree, item):
+            raise _client_error(
+                "ConditionalCheckFailedException", "The conditional request failed", operation,
+            )
+
+    @staticmethod
+    def _compile(compiler, operation, *args, **kwargs):
+        try:
+            return compiler(*args, **kwargs)
+        except ExpressionError as e:
+            raise _client_error("ValidationException", str(e), operation)
+
+    def _projector(self, kwargs, operation):
+        projection = kwargs.get("ProjectionExpression")
+        if not projection:
+            return None
+        return self._compile(
+            compile_projection, operation, projection, kwargs.get("ExpressionAttributeNames"),
+        )
+
+    # --- Table API ---
+    def get_item(self, Key, **kwargs):
+        hash_value, range_value = self._key_values(Key, "GetItem")
+        paths = self._projector(kwargs, "GetItem")
+        item = self._load(hash_value, range_value)
+        if item is None:
+            return {}
+        return {"Item": project(item, paths) if paths else item}
+
+    def put_item(self, Item, **kwargs):
+        try:
+            item = normalize(Item)
+        except TypeError as e:
+            raise _client_error("ValidationException", str(e), "PutItem")
+        hash_value, range_value = self._key_values(self._key_of_checked(item), "PutItem")
+        with self._transaction():
+            existing = self._load(hash_value, range_value)
+            self._check(kwargs, existing, "PutItem")
+            self._store(item)
+        if kwargs.get("ReturnValues") == "ALL_OLD" and existing is not None:
+            return {"Attributes": existing}
+        return {}
+
+    def _key_of_checked(self, item):
+        missing = [k for k in self.key_attributes if k not in item]
+        if missing:
+            raise _client_error(
+                "ValidationException",
+                f"One or more parameter values were invalid: Missing the key {missing[0]} in the item",
+                "PutItem",
+            )
+        return self._key_of(item)
+
+    def update_item(self, Key, **kwargs):
+        hash_value, range_value = self._key_values(Key, "UpdateItem")
+        names = kwargs.get("ExpressionAttributeNames")
+        values = kwargs.get("ExpressionAttributeValues")
+        actions = None
+        if kwargs.get("UpdateExpression"):
+            actions = self._compile(
+                compile_update, "UpdateItem", kwargs["UpdateExpression"], names, values,
+            )
+        with self._transaction():
+            existing = self._load(hash_value, range_value)
+            self._check(kwargs, existing, "UpdateItem")
+            item = copy.deepcopy(existing) if existing is not None else normalize(Key)
+            if actions is not None:
+                try:
+                    apply_update(actions, item, self.key_attributes)
+                except ExpressionError as e:
+                    raise _client_error("ValidationException", str(e), "UpdateItem")
+            self._store(item)
+
+        return_values = kwargs.get("ReturnValues", "NONE")
+        if return_values == "ALL_NEW":
+            return {"Attributes": copy.deepcopy(item)}
+        if return_values == "ALL_OLD":
+            return {"Attributes": existing} if existing is not None else {}
+        if return_values == "UPDATED_NEW":
+            changed = {k: v for k, v in item.items()
+                       if k not in self.key_attributes and (existing or {}).get(k) != v}
+            return {"Attributes": copy.deepcopy(changed)}
+        return {}
+
+    def delete_item(self, Key, **kwargs):
+        hash_value, range_value = self._key_values(Key, "DeleteItem")
+        with self._transaction():
+            existing = self._load(hash_value, range_value)
+            self._check(kwargs, existing, "DeleteItem")
+            if existing is not None:
+                self._discard(hash_value, range_value)
+        if kwargs.get("ReturnValues") == "ALL_OLD" and existing is not None:
+            return {"Attributes": existing}
+        return {}
+
+    def query(self, KeyConditionExpression, **kwargs):
+        names = kwargs.get("ExpressionAttributeNames")
+        values = kwargs.get("ExpressionAttributeValues")
+        try:
+            hash_value, range_condition = split_key_condition(
+                KeyConditionExpression, self.hash_key, self.range_key, names, values,
+            )
+        except ExpressionError as e:
+            raise _client_error("ValidationException", str(e), "Query")
+
+        start_after = None
+        if kwargs.get("ExclusiveStartKey"):
+            _, start_after = self._key_values(kwargs["ExclusiveStartKey"], "Query")
+        items = self._range(
+            hash_value, range_condition, kwargs.get("ScanIndexForward", True), start_after,
+        )
+        return self._page(items, kwargs, "Query")
+
+    def scan(self, **kwargs):
+        segment = kwargs.get("Segment", 0)
+        total_segments = kwargs.get("TotalSegments", 1)
+        start_after = None
+        if kwargs.get("ExclusiveStartKey"):
+            start_after = self._key_values(kwargs["ExclusiveStartKey"], "Scan")
+        items = self._scan_items(segment, total_segments, start_after)
+        return self._page(items, kwargs, "Scan")
+
+    def _page(self, items, kwargs, operation):
+        """Apply Limit (before filtering, as DynamoDB does), filter and projection."""
+        limit = kwargs.get("Limit")
+        filter_tree = None
+        if kwargs.get("FilterExpression") is not None:
+            filter_tree = self._compile(
+                compile_condition, operation, kwargs["FilterExpression"],
+                kwargs.get("ExpressionAttributeNames"), kwargs.get("ExpressionAttributeValues"),
+            )
+        paths = self._projector(kwargs, operation)
+
+        page, scanned, last, previous = [], 0, None, None
+        iterator = iter(items)
+        for item in iterator:
+            if limit is not None and scanned >= limit:
+                last = previous
+                break
+            scanned += 1
+            previous = item
+            if filter_tree is None or matches(filter_tree, item):
+                page.append(project(item, paths) if paths else item)
+
+        response = {"Count": len(page), "ScannedCount": scanned}
+        if kwargs.get("Select") != "COUNT":
+            response["Items"] = page
+        if last is not None:
+            response["LastEvaluatedKey"] = copy.deepcopy(self._key_of(last))
+        return response
+
+    def batch_writer(self, overwrite_by_pkeys=None):
+        return _LocalBatchWriter(self)
+
+
+class _LocalBatchWriter:
+    """Minimal stand-in for boto3's Table.batch_writer() context manager."""
+
+    def __init__(self, table):
+        self._table = table
+
+    def put_item(self, Item):
+        self._table.put_item(Item=Item)
+
+    def delete_item(self, Key):
+        self._table.delete_item(Key=Key)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        return False
+
+
+def _segment_of(hash_value, total_segments):
+    return zlib.crc32(_partition_token(hash_value).encode()) % total_segments
+
+
+def _range_bounds(range_condition):
+    """Translate a range condition to inclusive/exclusive (low, high) bounds."""
+    if range_condition is None:
+        return None, True, None, True
+    op, *args = range_condition
+    if op == "=":
+        return args[0], True, args[0], True
+    if op == "<":
+        return None, True, args[0], False
+    if op == "<=":
+        return None, True, args[0], True
+    if op == ">":
+        return args[0], False, None, True
+    if op == ">=":
+        return args[0], True, None, True
+    if op == "between":
+        return args[0], True, args[1], True
+    upper = _prefix_upper(args[0])
+    return args[0], True, upper, upper is None  # begins_with
+
+
+def _prefix_upper(prefix):
+    """Smallest value greater than every value starting with ``prefix``."""
+    if isinstance(prefix, Binary):
+        raw = prefix.value.rstrip(b"\xff")
+        return Binary(raw[:-1] + bytes([raw[-1] + 1])) if raw else None
+    raw = prefix.rstrip("\U0010ffff")
+    return raw[:-1] + chr(ord(raw[-1]) + 1) if raw else None
+
+
+# ============================================================
+# In-memory engine
+# ============================================================
+
+class _Partition:
+    __slots__ = ("keys", "items")
+
+    def __init__(self):
+        self.keys = []
+        self.items = {}
+
+
+class MemoryTable(_LocalTable):
+    """Hash partitions holding a sorted key list plus a key→item dict."""
+
+    def __init__(self, name, hash_key, range_key=None):
+        super().__init__(name, hash_key, range_key)
+        self._partitions = {}
+        self._lock = threading.RLock()
+
+    def _transaction(self):
+        return self._lock
+
+    def _load(self, hash_value, range_value):
+        with self._lock:
+            partition = self._partitions.get(hash_value)
+            if partition is None:
+                return None
+            item = partition.items.get(_sort_token(range_value))
+            return copy.deepcopy(item) if item is not None else None
+
+    def _store(self, item):
+        hash_value = item[self.hash_key]
+        sort_key = _sort_token(item[self.range_key]) if self.range_key else None
+        with self._lock:
+            partition = self._partitions.setdefault(hash_value, _Partition())
+            if sort_key not in partition.items:
+                bisect.insort(partition.keys, sort_key) if self.range_key else partition.keys.append(sort_key)
+            partition.items[sort_key] = copy.deepcopy(item)
+
+    def _discard(self, hash_value, range_value):
+        sort_key = _sort_token(range_value)
+        with self._lock:
+            partition = self._partitions.get(hash_value)
+            if partition is None or sort_key not in partition.items:
+                return
+            del partition.items[sort_key]
+            partition.keys.pop(bisect.bisect_left(partition.keys, sort_key) if self.range_key else 0)
+            if not partition.items:
+                del self._partitions[hash_value]
+
+    def _range(self, hash_value, range_condition, forward, start_after):
+        with self._lock:
+            partition = self._partitions.get(hash_value)
+            if partition is None:
+                return
+            keys = partition.keys
+            low, low_inclusive, high, high_inclusive = _range_bounds(range_condition)
+            lo = 0 if low is None else (
+                bisect.bisect_left(keys, _sort_token(low)) if low_inclusive
+                else bisect.bisect_right(keys, _sort_token(low))
+            )
+            hi = len(keys) if high is None else (
+                bisect.bisect_right(keys, _sort_token(high)) if high_inclusive
+                else bisect.bisect_left(keys, _sort_token(high))
+            )
+            if start_after is not None:
+                token = _sort_token(start_after)
+                if forward:
+                    lo = max(lo, bisect.bisect_right(keys, token))
+                else:
+                    hi = min(hi, bisect.bisect_left(keys, token))
+            selected = keys[lo:hi] if forward else keys[lo:hi][::-1]
+            snapshot = [partition.items[k] for k in selected]
+        for item in snapshot:
+            yield copy.deepcopy(item)
+
+    def _scan_items(self, segment, total_segments, start_after):
+        with self._lock:
+            tokens = sorted(
+                (_partition_token(h), h) for h in self._partitions
+                if _segment_of(h, total_segments) == segment
+            )
+            rows = []
+            for token, hash_value in tokens:
+                partition = self._partitions[hash_value]
+                rows.extend((token, k, partition.items[k]) for k in partition.keys)
+        resume = None
+        if start_after is not None:
+            resume = (_partition_token(start_after[0]), _sort_token(start_after[1]))
+        for token, sort_key, item in rows:
+            if resume is not None:
+                if (token, sort_key if sort_key is not None else "") <= \
+                        (resume[0], resume[1] if resume[1] is not None else ""):
+                    continue
+            yield copy.deepcopy(item)
+
+
+# ============================================================
+# SQLite engine
+# ============================================================
+
+_type_serializer = TypeSerializer()
+_type_deserializer = TypeDeserializer()
+
+
+def _wire_to_json(value):
+    """DynamoDB wire format with binary values base64-encoded for JSON."""
+    if isinstance(value, dict):
+        if "B" in value and len(value) == 1:
+            raw = value["B"].value if isinstance(value["B"], Binary) else value["B"]
+            return {"B": base64.b64encode(raw).decode()}
+        if "BS" in value and len(value) == 1:
+            return {"BS": [base64.b64encode(b.value if isinstance(b, Binary) else b).decode()
+                           for b in value["BS"]]}
+        return {k: _wire_to_json(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_wire_to_json(v) for v in value]
+    return value
+
+
+def _json_to_wire(value):
+    if isinstance(value, dict):
+        if "B" in value and len(value) == 1:
+            return {"B": base64.b64decode(value["B"])}
+        if "BS" in value and len(value) == 1:
+            return {"BS": [base64.b64decode(b) for b in value["BS"]]}
+        return {k: _json_to_wire(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_json_to_wire(v) for v in value]
+    return value
+
+
+def _encode_item(item):
+    wire = {k: _type_serializer.serialize(v) for k, v in item.items()}
+    return json.dumps(_wire_to_json(wire), separators=(",", ":"))
+
+
+def _decode_item(doc):
+    wire = _json_to_wire(json.loads(doc))
+    return {k: _type_deserializer.deserialize(v) for k, v in wire.items()}
+
+
+def _sql_number_token(value):
+    """Text that sorts like the number, for every Decimal DynamoDB accepts.
+
+    Zero is "1"; positives are "2" + biased exponent + significant digits;
+    negatives are "0" + complemented exponent and digits + ":", which sorts
+    after every digit so a longer mantissa (a more negative number) comes first.
+    """
+    if value.is_zero():
+        return "1"
+    sign, digits, _ = value.as_tuple()
+    # Not Decimal.normalize(): it rounds to the context's 28 digits
+    mantissa = "".join(map(str, digits)).rstrip("0")
+    exponent = value.adjusted() + 500
+    if not sign:
+        return f"2{exponent:03d}{mantissa}"
+    complement = "".join(str(9 - int(d)) for d in mantissa)
+    return f"0{999 - exponent:03d}{complement}:"
+
+
+def _sql_sort_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, Binary):
+        return value.value
+    if isinstance(value, Decimal):
+        # float() loses digits past ~15, merging or misordering distinct keys
+        return _sql_number_token(value)
+    return value
+
+
+class SQLiteTable(_LocalTable):
+    """One SQLite table per DynamoDB table: (pk, sk) primary key + JSON doc."""
+
+    def __init__(self, conn, lock, name, hash_key, range_key=None):
+        super().__init__(name, hash_key, range_key)
+        self._conn = conn
+        self._lock = lock
+        self._sql_name = '"' + name.replace('"', '""') + '"'
+        with self._lock:
+            self._conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {self._sql_name} ("
+                "pk TEXT NOT NULL, sk NOT NULL, segment INTEGER NOT NULL, doc TEXT NOT NULL, "
+                "PRIMARY KEY (pk, sk)) WITHOUT ROWID"
+            )
+
+    def _transaction(self):
+        return _SQLiteTransaction(self._conn, self._lock)
+
+    def _load(self, hash_value, range_value):
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT doc FROM {self._sql_name} WHERE pk = ? AND sk = ?",
+                (_partition_token(hash_value), _sql_sort_value(range_value)),
+            ).fetchone()
+        return _decode_item(row[0]) if row else None
+
+    def _store(self, item):
+        hash_value = item[self.hash_key]
+        range_value = item[self.range_key] if self.range_key else None
+        with self._lock:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO {self._sql_name} (pk, sk, segment, doc) VALUES (?, ?, ?, ?)",
+                (
+                    _partition_token(hash_value), _sql_sort_value(range_value),
+                    zlib.crc32(_partition_token(hash_value).encode()), _encode_item(item),
+                ),
+            )
+
+    def _discard(self, hash_value, range_value):
+        with self._lock:
+            self._conn.execute(
+                f"DELETE FROM {self._sql_name} WHERE pk = ? AND sk = ?",
+                (_partition_token(hash_value), _sql_sort_value(range_value)),
+            )
+
+    def _range(self, hash_value, range_condition, forward, start_after):
+        clauses, params = ["pk = ?"], [_partition_token(hash_value)]
+        low, low_inclusive, high, high_inclusive = _range_bounds(range_condition)
+        if low is not None:
+            clauses.append("sk >= ?" if low_inclusive else "sk > ?")
+            params.append(_sql_sort_value(low))
+        if high is not None:
+            clauses.append("sk <= ?" if high_inclusive else "sk < ?")
+            params.append(_sql_sort_value(high))
+        after = "sk > ?" if forward else "sk < ?"
+        order = "ORDER BY sk ASC" if forward else "ORDER BY sk DESC"
+        position = None if start_after is None else (_sql_sort_value(start_after),)
+        yield from self._stream(clauses, params, after, order, position)
+
+    def _scan_items(self, segment, total_segments, start_after):
+        clauses, params = ["segment % ? = ?"], [total_segments, segment]
+        after = "(pk > ? OR (pk = ? AND sk > ?))"
+        position = None
+        if start_after is not None:
+            token = _partition_token(start_after[0])
+            position = (token, token, _sql_sort_value(start_after[1]))
+        yield from self._stream(clauses, params, after, "ORDER BY pk, sk", position)
+
+    def _stream(self, clauses, params, after, order, position, batch_size=256):
+        """Keyset-paginate rows in small batches so callers can stop early."""
+        while True:
+            where = clauses + ([after] if position is not None else [])
+            with self._lock:
+                rows = self._conn.execute(
+                    f"SELECT pk, sk, doc FROM {self._sql_name} WHERE {' AND '.join(where)} "
+                    f"{order} LIMIT ?",
+                    (*params, *(position or ()), batch_size),
+                ).fetchall()
+            for _, _, doc in rows:
+                yield _decode_item(doc)
+            if len(rows) < batch_size:
+                return
+            pk, sk, _ = rows[-1]
+            position = (sk,) if after.startswith("sk") else (pk, pk, sk)
+
+
+class _SQLiteTransaction:
+    """BEGIN IMMEDIATE ... COMMIT around a read-check-write sequence."""
+
+    def __init__(self, conn, lock):
+        self._conn = conn
+        self._lock = lock
+
+    def __enter__(self):
+        self._lock.acquire()
+        self._conn.execute("BEGIN IMMEDIATE")
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        try:
+            self._conn.execute("ROLLBACK" if exc_type else "COMMIT")
+        finally:
+            self._lock.release()
+        return False
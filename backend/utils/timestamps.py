@@ -0,0 +1,98 @@
+"""StatsTable sort keys.
+
+New items are partitioned by game inside each user's item collection: the
+sort key leads with the game type, then a UTC ISO-8601 timestamp and a
+random suffix, so sessions never collide, sort chronologically within a
+game regardless of server timezone, and a query for one game reads only
+that game's range:
+
+    blackjack#2026-10-17T09:30:00.123456Z#3f9c2a1b
+
+Older items start with a digit instead (no game prefix):
+
+    2026-10-17 09:30:00.123456             str(datetime.now()); Lambda is UTC
+    2026-10-17T09:30:00.123456Z#3f9c2a1b   ISO key without a game prefix
+
+jobs/migrate_stats_sort_keys.py rewrites those into the partitioned form;
+until it has run, readers also query the legacy range (digits sort before
+letters, so it is a single contiguous range). Both legacy forms share the
+date prefix, which keeps windowed range queries correct once
+``sort_key_bounds`` widens the window to cover either form.
+"""
+
+import uuid
+from datetime import datetime, timedelta
+
+PERIODS = {
+    "all": None,
+    "week": timedelta(days=7),
+    "month": timedelta(days=30),
+}
+
+_ISO_FORMAT = "%Y-%m-%dT%H:%M:%S.%fZ"
+_LEGACY_FORMAT = "%Y-%m-%d %H:%M:%S.%f"
+
+
+# Every legacy key starts with a digit; ":" is the character after "9".
+LEGACY_KEY_END = ":"
+
+
+def new_sort_key(game_type, now=None, suffix=None):
+    """A unique, chronologically sortable sort key for a new stats item."""
+    now = now or datetime.utcnow()
+    return f"{game_type}#{now.strftime(_ISO_FORMAT)}#{suffix or uuid.uuid4().hex[:8]}"
+
+
+def is_legacy_key(key):
+    return key[:1].isdigit()
+
+
+def sort_key_time(key):
+    """Parse any sort key form back into a naive UTC datetime."""
+    parts = key.split("#")
+    prefix = parts[0] if is_legacy_key(key) else parts[1]
+    if prefix.endswith("Z"):
+        return datetime.strptime(prefix, _ISO_FORMAT)
+    try:
+        return datetime.strptime(prefix, _LEGACY_FORMAT)
+    except ValueError:
+        # str(datetime) drops the fraction when microsecond == 0
+        return datetime.strptime(prefix, "%Y-%m-%d %H:%M:%S")
+
+
+def game_key_bounds(game_type, start, end):
+    """Inclusive (low, high) sort keys covering [start, end] for one game."""
+    return (
+        f"{game_type}#{start.strftime(_ISO_FORMAT)}",
+        f"{game_type}#{end.strftime(_ISO_FORMAT)}~",
+    )
+
+
+def sort_key_bounds(start, end):
+    """Inclusive (low, high) legacy sort keys covering [start, end] in both forms.
+
+    On the boundary days the range may also admit keys of the other form
+    that fall just outside the window; callers trim them with
+    ``in_window``.
+    """
+    low = min(start.strftime(_LEGACY_FORMAT), start.strftime(_ISO_FORMAT))
+    high = max(end.strftime(_LEGACY_FORMAT), end.strftime(_ISO_FORMAT)) + "~"
+    return low, high
+
+
+def period_window(period, now=None):
+    """(start, end) for a named period, or None for "all".
+
+    Raises ValueError for unknown periods.
+    """
+    if period not in PERIODS:
+        raise ValueError(f"unknown period {period!r}")
+    span = PERIODS[period]
+    if span is None:
+        return None
+    now = now or datetime.utcnow()
+    return now - span, now
+
+
+def in_window(key, start, end):
+    return start <= sort_key_time(key) <= end
@@ -333,3 +333,76 @@ describe('E2E: Password Reset API Flow', () => {
     expect(mockedAxios.post).toHaveBeenCalledTimes(4);
   });
 });
+
+// ============================================================
+// Flow 5: Login → Refresh → Token Reuse → Logout
+// ============================================================
+
+describe('E2E: Refresh Session API Flow', () => {
+  it('logs in → refreshes → reused old token is rejected → logs in again → logs out', async () => {
+    // Step 1: Login returns a refresh token alongside the access token
+    mockedAxios.post.mockResolvedValueOnce({
+      data: { access_token: 'jwt-1', token_type: 'bearer', refresh_token: 'refresh-1' },
+    });
+    const loginResp = await mockedAxios.post(`${API_URL}/login`, {
+      email: 'session@example.com',
+      password: 'sessionPass123',
+    });
+    const firstRefresh = loginResp.data.refresh_token;
+
+    // Step 2: The access token expires; trade the refresh token for new ones
+    mockedAxios.post.mockResolvedValueOnce({
+      data: { access_token: 'jwt-2', token_type: 'bearer', refresh_token: 'refresh-2' },
+    });
+    const refreshResp = await mockedAxios.post(`${API_URL}/auth/refresh`, {
+      refresh_token: firstRefresh,
+    });
+    expect(refreshResp.data.access_token).toBe('jwt-2');
+    expect(refreshResp.data.refresh_token).not.toBe(firstRefresh);
+
+    // Step 3: Replaying the rotated token revokes the whole session
+    mockedAxios.post.mockRejectedValueOnce({
+      response: { status: 401, data: { detail: 'Refresh token was already used.' } },
+    });
+    let reuseError: any;
+    try {
+      await mockedAxios.post(`${API_URL}/auth/refresh`, { refresh_token: firstRefresh });
+    } catch (e) {
+      reuseError = e;
+    }
+    expect(mockedAxios.isAxiosError(reuseError)).toBe(true);
+    expect(reuseError.response.status).toBe(401);
+
+    // ...so the successor is dead too and the app sends the user to login
+    mockedAxios.post.mockRejectedValueOnce({
+      response: { status: 401, data: { detail: 'Refresh token has been revoked.' } },
+    });
+    let revokedError: any;
+    try {
+      await mockedAxios.post(`${API_URL}/auth/refresh`, {
+        refresh_token: refreshResp.data.refresh_token,
+      });
+    } catch (e) {
+      revokedError = e;
+    }
+    expect(revokedError.response.status).toBe(401);
+
+    // Step 4: Log in again, then log out
+    mockedAxios.post.mockResolvedValueOnce({
+      data: { access_token: 'jwt-3', token_type: 'bearer', refresh_token: 'refresh-3' },
+    });
+    const againResp = await mockedAxios.post(`${API_URL}/login`, {
+      email: 'session@example.com',
+      password: 'sessionPass123',
+    });
+    mockedAxios.post.mockResolvedValueOnce({ data: { status: 'logged_out' } });
+    const logoutResp = await mockedAxios.post(`${API_URL}/auth/logout`, {
+      refresh_token: againResp.data.refresh_token,
+    });
+    expect(logoutResp.data.status).toBe('logged_out');
+    expect(mockedAxios.post).toHaveBeenLastCalledWith(`${API_URL}/auth/logout`, {
+      refresh_token: 'refresh-3',
+    });
+    expect(mockedAxios.post).toHaveBeenCalledTimes(6);
+  });
+});
@@ -0,0 +1,111 @@
+/**
+ * E2E Integration Test: Missed Scenario → Next Drill (GET /training/next-drill)
+ *
+ * Tests the frontend API interaction pattern for targeted practice:
+ * - Save a training session with a repeatedly missed scenario
+ * - Fetch the next drill and deal its forced cards
+ * - New players get no drill; expired tokens get 401
+ */
+
+import axios from 'axios';
+import { API_URL } from '../../config';
+
+jest.mock('axios');
+const mockedAxios = axios as jest.Mocked<typeof axios>;
+
+beforeEach(() => {
+  jest.resetAllMocks();
+  mockedAxios.isAxiosError = jest.fn(
+    (error: any) => error != null && error.response != null,
+  ) as any;
+});
+
+const token = 'drill-token';
+const auth = { headers: { Authorization: `Bearer ${token}` } };
+
+// ============================================================
+// Flow 1: Miss a Scenario → Receive Its Drill
+// ============================================================
+
+describe('E2E: Next Drill After Missed Scenarios', () => {
+  it('misses soft 18 vs 9, then receives its drill from next-drill', async () => {
+    // Step 1: Save a training session that keeps standing on soft 18 vs 9
+    mockedAxios.post.mockResolvedValueOnce({ data: { status: 'saved' } });
+    const missed = Array.from({ length: 6 }, (_, i) => ({
+      id: `td_${i}`,
+      category: 'soft_total',
+      scenarioKey: 'soft_18_vs_9',
+      userAction: 'stand',
+      optimalAction: 'hit',
+      isCorrect: false,
+    }));
+    const saveResp = await mockedAxios.post(
+      `${API_URL}/stats`,
+      { result: 'training_session', mistakes: 6, training_decisions: missed },
+      auth,
+    );
+    expect(saveResp.data.status).toBe('saved');
+
+    // Step 2: Ask for the next drill
+    mockedAxios.get = jest.fn().mockResolvedValueOnce({
+      data: {
+        game_type: 'blackjack',
+        drill: {
+          drill_id: 'drill_soft_18_vs_9',
+          scenario: 'soft_18_vs_9',
+          force_cards: { player: ['A', '7'], dealer: '9' },
+          allowed_actions: ['hit', 'stand', 'double', 'surrender'],
+          success_criteria: '3_correct_row',
+          total: 6,
+          correct: 0,
+          accuracy: 0,
+          priority: 0.9,
+        },
+        queue: ['hard_12_vs_3'],
+      },
+    });
+    const drillResp = await mockedAxios.get(
+      `${API_URL}/training/next-drill?game_type=blackjack`,
+      auth,
+    );
+    expect(mockedAxios.get).toHaveBeenCalledWith(
+      `${API_URL}/training/next-drill?game_type=blackjack`,
+      expect.objectContaining({ headers: { Authorization: `Bearer ${token}` } }),
+    );
+
+    // Step 3: The drill deals the missed hand
+    const { drill, queue } = drillResp.data;
+    expect(drill.scenario).toBe('soft_18_vs_9');
+    expect(drill.force_cards.player).toEqual(['A', '7']);
+    expect(drill.force_cards.dealer).toBe('9');
+    expect(drill.allowed_actions).toContain('hit');
+    expect(queue).toEqual(['hard_12_vs_3']);
+  });
+
+  it('returns no drill for a player without misses', async () => {
+    mockedAxios.get = jest.fn().mockResolvedValueOnce({
+      data: { game_type: 'blackjack', drill: null, queue: [] },
+    });
+
+    const resp = await mockedAxios.get(`${API_URL}/training/next-drill?game_type=blackjack`, auth);
+    expect(resp.data.drill).toBeNull();
+    expect(resp.data.queue).toHaveLength(0);
+  });
+
+  it('handles 401 when token is expired', async () => {
+    mockedAxios.get = jest.fn().mockRejectedValueOnce({
+      response: { status: 401, data: { detail: 'Unauthorized' } },
+    });
+
+    let error: any;
+    try {
+      await mockedAxios.get(`${API_URL}/training/next-drill?game_type=blackjack`, {
+        headers: { Authorization: 'Bearer expired-token' },
+      });
+    } catch (e) {
+      error = e;
+    }
+    expect(mockedAxios.isAxiosError(error)).toBe(true);
+    expect(error.response.status).toBe(401);
+  });
+});
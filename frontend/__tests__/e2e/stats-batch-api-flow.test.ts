@@ -0,0 +1,153 @@
+/**
+ * E2E Integration Test: Offline Session Sync (POST /stats/batch)
+ *
+ * Tests the frontend API interaction pattern for syncing sessions that were
+ * recorded offline:
+ * - Signup → login → batch upload → summary includes the synced sessions
+ * - Per-session statuses: only "failed" sessions are queued for resend
+ */
+
+import axios from 'axios';
+import { API_URL } from '../../config';
+
+jest.mock('axios');
+const mockedAxios = axios as jest.Mocked<typeof axios>;
+
+beforeEach(() => {
+  jest.resetAllMocks();
+  mockedAxios.isAxiosError = jest.fn(
+    (error: any) => error != null && error.response != null,
+  ) as any;
+});
+
+const offlineSessions = [
+  { result: 'win', mistakes: 0, net_payout: 20, hands_played: 4 },
+  { result: 'loss', mistakes: 2, net_payout: -10, hands_played: 3 },
+  {
+    result: 'training_session',
+    mistakes: 1,
+    training_decisions: [
+      {
+        id: 'd1',
+        category: 'hard_total',
+        scenarioKey: 'hard_16_vs_10',
+        userAction: 'hit',
+        optimalAction: 'surrender',
+        isCorrect: false,
+      },
+    ],
+  },
+];
+
+// ============================================================
+// Flow 1: Signup → Login → Batch Upload → Summary
+// ============================================================
+
+describe('E2E: Offline Sessions Sync', () => {
+  it('signs up, uploads offline sessions in one batch, then sees them in the summary', async () => {
+    mockedAxios.post
+      .mockResolvedValueOnce({ data: { status: 'success', user_id: 'user-offline' } })
+      .mockResolvedValueOnce({ data: { access_token: 'sync-token', refresh_token: 'sync-refresh' } })
+      .mockResolvedValueOnce({
+        data: {
+          status: 'processed',
+          saved: 3,
+          failed: 0,
+          invalid: 0,
+          results: [
+            { index: 0, status: 'saved' },
+            { index: 1, status: 'saved' },
+            { index: 2, status: 'saved' },
+          ],
+        },
+      });
+    mockedAxios.get = jest.fn().mockResolvedValueOnce({
+      data: {
+        game_type: 'blackjack',
+        total_decisions: 1,
+        correct_decisions: 0,
+        session_totals: { sessions: 3, net_payout: 10, results: { win: 1, loss: 1, training_session: 1 } },
+      },
+    });
+
+    const signupResp = await mockedAxios.post(`${API_URL}/signup`, {
+      email: 'offline@example.com',
+      password: 'testpass123',
+    });
+    expect(signupResp.data.status).toBe('success');
+
+    const loginResp = await mockedAxios.post(`${API_URL}/login`, {
+      email: 'offline@example.com',
+      password: 'testpass123',
+    });
+    const token = loginResp.data.access_token;
+
+    const syncResp = await mockedAxios.post(
+      `${API_URL}/stats/batch`,
+      { sessions: offlineSessions },
+      { headers: { Authorization: `Bearer ${token}`, 'Idempotency-Key': 'sync-1' } },
+    );
+    expect(syncResp.data.saved).toBe(3);
+    expect(mockedAxios.post).toHaveBeenLastCalledWith(
+      `${API_URL}/stats/batch`,
+      { sessions: offlineSessions },
+      expect.objectContaining({
+        headers: expect.objectContaining({ Authorization: 'Bearer sync-token' }),
+      }),
+    );
+
+    const summaryResp = await mockedAxios.get(
+      `${API_URL}/training/summary?game_type=blackjack`,
+      { headers: { Authorization: `Bearer ${token}` } },
+    );
+    expect(summaryResp.data.session_totals.sessions).toBe(3);
+    expect(summaryResp.data.session_totals.net_payout).toBe(10);
+  });
+
+  it('keeps only the failed sessions queued for the next sync', async () => {
+    mockedAxios.post.mockResolvedValueOnce({
+      data: {
+        status: 'processed',
+        saved: 2,
+        failed: 1,
+        invalid: 0,
+        results: [
+          { index: 0, status: 'saved' },
+          { index: 1, status: 'failed' },
+          { index: 2, status: 'saved' },
+        ],
+      },
+    });
+
+    const resp = await mockedAxios.post(
+      `${API_URL}/stats/batch`,
+      { sessions: offlineSessions },
+      { headers: { Authorization: 'Bearer sync-token' } },
+    );
+
+    // Saved sessions must not be resent: the server already stored them
+    const stillQueued = resp.data.results
+      .filter((r: { status: string }) => r.status === 'failed')
+      .map((r: { index: number }) => offlineSessions[r.index]);
+    expect(stillQueued).toEqual([offlineSessions[1]]);
+  });
+
+  it('rejects an empty batch with 400', async () => {
+    mockedAxios.post.mockRejectedValueOnce({
+      response: { status: 400, data: { detail: 'sessions must be a non-empty list.' } },
+    });
+
+    let error: any;
+    try {
+      await mockedAxios.post(
+        `${API_URL}/stats/batch`,
+        { sessions: [] },
+        { headers: { Authorization: 'Bearer sync-token' } },
+      );
+    } catch (e) {
+      error = e;
+    }
+    expect(mockedAxios.isAxiosError(error)).toBe(true);
+    expect(error.response.status).toBe(400);
+  });
+});